@@ -1,12 +1,15 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import User, OTP
+from edustream.admin_tools import FastChangeListMixin
+from .models import User, OTP, OTPDeliveryFailure
 
-class CustomUserAdmin(UserAdmin):
+class CustomUserAdmin(FastChangeListMixin, UserAdmin):
     list_display = ('email', 'username', 'first_name', 'last_name', 'role', 'email_verified', 'phone_verified', 'is_active')
     list_filter = ('role', 'email_verified', 'phone_verified', 'is_active', 'is_staff')
+    # Each field has a trigram index (see User.Meta.indexes)
     search_fields = ('email', 'username', 'first_name', 'last_name', 'phone_number')
     ordering = ('-created_at',)
+    changelist_only = list_display + ('id', 'created_at')
     
     fieldsets = UserAdmin.fieldsets + (
         ('Additional Info', {'fields': ('role', 'phone_number', 'email_verified', 'phone_verified')}),
@@ -18,12 +21,23 @@ class CustomUserAdmin(UserAdmin):
 
 
 @admin.register(OTP)
-class OTPAdmin(admin.ModelAdmin):
+class OTPAdmin(FastChangeListMixin, admin.ModelAdmin):
     list_display = ('identifier', 'otp_type', 'purpose', 'otp_code', 'is_verified', 'created_at', 'expires_at')
     list_filter = ('otp_type', 'purpose', 'is_verified', 'created_at')
+    # Each field has a trigram index (see OTP.Meta.indexes)
     search_fields = ('identifier', 'otp_code')
     ordering = ('-created_at',)
     readonly_fields = ('created_at', 'expires_at')
 
 
+@admin.register(OTPDeliveryFailure)
+class OTPDeliveryFailureAdmin(FastChangeListMixin, admin.ModelAdmin):
+    list_display = ('identifier', 'otp_type', 'purpose', 'attempts', 'created_at')
+    list_filter = ('otp_type', 'purpose', 'created_at')
+    search_fields = ('identifier',)
+    ordering = ('-created_at',)
+    readonly_fields = ('identifier', 'otp_type', 'purpose', 'attempts', 'error', 'created_at')
+    changelist_only = list_display + ('id',)
+
+
 admin.site.register(User, CustomUserAdmin)
@@ -0,0 +1,31 @@
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import ClaimsUser
+from .tokens import has_user_claims, user_tokens_revoked
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that builds request.user from the token's signed
+    claims instead of loading the users row. The row is only fetched when a
+    view touches a field that is not carried in the token. Deleted and
+    deactivated users are turned away by their revocation marker
+    (accounts.tokens.revoke_user_tokens).
+    """
+    
+    def get_user(self, validated_token):
+        # Tokens issued before claims were added fall back to a DB lookup
+        if not has_user_claims(validated_token):
+            return super().get_user(validated_token)
+        
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken("Token contained no recognizable user identification")
+        
+        if user_tokens_revoked(user_id, validated_token):
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        
+        return ClaimsUser.from_claims(user_id, validated_token)
@@ -0,0 +1,246 @@
+"""
+Refresh-token blacklist.
+
+Revoked JTIs live in Redis with a TTL equal to the token's remaining
+lifetime, plus a sorted-set log (scored by Redis server time) that every
+process tails into an in-memory Bloom filter. A JTI the filter has never
+seen skips the network; only filter hits (revoked tokens and the configured
+false-positive rate) cost an EXISTS.
+
+Each rebuild sizes the filter for twice the log's current length (at least
+BLOOM_CAPACITY), and a filter that fills up before REBUILD_SECONDS is
+rebuilt early, so the false-positive rate holds as the log grows.
+
+A revocation made by another process reaches this process's filter within
+SYNC_SECONDS. Rotation is not exposed to that window: revoke() is SET NX,
+so a refresh token can be rotated exactly once.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from functools import lru_cache
+import hashlib
+import logging
+import math
+import threading
+import time
+
+from edustream.metrics import register_local
+
+logger = logging.getLogger(__name__)
+
+REVOKED_PREFIX = 'jwt:revoked:'
+REVOCATION_LOG = 'jwt:revocations'
+
+
+def _remaining_seconds(exp):
+    return int(exp - time.time())
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (double hashing on one blake2b digest)"""
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        # Additions, repeats included: past capacity the error rate climbs
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    @property
+    def is_full(self):
+        return self.count >= self.capacity
+
+    def add(self, item):
+        self.count += 1
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item):
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class BaseTokenBlacklist:
+
+    def revoke(self, jti, exp):
+        """Blacklist a token until it expires. False if it was already revoked"""
+        raise NotImplementedError
+
+    def is_revoked(self, jti):
+        raise NotImplementedError
+
+    def stats(self):
+        return None
+
+
+class CacheTokenBlacklist(BaseTokenBlacklist):
+    """Django cache storage without a prefilter, for tests and development"""
+
+    def revoke(self, jti, exp):
+        ttl = _remaining_seconds(exp)
+        if ttl <= 0:
+            return True
+        return cache.add(REVOKED_PREFIX + jti, 1, ttl)
+
+    def is_revoked(self, jti):
+        return cache.get(REVOKED_PREFIX + jti) is not None
+
+
+# KEYS: revoked marker, revocation log   ARGV: ttl, jti, log retention seconds
+_REVOKE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+if not redis.call('SET', KEYS[1], 1, 'EX', tonumber(ARGV[1]), 'NX') then
+    return 0
+end
+redis.call('ZADD', KEYS[2], now, ARGV[2])
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', now - tonumber(ARGV[3]) * 1000)
+return 1
+"""
+
+
+class RedisTokenBlacklist(BaseTokenBlacklist):
+
+    def __init__(self):
+        from edustream.redis_client import get_redis
+        blacklist_settings = getattr(settings, 'TOKEN_BLACKLIST', {})
+        self._get_redis = get_redis
+        self._scripts = {}
+        # Smallest filter built; 0 disables the prefilter: every check is an EXISTS
+        self.capacity = blacklist_settings.get('BLOOM_CAPACITY', 1_000_000)
+        self.error_rate = blacklist_settings.get('BLOOM_ERROR_RATE', 0.001)
+        self.sync_seconds = blacklist_settings.get('SYNC_SECONDS', 1.0)
+        self.rebuild_seconds = blacklist_settings.get('REBUILD_SECONDS', 3600)
+        # Nothing older than the refresh lifetime can still be presented
+        self.retention_seconds = int(settings.SIMPLE_JWT['REFRESH_TOKEN_LIFETIME'].total_seconds())
+
+        self._bloom = None
+        self._synced_at = 0.0
+        self._built_at = 0.0
+        self._log_cursor = 0
+        self._sync_lock = threading.Lock()
+        self._stats = {'skipped': 0, 'checked': 0, 'revoked_hits': 0, 'syncs': 0, 'rebuilds': 0}
+
+    def revoke(self, jti, exp):
+        ttl = _remaining_seconds(exp)
+        if ttl <= 0:
+            return True
+        client = self._get_redis()
+        script = self._scripts.get(id(client))
+        if script is None:
+            script = self._scripts[id(client)] = client.register_script(_REVOKE_SCRIPT)
+        revoked = bool(script(
+            keys=[REVOKED_PREFIX + jti, REVOCATION_LOG],
+            args=[ttl, jti, self.retention_seconds],
+        ))
+        if self._bloom is not None:
+            self._bloom.add(jti)
+        return revoked
+
+    def is_revoked(self, jti):
+        if self.capacity:
+            self._maybe_sync()
+        bloom = self._bloom
+        if bloom is not None and jti not in bloom:
+            self._stats['skipped'] += 1
+            return False
+        self._stats['checked'] += 1
+        revoked = bool(self._get_redis().exists(REVOKED_PREFIX + jti))
+        if revoked:
+            self._stats['revoked_hits'] += 1
+        return revoked
+
+    def _maybe_sync(self):
+        now = time.monotonic()
+        if self._bloom is not None and now - self._synced_at < self.sync_seconds:
+            return
+        # One thread syncs; the rest keep using the current filter
+        if not self._sync_lock.acquire(blocking=self._bloom is None):
+            return
+        try:
+            if self._bloom is None or self._bloom.is_full or now - self._built_at >= self.rebuild_seconds:
+                self._rebuild()
+            else:
+                self._tail_log()
+            self._synced_at = time.monotonic()
+        except Exception as e:
+            # Without a current filter every check goes to Redis
+            logger.warning(f"Token blacklist sync failed: {str(e)}")
+            self._bloom = None
+        finally:
+            self._sync_lock.release()
+
+    def _read_log(self, bloom, start, page=10000):
+        """Add log entries scored >= start to bloom; returns the highest score seen"""
+        client = self._get_redis()
+        cursor = start
+        # Entries already read at score `cursor`. Each page seeks to the last
+        # score seen instead of skipping everything read so far (LIMIT offsets
+        # are walked), so reading the whole log stays linear
+        skip = 0
+        while True:
+            entries = client.zrangebyscore(REVOCATION_LOG, cursor, '+inf', start=skip, num=page, withscores=True)
+            for jti, score in entries:
+                bloom.add(jti)
+                score = int(score)
+                if score == cursor:
+                    skip += 1
+                else:
+                    cursor, skip = score, 1
+            if len(entries) < page:
+                return cursor
+
+    def _rebuild(self):
+        """Fresh filter from the whole log, dropping JTIs that have expired since"""
+        # Room for the log to double before the next rebuild
+        capacity = max(self.capacity, 2 * self._get_redis().zcard(REVOCATION_LOG))
+        bloom = BloomFilter(capacity, self.error_rate)
+        self._log_cursor = self._read_log(bloom, 0)
+        self._bloom = bloom
+        self._built_at = time.monotonic()
+        self._stats['rebuilds'] += 1
+
+    def _tail_log(self):
+        # Inclusive start: entries written in the same millisecond as the
+        # last one we saw are re-read rather than missed
+        self._log_cursor = self._read_log(self._bloom, self._log_cursor)
+        self._stats['syncs'] += 1
+
+    def stats(self):
+        bloom = self._bloom
+        return {
+            **self._stats,
+            'bloom_capacity': bloom.capacity if bloom else 0,
+            'bloom_items': bloom.count if bloom else 0,
+            'bloom_bits': bloom.size if bloom else 0,
+            'bloom_hashes': bloom.hashes if bloom else 0,
+            'sync_seconds': self.sync_seconds,
+        }
+
+
+@lru_cache(maxsize=None)
+def get_token_blacklist():
+    return import_string(settings.TOKEN_BLACKLIST['BACKEND'])()
+
+
+@receiver(setting_changed)
+def _reset_token_blacklist(setting, **kwargs):
+    if setting == 'TOKEN_BLACKLIST':
+        get_token_blacklist.cache_clear()
+
+
+register_local(
+    'token_blacklist.local',
+    lambda: get_token_blacklist().stats() if get_token_blacklist.cache_info().currsize else None
+)
@@ -0,0 +1,247 @@
+"""
+Bulk teacher/student import from CSV or JSONL streams.
+
+Rows are validated a chunk at a time. Each chunk costs one query to find
+clashing emails/phones/usernames, a fan-out of password hashes over an
+executor (a process pool for the import_users command, the shared
+PasswordHashPool for uploads), and one bulk INSERT each for users and
+teacher profiles.
+"""
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+import csv
+import json
+import logging
+import os
+
+from .hashing import PasswordHashPool
+from .models import User, TeacherProfile
+from .serializers import BulkStudentRowSerializer, BulkTeacherRowSerializer, unique_violation_errors
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ('csv', 'jsonl')
+
+# CSV has no lists, so these columns are split on ';'
+CSV_LIST_FIELDS = ('specialization', 'teaching_languages')
+
+PROFILE_FIELDS = ('qualification', 'experience_years', 'specialization', 'bio',
+                  'linkedin_url', 'teaching_languages')
+
+UNIQUE_FIELDS = {
+    'email': "Email already registered",
+    'phone_number': "Phone number already registered",
+    'username': "Username already taken",
+}
+
+
+def detect_format(filename, default='csv'):
+    extension = os.path.splitext(filename or '')[1].lower().lstrip('.')
+    if extension in ('jsonl', 'ndjson'):
+        return 'jsonl'
+    if extension == 'csv':
+        return 'csv'
+    return default
+
+
+def read_rows(stream, fmt):
+    """Yield (row_number, row, parse_error) from a text stream"""
+    if fmt == 'csv':
+        for number, row in enumerate(csv.DictReader(stream), start=1):
+            cleaned = {}
+            for key, value in row.items():
+                # Extra cells land under None; blank cells fall back to defaults
+                if key is None or value is None or not value.strip():
+                    continue
+                key = key.strip()
+                value = value.strip()
+                if key in CSV_LIST_FIELDS:
+                    value = [item.strip() for item in value.split(';') if item.strip()]
+                cleaned[key] = value
+            yield number, cleaned, None
+    elif fmt == 'jsonl':
+        number = 0
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            number += 1
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield number, None, f"Invalid JSON: {e}"
+                continue
+            if not isinstance(row, dict):
+                yield number, None, "Each line must be a JSON object"
+                continue
+            yield number, row, None
+    else:
+        raise ValueError(f"Unsupported import format: {fmt}")
+
+
+def hash_passwords(passwords, executor=None):
+    """make_password for each password, fanned out over executor if given"""
+    if executor is None:
+        return [make_password(password) for password in passwords]
+    if isinstance(executor, PasswordHashPool):
+        return executor.make_passwords(passwords)
+    workers = getattr(executor, '_max_workers', 1)
+    chunksize = max(1, len(passwords) // (workers * 4))
+    return list(executor.map(make_password, passwords, chunksize=chunksize))
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class BulkImporter:
+    """
+    Imports rows for one role and returns a report:
+    {'total', 'created', 'failed', 'errors': [{'row': n, 'errors': {...}}]}
+    """
+
+    def __init__(self, role, chunk_size=None, executor=None):
+        if role not in ('teacher', 'student'):
+            raise ValueError(f"Unsupported role: {role}")
+        import_settings = getattr(settings, 'BULK_IMPORT', {})
+        self.role = role
+        self.chunk_size = chunk_size or import_settings.get('CHUNK_SIZE', 500)
+        # Owned by the caller: a concurrent.futures executor or PasswordHashPool
+        self.executor = executor
+        self.row_serializer_class = (
+            BulkTeacherRowSerializer if role == 'teacher' else BulkStudentRowSerializer
+        )
+        # Values accepted earlier in this import -> row number, to catch
+        # duplicates across chunks
+        self._seen = {field: {} for field in UNIQUE_FIELDS}
+
+    def run(self, rows):
+        report = {'total': 0, 'created': 0, 'failed': 0, 'errors': []}
+        for chunk in _chunks(rows, self.chunk_size):
+            self._import_chunk(chunk, report)
+        report['errors'].sort(key=lambda error: error['row'])
+        logger.info(
+            f"Bulk {self.role} import: {report['created']} created, "
+            f"{report['failed']} failed of {report['total']} rows"
+        )
+        return report
+
+    def _fail(self, report, number, errors):
+        report['failed'] += 1
+        report['errors'].append({'row': number, 'errors': errors})
+
+    def _import_chunk(self, chunk, report):
+        valid = []
+        for number, row, parse_error in chunk:
+            report['total'] += 1
+            if parse_error:
+                self._fail(report, number, {'non_field_errors': [parse_error]})
+                continue
+            serializer = self.row_serializer_class(data=row)
+            if not serializer.is_valid():
+                self._fail(report, number, serializer.errors)
+                continue
+            data = dict(serializer.validated_data)
+            data['email'] = User.objects.normalize_email(data['email'])
+            data['username'] = User.normalize_username(data['username'])
+            valid.append((number, data))
+
+        valid = self._drop_conflicts(valid, report)
+        if not valid:
+            return
+
+        hashes = hash_passwords([data.pop('password') for _, data in valid], self.executor)
+        users = [self._build_user(data, encoded) for (_, data), encoded in zip(valid, hashes)]
+
+        try:
+            with transaction.atomic():
+                self._insert(users, [data for _, data in valid])
+            report['created'] += len(users)
+        except IntegrityError:
+            # Someone registered a clashing account after our lookup; fall
+            # back to row-at-a-time inserts so only those rows fail
+            for (number, data), user in zip(valid, users):
+                user.pk = None
+                user._state.adding = True
+                try:
+                    with transaction.atomic():
+                        self._insert([user], [data])
+                    report['created'] += 1
+                except IntegrityError as e:
+                    self._fail(report, number, unique_violation_errors(e))
+
+    def _drop_conflicts(self, valid, report):
+        """Fail rows whose unique values exist in the DB or earlier rows"""
+        if not valid:
+            return valid
+        values = {field: {data[field] for _, data in valid} for field in UNIQUE_FIELDS}
+        taken = {field: set() for field in UNIQUE_FIELDS}
+        existing = User.objects.filter(
+            Q(email__in=values['email']) |
+            Q(phone_number__in=values['phone_number']) |
+            Q(username__in=values['username'])
+        ).values_list('email', 'phone_number', 'username')
+        for email, phone_number, username in existing:
+            taken['email'].add(email)
+            taken['phone_number'].add(phone_number)
+            taken['username'].add(username)
+
+        accepted = []
+        for number, data in valid:
+            errors = {}
+            for field, message in UNIQUE_FIELDS.items():
+                value = data[field]
+                if value in taken[field]:
+                    errors[field] = [message]
+                elif value in self._seen[field]:
+                    errors[field] = [f"Duplicate of row {self._seen[field][value]}"]
+            if errors:
+                self._fail(report, number, errors)
+                continue
+            for field in UNIQUE_FIELDS:
+                self._seen[field][data[field]] = number
+            accepted.append((number, data))
+        return accepted
+
+    def _build_user(self, data, encoded_password):
+        user = User(
+            username=data['username'],
+            email=data['email'],
+            phone_number=data['phone_number'],
+            first_name=data.get('first_name', ''),
+            last_name=data.get('last_name', ''),
+            password=encoded_password,
+            role=self.role,
+            email_verified=True,  # Imported accounts are vouched for by the admin
+            phone_verified=True,
+        )
+        # bulk_create skips User.save, so set the trial here
+        if self.role == 'student':
+            user.trial_end_date = User.new_trial_end_date()
+        return user
+
+    def _insert(self, users, rows):
+        User.objects.bulk_create(users)
+        if self.role != 'teacher':
+            return
+        if any(user.pk is None for user in users):
+            # Backends that can't return ids from a bulk insert
+            ids = dict(User.objects.filter(
+                email__in=[user.email for user in users]
+            ).values_list('email', 'pk'))
+            for user in users:
+                user.pk = ids[user.email]
+        TeacherProfile.objects.bulk_create([
+            TeacherProfile(user=user, **{field: data[field] for field in PROFILE_FIELDS})
+            for user, data in zip(users, rows)
+        ])
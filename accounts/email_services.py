@@ -1,24 +1,41 @@
 """
 Email Service using Django's SMTP backend (Gmail)
+
+Messages go through a per-process EmailDispatcher that keeps a small pool
+of open SMTP connections instead of opening, authenticating and closing
+one connection per message.
 """
 
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
 from django.conf import settings
-from django.core.mail import send_mail
-from django.template.loader import render_to_string
-from django.utils.html import strip_tags
+from django.core.mail import EmailMultiAlternatives, get_connection
+from functools import lru_cache
 import logging
+import os
+import queue
+import smtplib
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
+# Errors that mean the session itself is gone and must be reopened
+_CONNECTION_ERRORS = (
+    smtplib.SMTPServerDisconnected,
+    smtplib.SMTPConnectError,
+    ConnectionError,
+    TimeoutError,
+)
 
-def send_otp_email(email, otp_code, purpose='registration'):
-    """
-    Send OTP email using Django's configured email backend (SMTP)
-    """
-    subject = f'Your OTP for {purpose.replace("_", " ").title()}'
-    
-    # Create HTML content
-    html_message = f"""
+
+
+def _dispatcher_setting(name, default):
+    return getattr(settings, 'EMAIL_DISPATCHER', {}).get(name, default)
+
+
+# Static parts of the OTP email, rendered once at import. Only the code
+# is substituted per message.
+_OTP_HTML_HEAD = """
     <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
         <div style="background-color: #4CAF50; color: white; padding: 20px; text-align: center;">
             <h1>EduStream</h1>
@@ -28,7 +45,9 @@ def send_otp_email(email, otp_code, purpose='registration'):
             <p>Hello,</p>
             <p>Your OTP verification code is:</p>
             <div style="background-color: #fff; padding: 20px; text-align: center; font-size: 32px; font-weight: bold; letter-spacing: 5px; margin: 20px 0; border: 2px dashed #4CAF50;">
-                {otp_code}
+                """
+
+_OTP_HTML_TAIL = """
             </div>
             <p style="color: #666;">This code will expire in 10 minutes.</p>
             <p style="color: #666;">Please do not share this code with anyone.</p>
@@ -40,12 +59,13 @@ def send_otp_email(email, otp_code, purpose='registration'):
         </div>
     </div>
     """
-    
-    # Plain text version
-    plain_message = f"""
+
+_OTP_PLAIN_HEAD = """
 Hello,
 
-Your OTP verification code is: {otp_code}
+Your OTP verification code is: """
+
+_OTP_PLAIN_TAIL = """
 
 This code will expire in 10 minutes. Please do not share this code with anyone.
 
@@ -54,17 +74,204 @@ If you didn't request this code, please ignore this email.
 Best regards,
 EduStream Team
     """
+
+
+@lru_cache(maxsize=None)
+def _otp_subject(purpose):
+    return f'Your OTP for {purpose.replace("_", " ").title()}'
+
+
+def render_otp_bodies(otp_code):
+    """Return (plain_message, html_message) for an OTP code"""
+    return (
+        _OTP_PLAIN_HEAD + otp_code + _OTP_PLAIN_TAIL,
+        _OTP_HTML_HEAD + otp_code + _OTP_HTML_TAIL,
+    )
+
+
+class EmailDispatcher:
+    """
+    Sends queued messages over a small pool of long-lived connections.
     
-    try:
-        # Send email using Django's email backend
-        send_mail(
-            subject=subject,
-            message=plain_message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[email],
-            html_message=html_message,
-            fail_silently=False,
+    Each pool slot is a sender thread that owns one backend connection. It
+    drains up to batch_size queued messages at a time onto that connection,
+    health-checks it with NOOP after it has been idle, reconnects when the
+    server drops the session and closes it after idle_timeout seconds with
+    nothing to send.
+    """
+    
+    def __init__(self, connections=None, batch_size=None, idle_timeout=None,
+                 health_check_interval=None, connection_kwargs=None):
+        self.connections = connections or _dispatcher_setting('CONNECTIONS', 2)
+        self.batch_size = batch_size or _dispatcher_setting('BATCH_SIZE', 50)
+        self.idle_timeout = idle_timeout or _dispatcher_setting('IDLE_TIMEOUT_SECONDS', 60)
+        self.health_check_interval = (
+            health_check_interval or _dispatcher_setting('HEALTH_CHECK_SECONDS', 30)
         )
+        self.connection_kwargs = connection_kwargs or {}
+        self._queue = queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+    
+    def _ensure_started(self):
+        if self._threads:
+            return
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.connections):
+                thread = threading.Thread(
+                    target=self._run, daemon=True, name=f'EmailDispatcher-{i}'
+                )
+                thread.start()
+                self._threads.append(thread)
+    
+    def send(self, message, timeout=None):
+        """
+        Queue one EmailMessage and block until it is sent (raises on failure).
+        A message still queued after timeout is withdrawn before TimeoutError
+        is raised, so retrying can't deliver it twice.
+        """
+        return self.send_many([message], timeout)[0]
+    
+    def send_many(self, messages, timeout=None):
+        """Queue several EmailMessages and wait for all of them"""
+        self._ensure_started()
+        futures = []
+        for message in messages:
+            future = Future()
+            self._queue.put((message, future))
+            futures.append(future)
+        timeout = timeout or _dispatcher_setting('SEND_TIMEOUT_SECONDS', 30)
+        try:
+            return [future.result(timeout) for future in futures]
+        except FutureTimeoutError:
+            # Senders skip cancelled messages; one already being sent can't
+            # be recalled, so wait for it instead of reporting a failure
+            withdrawn = [future.cancel() for future in futures]
+            if any(withdrawn):
+                logger.warning(f"Email send timed out; withdrew {sum(withdrawn)} queued message(s)")
+                raise
+            return [future.result() for future in futures]
+    
+    def _open(self):
+        connection = get_connection(fail_silently=False, **self.connection_kwargs)
+        connection.open()
+        return connection
+    
+    def _is_healthy(self, connection):
+        smtp = getattr(connection, 'connection', None)
+        if not isinstance(smtp, smtplib.SMTP):
+            return True  # console/locmem backends have no session to check
+        try:
+            return smtp.noop()[0] == 250
+        except smtplib.SMTPException:
+            return False
+        except OSError:
+            return False
+    
+    def _close(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+    
+    def _run(self):
+        connection = None
+        last_used = 0
+        
+        while True:
+            try:
+                item = self._queue.get(timeout=self.idle_timeout)
+            except queue.Empty:
+                if connection is not None:
+                    self._close(connection)
+                    connection = None
+                continue
+            
+            batch = [item]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            if connection is not None and time.monotonic() - last_used > self.health_check_interval:
+                if not self._is_healthy(connection):
+                    self._close(connection)
+                    connection = None
+            
+            pending = batch
+            reconnected = False
+            while pending:
+                message, future = pending[0]
+                # Marks it as being sent, so send_many() can no longer withdraw it
+                if not future.running() and not future.set_running_or_notify_cancel():
+                    pending = pending[1:]
+                    continue
+                try:
+                    if connection is None:
+                        connection = self._open()
+                    connection.send_messages([message])
+                    future.set_result(1)
+                    reconnected = False
+                except _CONNECTION_ERRORS as e:
+                    # Server dropped the session: reconnect and resend the
+                    # rest of the batch, giving up if a fresh session fails too
+                    self._close(connection)
+                    connection = None
+                    if reconnected:
+                        for _message, pending_future in pending:
+                            # Skipping withdrawn ones (set_exception() would raise)
+                            if pending_future.running() or pending_future.set_running_or_notify_cancel():
+                                pending_future.set_exception(e)
+                        break
+                    logger.warning(f"SMTP connection lost, reconnecting: {str(e)}")
+                    reconnected = True
+                    continue
+                except Exception as e:
+                    # Message-level failure (bad address, rejected recipient)
+                    future.set_exception(e)
+                pending = pending[1:]
+            
+            last_used = time.monotonic()
+
+
+_dispatcher = None
+_dispatcher_pid = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_email_dispatcher():
+    """Return this process's dispatcher (rebuilt after fork, e.g. in Celery workers)"""
+    global _dispatcher, _dispatcher_pid
+    pid = os.getpid()
+    if _dispatcher is None or _dispatcher_pid != pid:
+        with _dispatcher_lock:
+            if _dispatcher is None or _dispatcher_pid != pid:
+                _dispatcher = EmailDispatcher()
+                _dispatcher_pid = pid
+    return _dispatcher
+
+
+def build_otp_email(email, otp_code, purpose='registration'):
+    plain_message, html_message = render_otp_bodies(otp_code)
+    message = EmailMultiAlternatives(
+        subject=_otp_subject(purpose),
+        body=plain_message,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[email],
+    )
+    message.attach_alternative(html_message, 'text/html')
+    return message
+
+
+def send_otp_email(email, otp_code, purpose='registration'):
+    """
+    Send OTP email over the process's pooled SMTP connections
+    """
+    try:
+        get_email_dispatcher().send(build_otp_email(email, otp_code, purpose))
         logger.info(f"OTP email sent successfully to {email}")
         return True
     except Exception as e:
@@ -73,8 +280,8 @@ EduStream Team
             # In debug mode, print to console as fallback
             print(f"\n{'='*50}")
             print(f"Email to: {email}")
-            print(f"Subject: {subject}")
+            print(f"Subject: {_otp_subject(purpose)}")
             print(f"OTP Code: {otp_code}")
             print(f"{'='*50}\n")
             return True  # Return True in debug mode
-        return False
\ No newline at end of file
+        return False
@@ -0,0 +1,187 @@
+"""
+Bounded worker pool for password hash checks.
+
+PBKDF2 is tens of milliseconds of pure CPU per login. Running it on a
+fixed-size pool caps how many cores logins can take, and refusing work
+once MAX_PENDING checks are queued sheds load (HTTP 503) instead of letting
+request workers pile up behind the hasher during a credential-stuffing burst.
+Admin bulk imports hash new passwords on the same pool (make_passwords), so
+they share that cap too.
+"""
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.auth import hashers
+import asyncio
+import os
+import threading
+import time
+
+from edustream.metrics import Counter, register_local
+
+
+class HashPoolSaturated(Exception):
+    """Raised when too many hash checks are already queued"""
+
+
+def init_worker():
+    """ProcessPoolExecutor initializer: hashers read Django settings"""
+    import django
+    django.setup()
+
+
+def _timed_check(password, encoded, enqueued_at):
+    started = time.time()
+    valid = hashers.check_password(password, encoded)
+    return valid, started - enqueued_at, time.time() - started
+
+
+def _timed_hash(password, enqueued_at):
+    started = time.time()
+    encoded = hashers.make_password(password)
+    return encoded, started - enqueued_at, time.time() - started
+
+
+def needs_rehash(encoded):
+    """True when the stored hash uses an outdated hasher or work factor"""
+    preferred = hashers.get_hasher('default')
+    try:
+        hasher = hashers.identify_hasher(encoded)
+    except ValueError:
+        return False
+    return hasher.algorithm != preferred.algorithm or preferred.must_update(encoded)
+
+
+class PasswordHashPool:
+    
+    def __init__(self, kind='thread', workers=None, max_pending=None):
+        self.workers = workers or os.cpu_count() or 2
+        self.max_pending = max_pending or self.workers * 8
+        if kind == 'process':
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker)
+        else:
+            # hashlib.pbkdf2_hmac releases the GIL, so threads hash in parallel
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='pw-hash')
+        self.kind = kind
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._stats = {'completed': 0, 'rejected': 0, 'wait_seconds': 0.0, 'hash_seconds': 0.0}
+    
+    def _reserve(self, limit):
+        with self._lock:
+            if self._pending >= limit:
+                return False
+            self._pending += 1
+            return True
+    
+    def _submit(self, fn, *args):
+        future = self._executor.submit(fn, *args, time.time())
+        future.add_done_callback(self._done)
+        return _ResultFuture(future)
+    
+    def submit(self, password, encoded):
+        """Queue a check; returns a Future resolving to True/False"""
+        if not self._reserve(self.max_pending):
+            with self._lock:
+                self._stats['rejected'] += 1
+            hash_pool_rejected.incr()
+            raise HashPoolSaturated()
+        return self._submit(_timed_check, password, encoded)
+    
+    def make_passwords(self, passwords):
+        """
+        make_password() for each password, for bulk work sharing the pool
+        with logins: at most `workers` hashes in flight and never more than
+        half the queue, waiting for room instead of raising HashPoolSaturated.
+        """
+        results = [None] * len(passwords)
+        in_flight = deque()
+        
+        def collect():
+            index, future = in_flight.popleft()
+            results[index] = future.result()
+        
+        for index, password in enumerate(passwords):
+            if len(in_flight) >= self.workers:
+                collect()
+            while not self._reserve(max(1, self.max_pending // 2)):
+                if in_flight:
+                    collect()
+                else:
+                    time.sleep(0.01)
+            in_flight.append((index, self._submit(_timed_hash, password)))
+        while in_flight:
+            collect()
+        return results
+    
+    def _done(self, future):
+        with self._lock:
+            self._pending -= 1
+            if not future.cancelled() and future.exception() is None:
+                _valid, waited, ran = future.result()
+                self._stats['completed'] += 1
+                self._stats['wait_seconds'] += waited
+                self._stats['hash_seconds'] += ran
+    
+    def check_password(self, password, encoded, timeout=None):
+        return self.submit(password, encoded).result(timeout)
+    
+    async def acheck_password(self, password, encoded):
+        return await self.submit(password, encoded)
+    
+    def stats(self):
+        """This process's pool metrics"""
+        with self._lock:
+            completed = self._stats['completed']
+            return {
+                'kind': self.kind,
+                'workers': self.workers,
+                'max_pending': self.max_pending,
+                'pending': self._pending,
+                'completed': completed,
+                'rejected': self._stats['rejected'],
+                'avg_queue_wait_ms': round(self._stats['wait_seconds'] * 1000 / completed, 2) if completed else 0,
+                'avg_hash_ms': round(self._stats['hash_seconds'] * 1000 / completed, 2) if completed else 0,
+            }
+
+
+class _ResultFuture:
+    """Exposes only the result of a _timed_check/_timed_hash future, not its timings"""
+    
+    def __init__(self, future):
+        self._future = future
+    
+    def result(self, timeout=None):
+        return self._future.result(timeout)[0]
+    
+    def __await__(self):
+        result = yield from asyncio.wrap_future(self._future).__await__()
+        return result[0]
+
+
+hash_pool_rejected = Counter('login_hash_pool.rejected')
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_hash_pool():
+    """This process's pool, built from settings.LOGIN_HASH_POOL on first use"""
+    global _pool, _pool_pid
+    pid = os.getpid()
+    if _pool is None or _pool_pid != pid:
+        with _pool_lock:
+            if _pool is None or _pool_pid != pid:
+                pool_settings = getattr(settings, 'LOGIN_HASH_POOL', {})
+                _pool = PasswordHashPool(
+                    kind=pool_settings.get('KIND', 'thread'),
+                    workers=pool_settings.get('WORKERS'),
+                    max_pending=pool_settings.get('MAX_PENDING'),
+                )
+                _pool_pid = pid
+    return _pool
+
+
+register_local('login_hash_pool.local', lambda: _pool.stats() if _pool else None)
@@ -0,0 +1,97 @@
+import hashlib
+import statistics
+import time
+
+from django.contrib import admin
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import RequestFactory
+
+from accounts.models import User
+from edustream.pagination import estimated_count
+
+SEED_PREFIX = 'benchseed'
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the admin user changelist search and count on Postgres: "
+        "trigram index scans vs forced sequential scans, exact vs estimated counts. "
+        "Optionally seeds N synthetic users first"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0, help='Synthetic users to insert first (e.g. 1000000)')
+        parser.add_argument('--chunk-size', type=int, default=10000)
+        parser.add_argument('--terms', nargs='+', default=['a3f9', 'seed12', 'example.com', '98765'])
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--cleanup', action='store_true', help='Delete the synthetic users afterwards')
+
+    def seed(self, count, chunk_size):
+        encoded = make_password(None)
+        start = User.objects.filter(username__startswith=SEED_PREFIX).count()
+        for offset in range(start, start + count, chunk_size):
+            users = []
+            for i in range(offset, min(offset + chunk_size, start + count)):
+                digest = hashlib.md5(str(i).encode()).hexdigest()
+                users.append(User(
+                    username=f'{SEED_PREFIX}{i}',
+                    email=f'{digest[:10]}.{i}@example.com',
+                    phone_number=f'+9{i:011d}',
+                    first_name=digest[10:18],
+                    last_name=digest[18:26],
+                    password=encoded,
+                    role='student',
+                ))
+            User.objects.bulk_create(users)
+            self.stdout.write(f"  seeded {min(offset + chunk_size, start + count) - start}/{count}")
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {User._meta.db_table}')
+
+    def timed(self, fn, repeat):
+        samples = []
+        result = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = fn()
+            samples.append((time.perf_counter() - started) * 1000)
+        return statistics.median(samples), result
+
+    def changelist_page(self, term):
+        """What the user changelist runs for ?q=term: search, then the first page"""
+        model_admin = admin.site._registry[User]
+        request = RequestFactory().get('/admin/accounts/user/', {'q': term})
+        queryset, _duplicates = model_admin.get_search_results(request, User.objects.all(), term)
+        page = list(queryset.order_by('-created_at').only(*model_admin.changelist_only)[:100])
+        return queryset, page
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError("Trigram indexes and planner estimates need PostgreSQL")
+        if options['seed']:
+            self.seed(options['seed'], options['chunk_size'])
+
+        repeat = options['repeat']
+        self.stdout.write(f"users: {User.objects.count()} rows")
+        self.stdout.write(f"{'term':<14} {'trigram':>10} {'seq scan':>10} {'exact cnt':>10} {'est cnt':>10}  rows (est)")
+        for term in options['terms']:
+            indexed_ms, (queryset, page) = self.timed(lambda: self.changelist_page(term), repeat)
+
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    # What the same query costs without the trigram indexes
+                    cursor.execute('SET LOCAL enable_bitmapscan = off')
+                    cursor.execute('SET LOCAL enable_indexscan = off')
+                seq_ms, _ = self.timed(lambda: self.changelist_page(term), repeat)
+
+            exact_ms, exact = self.timed(queryset.count, repeat)
+            estimate_ms, (estimate, _is_estimate) = self.timed(lambda: estimated_count(queryset, threshold=0), repeat)
+            self.stdout.write(
+                f"{term:<14} {indexed_ms:9.1f}ms {seq_ms:9.1f}ms {exact_ms:9.1f}ms {estimate_ms:9.1f}ms  "
+                f"{exact} ({estimate})"
+            )
+
+        if options['cleanup']:
+            deleted, _ = User.objects.filter(username__startswith=SEED_PREFIX).delete()
+            self.stdout.write(f"Deleted {deleted} synthetic rows")
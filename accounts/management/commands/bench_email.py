@@ -0,0 +1,109 @@
+import socketserver
+import threading
+import time
+
+from django.core.mail import get_connection, send_mail
+from django.core.management.base import BaseCommand
+
+from accounts.email_services import EmailDispatcher, build_otp_email, render_otp_bodies
+
+
+class _SMTPSinkHandler(socketserver.StreamRequestHandler):
+    """Minimal SMTP server that accepts and discards every message"""
+
+    def handle(self):
+        # Model the TLS handshake + AUTH cost paid by every new session
+        time.sleep(self.server.connect_delay)
+        self.wfile.write(b'220 sink ESMTP\r\n')
+        in_data = False
+        for raw in self.rfile:
+            line = raw.rstrip(b'\r\n')
+            if in_data:
+                if line == b'.':
+                    in_data = False
+                    self.server.received += 1
+                    self.wfile.write(b'250 OK queued\r\n')
+                continue
+            verb = line[:4].upper()
+            if verb == b'EHLO':
+                self.wfile.write(b'250-sink\r\n250 8BITMIME\r\n')
+            elif verb == b'DATA':
+                in_data = True
+                self.wfile.write(b'354 End data with <CR><LF>.<CR><LF>\r\n')
+            elif verb == b'QUIT':
+                self.wfile.write(b'221 Bye\r\n')
+                return
+            else:
+                self.wfile.write(b'250 OK\r\n')
+
+
+class _SMTPSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, connect_delay):
+        super().__init__(('127.0.0.1', 0), _SMTPSinkHandler)
+        self.connect_delay = connect_delay
+        self.received = 0
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark OTP email throughput against a local SMTP sink: "
+        "send_mail per message (old behaviour) vs the pooled EmailDispatcher"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=300)
+        parser.add_argument('--connect-ms', type=int, default=30, help='Simulated STARTTLS + AUTH cost')
+        parser.add_argument('--connections', type=int, default=2)
+
+    def handle(self, *args, **options):
+        count = options['messages']
+        sink = _SMTPSink(options['connect_ms'] / 1000)
+        threading.Thread(target=sink.serve_forever, daemon=True).start()
+        connection_kwargs = {
+            'backend': 'django.core.mail.backends.smtp.EmailBackend',
+            'host': '127.0.0.1',
+            'port': sink.server_address[1],
+            'use_tls': False,
+            'username': '',
+            'password': '',
+        }
+
+        try:
+            # Old path: a new connection (connect + STARTTLS + AUTH) per message
+            started = time.perf_counter()
+            for i in range(count):
+                code = str(1000 + i % 9000)
+                plain, html = render_otp_bodies(code)
+                send_mail(
+                    subject='Your OTP for Registration',
+                    message=plain,
+                    from_email='bench@example.com',
+                    recipient_list=[f'user{i}@example.com'],
+                    html_message=html,
+                    connection=get_connection(**connection_kwargs),
+                )
+            before = time.perf_counter() - started
+            self.stdout.write(f"send_mail per message: {count / before:8.1f} msg/s ({before:.2f}s)")
+
+            dispatcher = EmailDispatcher(
+                connections=options['connections'],
+                connection_kwargs=connection_kwargs,
+            )
+            messages = []
+            for i in range(count):
+                message = build_otp_email(f'user{i}@example.com', str(1000 + i % 9000))
+                message.from_email = 'bench@example.com'
+                messages.append(message)
+            started = time.perf_counter()
+            dispatcher.send_many(messages)
+            after = time.perf_counter() - started
+            self.stdout.write(f"pooled dispatcher:     {count / after:8.1f} msg/s ({after:.2f}s)")
+            self.stdout.write(self.style.SUCCESS(
+                f"speedup: {before / after:.1f}x, sink received {sink.received} messages"
+            ))
+        finally:
+            sink.shutdown()
+            sink.server_close()
@@ -0,0 +1,71 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.management.base import BaseCommand
+
+from accounts.hashing import HashPoolSaturated, PasswordHashPool
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark login password checks per second (and per core) under "
+        "concurrent load: inline on request threads vs the bounded hash pool"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=32, help='Simultaneous login requests')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 2, help='Hash pool size')
+        parser.add_argument('--kind', choices=['thread', 'process'], default='thread')
+
+    def report(self, label, count, elapsed, cores, rejected=0):
+        rate = count / elapsed
+        self.stdout.write(
+            f"{label:<24} {rate:8.1f} logins/s  {rate / cores:7.1f} per core  "
+            f"({elapsed:.2f}s, {rejected} shed)"
+        )
+
+    def handle(self, *args, **options):
+        count = options['logins']
+        concurrency = options['concurrency']
+        workers = options['workers']
+        cores = min(workers, os.cpu_count() or 1)
+        encoded = make_password('Benchmark-Passw0rd')
+
+        # Inline: every request thread hashes on its own
+        with ThreadPoolExecutor(max_workers=concurrency) as clients:
+            started = time.perf_counter()
+            list(clients.map(lambda _: check_password('Benchmark-Passw0rd', encoded), range(count)))
+            self.report('inline (request threads)', count, time.perf_counter() - started,
+                        min(concurrency, os.cpu_count() or 1))
+
+        # Sync path through the pool with load shedding disabled
+        pool = PasswordHashPool(kind=options['kind'], workers=workers, max_pending=count)
+        pool.check_password('warm-up', encoded)
+        with ThreadPoolExecutor(max_workers=concurrency) as clients:
+            started = time.perf_counter()
+            list(clients.map(lambda _: pool.check_password('Benchmark-Passw0rd', encoded), range(count)))
+            self.report(f'{options["kind"]} pool (sync)', count, time.perf_counter() - started, cores)
+
+        # Async path: every login in flight at once on one event loop,
+        # with the default shedding threshold
+        shedding_pool = PasswordHashPool(kind=options['kind'], workers=workers)
+
+        async def login():
+            try:
+                return await shedding_pool.acheck_password('Benchmark-Passw0rd', encoded)
+            except HashPoolSaturated:
+                return None
+
+        async def run():
+            return await asyncio.gather(*(login() for _ in range(count)))
+
+        started = time.perf_counter()
+        results = asyncio.run(run())
+        elapsed = time.perf_counter() - started
+        served = sum(1 for r in results if r is not None)
+        self.report(f'{options["kind"]} pool (async)', served, elapsed, cores, count - served)
+        self.stdout.write(str(shedding_pool.stats()))
@@ -0,0 +1,83 @@
+import time
+import uuid
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from accounts.blacklist import REVOCATION_LOG, REVOKED_PREFIX, get_token_blacklist
+from accounts.serializers import ClaimsTokenRefreshSerializer
+from accounts.tokens import ClaimsRefreshToken
+from edustream.redis_client import get_redis
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark refresh-token blacklist checks and token refreshes per second "
+        "against the configured Redis, with and without the Bloom prefilter. "
+        "Refreshes also pay one revoke write each when BLACKLIST_AFTER_ROTATION is on"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--refreshes', type=int, default=2000)
+        parser.add_argument('--revoked', type=int, default=10000, help='Revoked JTIs already in the log')
+
+    def report(self, label, count, elapsed, stats):
+        checked = stats['checked'] if stats else count
+        self.stdout.write(
+            f"{label:<28} {count / elapsed:9.1f}/s  "
+            f"{checked / count:5.3f} blacklist lookups per call"
+        )
+
+    def fresh_token(self):
+        # No user claims, so the refresh serializer doesn't touch the DB
+        token = ClaimsRefreshToken()
+        token['user_id'] = 0
+        self.minted.append(token['jti'])
+        return str(token)
+
+    def handle(self, *args, **options):
+        count = options['refreshes']
+        base = {**settings.TOKEN_BLACKLIST, 'BACKEND': 'accounts.blacklist.RedisTokenBlacklist'}
+
+        # Synthetic revocations expire in a minute and are removed from the log afterwards
+        synthetic = [uuid.uuid4().hex for _ in range(options['revoked'])]
+        with override_settings(TOKEN_BLACKLIST=base):
+            blacklist = get_token_blacklist()
+            for jti in synthetic:
+                blacklist.revoke(jti, time.time() + 60)
+
+        self.minted = []
+        tokens = [self.fresh_token() for _ in range(count * 2)]
+        try:
+            for label, capacity in (('redis lookup', 0), ('bloom prefilter', base['BLOOM_CAPACITY'])):
+                with override_settings(TOKEN_BLACKLIST={**base, 'BLOOM_CAPACITY': capacity}):
+                    blacklist = get_token_blacklist()
+                    blacklist.is_revoked('warm-up')
+                    before = dict(blacklist.stats())
+
+                    started = time.perf_counter()
+                    for jti in (uuid.uuid4().hex for _ in range(count)):
+                        blacklist.is_revoked(jti)
+                    elapsed = time.perf_counter() - started
+                    after = blacklist.stats()
+                    self.report(f'{label} (check)', count, elapsed,
+                                {'checked': after['checked'] - before['checked']})
+
+                    batch, tokens = tokens[:count], tokens[count:]
+                    before = dict(blacklist.stats())
+                    started = time.perf_counter()
+                    for refresh in batch:
+                        serializer = ClaimsTokenRefreshSerializer(data={'refresh': refresh})
+                        serializer.is_valid(raise_exception=True)
+                    elapsed = time.perf_counter() - started
+                    after = blacklist.stats()
+                    self.report(f'{label} (refresh)', count, elapsed,
+                                {'checked': after['checked'] - before['checked']})
+                    self.stdout.write(f"    {after}")
+        finally:
+            # Rotation revoked the benchmark's own tokens too
+            jtis = synthetic + self.minted
+            client = get_redis()
+            client.zrem(REVOCATION_LOG, *jtis)
+            client.delete(*[REVOKED_PREFIX + jti for jti in jtis])
@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.sms_services import FakeTwilioClient, TwilioSMSService
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark SMS throughput offline against the fake Twilio transport: "
+        "a new client per message (old behaviour) vs the pooled send_bulk path"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=200)
+        parser.add_argument('--latency-ms', type=int, default=20, help='Per-request round trip')
+        parser.add_argument('--connect-ms', type=int, default=60, help='Handshake cost of a new connection')
+        parser.add_argument('--concurrency', type=int, default=8)
+
+    def handle(self, *args, **options):
+        count = options['messages']
+        latency_ms = options['latency_ms']
+        connect_ms = options['connect_ms']
+        messages = [(f'+1555000{i:04d}', f'Your OTP is: {1000 + i % 9000}') for i in range(count)]
+
+        # Old path: a fresh service and client (new session) for every message
+        started = time.perf_counter()
+        opened = 0
+        for phone_number, body in messages:
+            client = FakeTwilioClient(latency_ms, connect_ms)
+            TwilioSMSService(client=client, max_concurrency=1).send_sms(phone_number, body)
+            opened += client.connections_opened
+        per_call = time.perf_counter() - started
+        self.stdout.write(
+            f"per-call client: {count / per_call:8.1f} msg/s "
+            f"({per_call:.2f}s, {opened} connections)"
+        )
+
+        # New path: one pooled client, concurrent bulk send
+        client = FakeTwilioClient(latency_ms, connect_ms)
+        service = TwilioSMSService(client=client, max_concurrency=options['concurrency'])
+        started = time.perf_counter()
+        results = service.send_bulk(messages)
+        pooled = time.perf_counter() - started
+        failed = sum(1 for r in results if not r['success'])
+        self.stdout.write(
+            f"pooled bulk:     {count / pooled:8.1f} msg/s "
+            f"({pooled:.2f}s, {client.connections_opened} connections, {failed} failed)"
+        )
+        self.stdout.write(self.style.SUCCESS(f"speedup: {per_call / pooled:.1f}x"))
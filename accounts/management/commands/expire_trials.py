@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from accounts.tasks import process_expired_trials
+
+
+class Command(BaseCommand):
+    help = "Delete or deactivate students whose trial expired without a purchase"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--action', choices=['delete', 'deactivate'], default=None)
+
+    def handle(self, *args, **options):
+        stats = process_expired_trials(batch_size=options['batch_size'], action=options['action'])
+        if stats is None:
+            self.stdout.write(self.style.WARNING("Trial expiry is already running on another node"))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"{stats['action']}: {stats['processed']} expired trials in "
+            f"{stats['batches']} batches ({stats['elapsed_seconds']}s)"
+        ))
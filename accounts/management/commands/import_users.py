@@ -0,0 +1,56 @@
+from concurrent.futures import ProcessPoolExecutor
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+import json
+import os
+import sys
+
+from accounts.bulk_import import FORMATS, BulkImporter, detect_format, read_rows
+from accounts.hashing import init_worker
+
+
+class Command(BaseCommand):
+    help = "Bulk import teachers or students from a CSV or JSONL file ('-' reads stdin)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--role', choices=['teacher', 'student'], required=True)
+        parser.add_argument('--format', choices=FORMATS, default=None,
+                            help='Defaults to the file extension, else csv')
+        parser.add_argument('--chunk-size', type=int, default=None)
+        parser.add_argument('--workers', type=int, default=None, help='Password hashing processes')
+        parser.add_argument('--errors', default=None, help='Write the per-row error report here as JSONL')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or detect_format(path)
+        workers = (options['workers'] or getattr(settings, 'BULK_IMPORT', {}).get('HASH_WORKERS')
+                   or os.cpu_count() or 1)
+        # A dedicated pool: this process has all its cores to itself
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=init_worker) if workers > 1 else None
+        importer = BulkImporter(options['role'], chunk_size=options['chunk_size'], executor=executor)
+
+        try:
+            if path == '-':
+                report = importer.run(read_rows(sys.stdin, fmt))
+            else:
+                with open(path, encoding='utf-8-sig', newline='') as stream:
+                    report = importer.run(read_rows(stream, fmt))
+        except OSError as e:
+            raise CommandError(f"Cannot read {path}: {e}")
+        finally:
+            if executor:
+                executor.shutdown()
+
+        if options['errors']:
+            with open(options['errors'], 'w') as out:
+                for error in report['errors']:
+                    out.write(json.dumps(error) + '\n')
+        else:
+            for error in report['errors']:
+                self.stderr.write(f"Row {error['row']}: {json.dumps(error['errors'])}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {report['created']} of {report['total']} {options['role']} rows; "
+            f"{report['failed']} failed"
+        ))
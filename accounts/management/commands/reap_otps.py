@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from accounts.tasks import purge_expired_otps
+
+
+class Command(BaseCommand):
+    help = "Delete expired OTP rows in bounded primary-key chunks"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=None)
+        parser.add_argument('--max-chunks', type=int, default=None)
+        parser.add_argument('--pause', type=float, default=None, help='Seconds to sleep between chunks')
+
+    def handle(self, *args, **options):
+        stats = purge_expired_otps(
+            chunk_size=options['chunk_size'],
+            max_chunks=options['max_chunks'],
+            pause=options['pause'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {stats['deleted']} expired OTPs in {stats['elapsed_seconds']}s "
+            f"({stats['rows_per_second']} rows/s); {stats['remaining']} remaining"
+        ))
@@ -1,5 +1,7 @@
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import DEFAULT_DB_ALIAS, models, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.utils import timezone
 from django.conf import settings
 from datetime import timedelta
@@ -7,6 +9,8 @@ from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator, MaxValueValidator
 import random
 
+from edustream.indexes import trigram_index
+
 
 class User(AbstractUser):
     ROLE_CHOICES = (
@@ -25,12 +29,41 @@ class User(AbstractUser):
 
     trial_end_date = models.DateTimeField(null=True, blank=True)
     has_purchased_courses = models.BooleanField(default=False)
+    # Denormalized from completed CourseSubscriptions; kept current by
+    # CourseSubscription.save and rebuilt by repair_purchase_counters
+    purchased_courses_count = models.PositiveIntegerField(default=0)
+    purchased_course_ids = models.JSONField(default=list, blank=True)
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username']
     
     class Meta:
         db_table = 'users'
+        indexes = [
+            # Drives the scheduled trial-expiry job
+            models.Index(
+                fields=['trial_end_date'],
+                condition=models.Q(role='student', has_purchased_courses=False),
+                name='users_trial_expiry_idx',
+            ),
+            # Keyset pagination of the admin teacher/student listings
+            models.Index(
+                fields=['created_at', 'id'],
+                condition=models.Q(role='teacher'),
+                name='users_teacher_created_idx',
+            ),
+            models.Index(
+                fields=['created_at', 'id'],
+                condition=models.Q(role='student'),
+                name='users_student_created_idx',
+            ),
+            # CustomUserAdmin.search_fields
+            trigram_index('email', 'users_email_trgm'),
+            trigram_index('username', 'users_username_trgm'),
+            trigram_index('first_name', 'users_first_name_trgm'),
+            trigram_index('last_name', 'users_last_name_trgm'),
+            trigram_index('phone_number', 'users_phone_trgm'),
+        ]
         
     def __str__(self):
         return f"{self.email} - {self.role}"
@@ -43,18 +76,23 @@ class User(AbstractUser):
         # Set trial end date only for new students
         if not self.pk and not self.trial_end_date and self.role == 'student':
             # Set trial end date only for students on registration
-            trial_settings = getattr(settings, 'TRIAL_SETTINGS', {})
-            if trial_settings.get('TEST_MODE', True):
-                # Use minutes for testing
-                duration = timedelta(minutes=trial_settings.get('TRIAL_DURATION_MINUTES', 5))
-            else:
-                # Use days for production
-                duration = timedelta(days=trial_settings.get('TRIAL_DURATION_MINUTES', 5))
-            
-            self.trial_end_date = timezone.now() + duration
+            self.trial_end_date = self.new_trial_end_date()
         
         super().save(*args, **kwargs)
     
+    @staticmethod
+    def new_trial_end_date():
+        """Trial end for a student registering now (also used by bulk import)"""
+        trial_settings = getattr(settings, 'TRIAL_SETTINGS', {})
+        if trial_settings.get('TEST_MODE', True):
+            # Use minutes for testing
+            duration = timedelta(minutes=trial_settings.get('TRIAL_DURATION_MINUTES', 5))
+        else:
+            # Use days for production
+            duration = timedelta(days=trial_settings.get('TRIAL_DURATION_DAYS', 2))
+        
+        return timezone.now() + duration
+    
     @property
     def is_admin(self):
         return self.role == 'admin'
@@ -99,6 +137,78 @@ class User(AbstractUser):
         return int(time_remaining.total_seconds())
 
 
+class ClaimsUser(User):
+    """
+    User built from signed JWT claims (see accounts.tokens).
+    
+    Only id and the claim fields are populated; every other field is
+    deferred, and touching any of them loads the whole row in one query.
+    Saving writes claim fields only if they were changed on the instance.
+    """
+    
+    class Meta:
+        proxy = True
+    
+    @classmethod
+    def from_claims(cls, user_id, token):
+        from .tokens import field_values_from_claims
+        
+        # Tokens are only issued to active users, and deactivation revokes them
+        values = {'id': user_id, 'is_active': True, **field_values_from_claims(token)}
+        fields = [f.attname for f in cls._meta.concrete_fields if f.attname in values]
+        user = cls.from_db(DEFAULT_DB_ALIAS, fields, [values[name] for name in fields])
+        user._claim_values = {name: values[name] for name in fields if name != 'id'}
+        return user
+    
+    def refresh_from_db(self, using=None, fields=None):
+        deferred = self.get_deferred_fields()
+        if deferred and (fields is None or set(fields) <= deferred):
+            # First lazy access: load every deferred field at once, plus the
+            # claim fields not modified locally so they reflect the database
+            claim_values = getattr(self, '_claim_values', {})
+            fields = list(deferred) + [
+                name for name, value in claim_values.items()
+                if getattr(self, name) == value
+            ]
+        try:
+            super().refresh_from_db(using, fields)
+        except User.DoesNotExist:
+            # Deleted since the token was issued (and its revocation marker lost)
+            from rest_framework.exceptions import AuthenticationFailed
+            raise AuthenticationFailed('User not found', code='user_not_found')
+    
+    def save(self, *args, **kwargs):
+        claim_values = getattr(self, '_claim_values', None)
+        if claim_values and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                f.attname for f in self._meta.concrete_fields
+                if not f.primary_key
+                and f.attname not in deferred
+                and not (f.attname in claim_values and getattr(self, f.attname) == claim_values[f.attname])
+            ]
+            if not kwargs['update_fields']:
+                return
+        super().save(*args, **kwargs)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=ClaimsUser)
+def _revoke_inactive_user_tokens(sender, instance, **kwargs):
+    if not instance.is_active:
+        from .tokens import revoke_user_tokens
+        user_id = instance.pk
+        transaction.on_commit(lambda: revoke_user_tokens(user_id))
+
+
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=ClaimsUser)
+def _revoke_deleted_user_tokens(sender, instance, **kwargs):
+    from .tokens import revoke_user_tokens
+    user_id = instance.pk
+    transaction.on_commit(lambda: revoke_user_tokens(user_id))
+
+
 class TeacherProfile(models.Model):
     """Extended profile for teachers with professional information"""
     user = models.OneToOneField(
@@ -112,6 +222,8 @@ class TeacherProfile(models.Model):
     specialization = models.JSONField(default=list, help_text="List of subjects/areas of expertise")
     bio = models.TextField(blank=True, help_text="Brief professional biography")
     profile_picture = models.ImageField(upload_to='teacher_profiles/', null=True, blank=True)
+    # Resized variants of profile_picture, maintained by edustream.images
+    profile_picture_variants = models.JSONField(default=dict, blank=True, editable=False)
     linkedin_url = models.URLField(blank=True)
     resume = models.FileField(upload_to='teacher_resumes/', null=True, blank=True)
     is_verified = models.BooleanField(default=False, help_text="Verified by admin")
@@ -153,6 +265,11 @@ class OTP(models.Model):
         db_table = 'otps'
         indexes = [
             models.Index(fields=['identifier', 'otp_type', 'purpose']),
+            # Drives the expired-OTP reaper
+            models.Index(fields=['expires_at']),
+            # OTPAdmin.search_fields
+            trigram_index('identifier', 'otps_identifier_trgm'),
+            trigram_index('otp_code', 'otps_otp_code_trgm'),
         ]
     
     def save(self, *args, **kwargs):
@@ -169,3 +286,20 @@ class OTP(models.Model):
     
     def __str__(self):
         return f"{self.identifier} - {self.otp_type} - {self.purpose}"
+
+
+class OTPDeliveryFailure(models.Model):
+    """Dead-letter record for OTP deliveries that exhausted their retries"""
+    identifier = models.CharField(max_length=255)
+    otp_type = models.CharField(max_length=10, choices=OTP.OTP_TYPE_CHOICES)
+    purpose = models.CharField(max_length=20, choices=OTP.PURPOSE_CHOICES)
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'otp_delivery_failures'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.identifier} - {self.otp_type} - {self.attempts} attempts"
@@ -0,0 +1,338 @@
+"""
+Pluggable OTP storage.
+
+The configured backend (settings.OTP_BACKEND) issues, verifies and consumes
+OTP codes. RedisOTPBackend keeps codes in Redis with a native TTL and does
+verify-and-consume in a single Lua round-trip; CacheOTPBackend works with any
+Django cache (locmem in tests); DatabaseOTPBackend is the original OTP table.
+"""
+
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import setting_changed
+from django.db.models import Q
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from functools import lru_cache
+import secrets
+
+# verify() results
+VALID = 'valid'
+INVALID = 'invalid'
+EXPIRED = 'expired'
+LOCKED = 'locked'
+
+
+def generate_otp_code():
+    return str(1000 + secrets.randbelow(9000))
+
+
+class BaseOTPBackend:
+    """
+    Interface shared by all OTP backends.
+    
+    A code is issued as "pending". verify() turns a matching pending code into
+    a "verified" marker (used by registration), consume() accepts a matching
+    pending or verified code exactly once (used by password reset).
+    """
+    
+    @property
+    def expiry_seconds(self):
+        return getattr(settings, 'OTP_EXPIRY_MINUTES', 5) * 60
+    
+    @property
+    def verified_expiry_seconds(self):
+        return getattr(settings, 'OTP_VERIFIED_EXPIRY_MINUTES', 30) * 60
+    
+    @property
+    def max_attempts(self):
+        return getattr(settings, 'OTP_MAX_VERIFY_ATTEMPTS', 5)
+    
+    def issue(self, identifier, otp_type, purpose):
+        """Store a new code and return it"""
+        raise NotImplementedError
+    
+    def verify(self, identifier, otp_type, purpose, otp_code):
+        """Mark a pending code verified. Returns VALID, INVALID, EXPIRED or LOCKED"""
+        raise NotImplementedError
+    
+    def is_verified(self, identifier, otp_type, purpose):
+        raise NotImplementedError
+    
+    def consume(self, identifier, otp_type, purpose, otp_code):
+        """Accept a pending or verified code once. Returns VALID, INVALID, EXPIRED or LOCKED"""
+        raise NotImplementedError
+    
+    def clear(self, identifier, otp_type, purpose):
+        """Forget every code and marker for this identifier"""
+        raise NotImplementedError
+    
+    def verified_many(self, items):
+        """Subset of (identifier, otp_type, purpose) triples that are verified"""
+        return {item for item in items if self.is_verified(*item)}
+    
+    def clear_many(self, items):
+        for item in items:
+            self.clear(*item)
+
+
+def _key(kind, identifier, otp_type, purpose):
+    return f'otp:{kind}:{purpose}:{otp_type}:{identifier}'
+
+
+class CacheOTPBackend(BaseOTPBackend):
+    """OTPs in the Django cache with TTL = OTP_EXPIRY_MINUTES"""
+    
+    def _attempts_exceeded(self, attempts_key):
+        return (cache.get(attempts_key) or 0) >= self.max_attempts
+    
+    def _record_failure(self, attempts_key):
+        cache.add(attempts_key, 0, self.expiry_seconds)
+        try:
+            cache.incr(attempts_key)
+        except ValueError:
+            pass  # expired between add and incr
+    
+    def issue(self, identifier, otp_type, purpose):
+        otp_code = generate_otp_code()
+        cache.set(_key('pending', identifier, otp_type, purpose), otp_code, self.expiry_seconds)
+        return otp_code
+    
+    def verify(self, identifier, otp_type, purpose, otp_code):
+        pending_key = _key('pending', identifier, otp_type, purpose)
+        attempts_key = _key('attempts', identifier, otp_type, purpose)
+        values = cache.get_many([pending_key, attempts_key])
+        if (values.get(attempts_key) or 0) >= self.max_attempts:
+            return LOCKED
+        # delete() reports whether this caller removed the key, so only one
+        # concurrent verifier can win
+        if values.get(pending_key) != otp_code or not cache.delete(pending_key):
+            self._record_failure(attempts_key)
+            return INVALID
+        cache.set(_key('verified', identifier, otp_type, purpose), otp_code, self.verified_expiry_seconds)
+        cache.delete(attempts_key)
+        return VALID
+    
+    def is_verified(self, identifier, otp_type, purpose):
+        return cache.get(_key('verified', identifier, otp_type, purpose)) is not None
+    
+    def consume(self, identifier, otp_type, purpose, otp_code):
+        attempts_key = _key('attempts', identifier, otp_type, purpose)
+        if self._attempts_exceeded(attempts_key):
+            return LOCKED
+        for kind in ('pending', 'verified'):
+            key = _key(kind, identifier, otp_type, purpose)
+            if cache.get(key) == otp_code and cache.delete(key):
+                self.clear(identifier, otp_type, purpose)
+                return VALID
+        self._record_failure(attempts_key)
+        return INVALID
+    
+    def clear(self, identifier, otp_type, purpose):
+        self.clear_many([(identifier, otp_type, purpose)])
+    
+    def verified_many(self, items):
+        keys = {_key('verified', *item): item for item in items}
+        return {keys[key] for key in cache.get_many(list(keys))}
+    
+    def clear_many(self, items):
+        cache.delete_many([
+            _key(kind, *item)
+            for item in items
+            for kind in ('pending', 'verified', 'attempts')
+        ])
+
+
+# KEYS: pending, verified, attempts   ARGV: code, max_attempts, attempts_ttl, verified_ttl
+_VERIFY_SCRIPT = """
+if tonumber(redis.call('GET', KEYS[3]) or '0') >= tonumber(ARGV[2]) then
+    return 'locked'
+end
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    if redis.call('INCR', KEYS[3]) == 1 then
+        redis.call('EXPIRE', KEYS[3], ARGV[3])
+    end
+    return 'invalid'
+end
+redis.call('DEL', KEYS[1], KEYS[3])
+redis.call('SET', KEYS[2], ARGV[1], 'EX', ARGV[4])
+return 'valid'
+"""
+
+# KEYS: pending, verified, attempts   ARGV: code, max_attempts, attempts_ttl
+_CONSUME_SCRIPT = """
+if tonumber(redis.call('GET', KEYS[3]) or '0') >= tonumber(ARGV[2]) then
+    return 'locked'
+end
+if redis.call('GET', KEYS[1]) == ARGV[1] or redis.call('GET', KEYS[2]) == ARGV[1] then
+    redis.call('DEL', KEYS[1], KEYS[2], KEYS[3])
+    return 'valid'
+end
+if redis.call('INCR', KEYS[3]) == 1 then
+    redis.call('EXPIRE', KEYS[3], ARGV[3])
+end
+return 'invalid'
+"""
+
+
+class RedisOTPBackend(BaseOTPBackend):
+    """
+    OTPs in Redis with native TTL. verify() and consume() are Lua scripts, so
+    checking, consuming and counting attempts is one atomic round-trip.
+    """
+    
+    def __init__(self):
+        from edustream.redis_client import get_redis
+        self._get_redis = get_redis
+        self._scripts = {}
+    
+    def _run(self, name, source, keys, args):
+        client = self._get_redis()
+        script = self._scripts.get((name, id(client)))
+        if script is None:
+            script = self._scripts[(name, id(client))] = client.register_script(source)
+        return script(keys=keys, args=args)
+    
+    def _keys(self, identifier, otp_type, purpose):
+        return [
+            _key(kind, identifier, otp_type, purpose)
+            for kind in ('pending', 'verified', 'attempts')
+        ]
+    
+    def issue(self, identifier, otp_type, purpose):
+        otp_code = generate_otp_code()
+        self._get_redis().set(
+            _key('pending', identifier, otp_type, purpose), otp_code, ex=self.expiry_seconds
+        )
+        return otp_code
+    
+    def verify(self, identifier, otp_type, purpose, otp_code):
+        return self._run('verify', _VERIFY_SCRIPT, self._keys(identifier, otp_type, purpose), [
+            otp_code, self.max_attempts, self.expiry_seconds, self.verified_expiry_seconds,
+        ])
+    
+    def is_verified(self, identifier, otp_type, purpose):
+        return bool(self._get_redis().exists(_key('verified', identifier, otp_type, purpose)))
+    
+    def consume(self, identifier, otp_type, purpose, otp_code):
+        return self._run('consume', _CONSUME_SCRIPT, self._keys(identifier, otp_type, purpose), [
+            otp_code, self.max_attempts, self.expiry_seconds,
+        ])
+    
+    def clear(self, identifier, otp_type, purpose):
+        self._get_redis().delete(*self._keys(identifier, otp_type, purpose))
+    
+    def verified_many(self, items):
+        items = list(items)
+        values = self._get_redis().mget([_key('verified', *item) for item in items])
+        return {item for item, value in zip(items, values) if value is not None}
+    
+    def clear_many(self, items):
+        self._get_redis().delete(*[key for item in items for key in self._keys(*item)])
+
+
+class DatabaseOTPBackend(CacheOTPBackend):
+    """
+    Original storage: one OTP row per issued code. Attempt counters still
+    live in the cache since the table has no column for them.
+    """
+    
+    def _latest(self, identifier, otp_type, purpose, otp_code, **filters):
+        from .models import OTP
+        return OTP.objects.filter(
+            identifier=identifier,
+            otp_type=otp_type,
+            purpose=purpose,
+            otp_code=otp_code,
+            **filters
+        ).order_by('-created_at').first()
+    
+    def issue(self, identifier, otp_type, purpose):
+        from .models import OTP
+        otp = OTP.objects.create(
+            identifier=identifier,
+            otp_type=otp_type,
+            purpose=purpose,
+            otp_code=generate_otp_code()
+        )
+        return otp.otp_code
+    
+    def verify(self, identifier, otp_type, purpose, otp_code):
+        attempts_key = _key('attempts', identifier, otp_type, purpose)
+        if self._attempts_exceeded(attempts_key):
+            return LOCKED
+        otp = self._latest(identifier, otp_type, purpose, otp_code, is_verified=False)
+        if not otp:
+            self._record_failure(attempts_key)
+            return INVALID
+        if otp.is_expired:
+            return EXPIRED
+        otp.is_verified = True
+        otp.save(update_fields=['is_verified'])
+        cache.delete(attempts_key)
+        return VALID
+    
+    def is_verified(self, identifier, otp_type, purpose):
+        from .models import OTP
+        return OTP.objects.filter(
+            identifier=identifier,
+            otp_type=otp_type,
+            purpose=purpose,
+            is_verified=True,
+            created_at__gte=timezone.now() - timedelta(seconds=self.verified_expiry_seconds)
+        ).exists()
+    
+    def consume(self, identifier, otp_type, purpose, otp_code):
+        attempts_key = _key('attempts', identifier, otp_type, purpose)
+        if self._attempts_exceeded(attempts_key):
+            return LOCKED
+        otp = self._latest(identifier, otp_type, purpose, otp_code)
+        if not otp:
+            self._record_failure(attempts_key)
+            return INVALID
+        if otp.is_expired:
+            return EXPIRED
+        self.clear(identifier, otp_type, purpose)
+        return VALID
+    
+    def clear(self, identifier, otp_type, purpose):
+        self.clear_many([(identifier, otp_type, purpose)])
+    
+    def _match_any(self, items):
+        query = Q()
+        for identifier, otp_type, purpose in items:
+            query |= Q(identifier=identifier, otp_type=otp_type, purpose=purpose)
+        return query
+    
+    def verified_many(self, items):
+        from .models import OTP
+        items = list(items)
+        if not items:
+            return set()
+        return set(OTP.objects.filter(
+            self._match_any(items),
+            is_verified=True,
+            created_at__gte=timezone.now() - timedelta(seconds=self.verified_expiry_seconds)
+        ).values_list('identifier', 'otp_type', 'purpose').distinct())
+    
+    def clear_many(self, items):
+        from .models import OTP
+        items = list(items)
+        if not items:
+            return
+        # No cascades or signals on OTP, so this is a single DELETE
+        OTP.objects.filter(self._match_any(items)).delete()
+        cache.delete_many([_key('attempts', *item) for item in items])
+
+
+@lru_cache(maxsize=None)
+def get_otp_backend():
+    return import_string(settings.OTP_BACKEND)()
+
+
+@receiver(setting_changed)
+def _reset_otp_backend(setting, **kwargs):
+    if setting == 'OTP_BACKEND':
+        get_otp_backend.cache_clear()
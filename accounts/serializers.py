@@ -1,7 +1,17 @@
 from rest_framework import serializers
-from django.contrib.auth import authenticate
-from .models import User, TeacherProfile, OTP
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from .models import User, TeacherProfile
+from .hashing import get_hash_pool, needs_rehash
+from . import otp_backends
+from .otp_backends import get_otp_backend
+from .tokens import ClaimsRefreshToken, has_user_claims
+from edustream.images import variant_urls
+from django.contrib.auth.signals import user_login_failed
+from django.db import IntegrityError, transaction
 from django.db.models import Q
+import re
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -12,69 +22,117 @@ class UserSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'date_joined', 'email_verified', 'phone_verified']
 
 
+class UserListFilterSerializer(serializers.Serializer):
+    """Query parameters accepted by the admin teacher/student listings"""
+    verified = serializers.BooleanField(required=False, allow_null=True, default=None)
+    purchased = serializers.BooleanField(required=False, allow_null=True, default=None)
+    trial_expiring_before = serializers.DateTimeField(required=False)
+
+    def filter_queryset(self, queryset):
+        filters = self.validated_data
+        if filters['verified'] is True:
+            queryset = queryset.filter(email_verified=True, phone_verified=True)
+        elif filters['verified'] is False:
+            queryset = queryset.filter(Q(email_verified=False) | Q(phone_verified=False))
+        if filters['purchased'] is not None:
+            queryset = queryset.filter(has_purchased_courses=filters['purchased'])
+        if 'trial_expiring_before' in filters:
+            queryset = queryset.filter(
+                has_purchased_courses=False,
+                trial_end_date__lt=filters['trial_expiring_before'],
+            )
+        return queryset
+
+
+UNIQUE_FIELD_ERRORS = {
+    'username': "Username already taken",
+    'email': "Email already registered",
+    'phone_number': "Phone number already registered",
+}
+
+
+def violated_unique_columns(error):
+    """
+    Columns of the unique constraint an IntegrityError violated. Postgres
+    reports the constraint name (its message also echoes the submitted
+    values, so it can't be searched); SQLite only says
+    "UNIQUE constraint failed: users.<column>".
+    """
+    table = User._meta.db_table
+    constraint = getattr(getattr(error.__cause__, 'diag', None), 'constraint_name', None)
+    if constraint:
+        # Django's names: <table>_<column>_key inline, <table>_<column>_<hash>_uniq when altered
+        return [
+            column for column in UNIQUE_FIELD_ERRORS
+            if re.fullmatch(rf'{table}_{column}(_key|_[0-9a-f]{{8}}_uniq)', constraint)
+        ]
+    _, found, columns = str(error).partition('UNIQUE constraint failed: ')
+    if not found:
+        return []
+    return [
+        column for qualified in columns.split(', ')
+        for found_table, _, column in [qualified.strip().partition('.')]
+        if found_table == table
+    ]
+
+
+def unique_violation_errors(error):
+    """
+    Map an IntegrityError from inserting a user to field errors. Uniqueness
+    is enforced by the users table constraints rather than pre-check queries.
+    """
+    for column in violated_unique_columns(error):
+        if column in UNIQUE_FIELD_ERRORS:
+            return {column: [UNIQUE_FIELD_ERRORS[column]]}
+    raise error
+
+
 class RegisterSerializer(serializers.Serializer):
+    """
+    Student registration. The happy path is one OTP lookup for both
+    identifiers, then one atomic block with a single INSERT (one password
+    hash) and a single OTP delete. See accounts.tests for the budget.
+    """
     username = serializers.CharField(max_length=150)
     email = serializers.EmailField()
     phone_number = serializers.CharField(max_length=15)
     password = serializers.CharField(write_only=True, min_length=8)
 
-    def validate_email(self, value):
-        if User.objects.filter(email=value).exists():
-            raise serializers.ValidationError("Email already registered")
-        return value
-    
-    def validate_phone_number(self, value):
-        if User.objects.filter(phone_number=value).exists():
-            raise serializers.ValidationError("Phone number already registered")
-        return value
-    
+    def _otp_items(self, attrs):
+        return [
+            (attrs['email'], 'email', 'registration'),
+            (attrs['phone_number'], 'phone', 'registration'),
+        ]
+
     def validate(self, attrs):
-        email = attrs['email']
-        phone_number = attrs['phone_number']
-
-        # Check for verified OTPs for email and phone
-        if not OTP.objects.filter(
-            identifier=email,
-            otp_type='email',
-            purpose='registration',
-            is_verified=True
-        ).exists():
+        email_otp, phone_otp = self._otp_items(attrs)
+
+        # Check for verified OTPs for email and phone in one lookup
+        verified = get_otp_backend().verified_many([email_otp, phone_otp])
+        if email_otp not in verified:
             raise serializers.ValidationError("Email OTP not verified")
 
-        if not OTP.objects.filter(
-            identifier=phone_number,
-            otp_type='phone',
-            purpose='registration',
-            is_verified=True
-        ).exists():
+        if phone_otp not in verified:
             raise serializers.ValidationError("Phone OTP not verified")
 
         return attrs
     
     def create(self, validated_data):
-        password = validated_data.pop('password')
-        
-        user = User.objects.create_user(
-            **validated_data,
-            role='student',
-            email_verified=True,
-            phone_verified=True
-        )
-        user.set_password(password)
-        user.save()
-        
-        # Optional: Invalidate or delete the used OTPs to prevent reuse
-        OTP.objects.filter(
-            identifier=validated_data['email'],
-            otp_type='email',
-            purpose='registration'
-        ).delete()
+        otp_items = self._otp_items(validated_data)
         
-        OTP.objects.filter(
-            identifier=validated_data['phone_number'],
-            otp_type='phone',
-            purpose='registration'
-        ).delete()
+        try:
+            with transaction.atomic():
+                # create_user hashes the password once and inserts once
+                user = User.objects.create_user(
+                    **validated_data,
+                    role='student',
+                    email_verified=True,
+                    phone_verified=True
+                )
+                # Invalidate the used OTPs to prevent reuse
+                get_otp_backend().clear_many(otp_items)
+        except IntegrityError as e:
+            raise serializers.ValidationError(unique_violation_errors(e))
         
         return user
 
@@ -97,15 +155,13 @@ class TeacherCreateSerializer(serializers.ModelSerializer):
         return value
     
     def create(self, validated_data):
-        password = validated_data.pop('password')
+        # create_user hashes the password once and inserts once
         user = User.objects.create_user(
             **validated_data,
             role='teacher',
             email_verified=True,  # Teachers are pre-verified by admin
             phone_verified=True
         )
-        user.set_password(password)
-        user.save()
         return user
 
 
@@ -134,6 +190,42 @@ class ChangePasswordSerializer(serializers.Serializer):
         return user
 
 
+PHONE_PATTERN = re.compile(r'^[\+]?[0-9]{10,15}$')
+
+
+def identifier_lookup(identifier):
+    """
+    Map a login identifier to a single indexed column lookup instead of
+    OR-ing email, phone_number and username.
+    """
+    if '@' in identifier:
+        return {'email': identifier}
+    if PHONE_PATTERN.match(identifier):
+        return {'phone_number': identifier}
+    return {'username': identifier}
+
+
+def login_failed(identifier, request=None):
+    """
+    Logins check passwords on the hash pool instead of authenticate(), so
+    send the user_login_failed signal it would have (password left out).
+    """
+    user_login_failed.send(sender=__name__, credentials={'identifier': identifier}, request=request)
+
+
+def check_login_password(user, password):
+    """
+    Verify a password on the bounded hash pool (raises HashPoolSaturated
+    when the pool is full) and upgrade the stored hash if it is outdated.
+    """
+    if not get_hash_pool().check_password(password, user.password):
+        return False
+    if needs_rehash(user.password):
+        user.set_password(password)
+        user.save(update_fields=['password'])
+    return True
+
+
 class LoginSerializer(serializers.Serializer):
     identifier = serializers.CharField()
     password = serializers.CharField()
@@ -145,14 +237,15 @@ class LoginSerializer(serializers.Serializer):
         if not identifier or not password:
             raise serializers.ValidationError('Must include "identifier" and "password".')
 
-        user = None
+        request = self.context.get('request')
         try:
-            user_obj = User.objects.get(Q(email=identifier) | Q(phone_number=identifier) | Q(username=identifier))
-            user = authenticate(username=user_obj.email, password=password)
+            user = User.objects.get(**identifier_lookup(identifier))
         except User.DoesNotExist:
+            login_failed(identifier, request)
             raise serializers.ValidationError('Invalid credentials.')
 
-        if not user:
+        if not check_login_password(user, password):
+            login_failed(identifier, request)
             raise serializers.ValidationError('Invalid credentials.')
         
         if not user.is_active:
@@ -215,25 +308,97 @@ class ForgotPasswordSerializer(serializers.Serializer):
             except User.DoesNotExist:
                 raise serializers.ValidationError("User not found")
         
-        # Verify OTP - Allow both verified (from verify-otp step) and unverified OTPs
-        otp = OTP.objects.filter(
-            identifier=identifier,
-            otp_type=identifier_type,
-            purpose='password_reset',
-            otp_code=attrs['otp_code']
-        ).order_by('-created_at').first()
+        # Consume OTP - Allow both verified (from verify-otp step) and unverified OTPs
+        result = get_otp_backend().consume(
+            identifier, identifier_type, 'password_reset', attrs['otp_code']
+        )
+        
+        if result == otp_backends.LOCKED:
+            raise serializers.ValidationError("Too many failed attempts. Please request a new OTP later.")
         
-        if not otp or otp.is_expired:
+        if result != otp_backends.VALID:
             raise serializers.ValidationError("Invalid or expired OTP")
         
         attrs['user'] = user
-        attrs['otp'] = otp
         return attrs
 
 
 class TeacherProfileSerializer(serializers.ModelSerializer):
+    profile_picture_variants = serializers.SerializerMethodField()
+    
     class Meta:
         model = TeacherProfile
         fields = ['qualification', 'experience_years', 'specialization', 'bio', 
-        'profile_picture', 'linkedin_url', 'resume', 'is_verified', 'teaching_languages']
+        'profile_picture', 'profile_picture_variants', 'linkedin_url', 'resume', 'is_verified', 'teaching_languages']
+    
+    def get_profile_picture_variants(self, obj):
+        """Variant URLs by format and width; null until they have been generated"""
+        return variant_urls(obj, 'profile_picture', 'profile_picture_variants', self.context.get('request'))
 
+
+
+
+class BulkStudentRowSerializer(serializers.Serializer):
+    """
+    One row of a bulk import. Plain serializer on purpose: uniqueness is
+    checked per chunk by accounts.bulk_import, not with a query per row.
+    """
+    username = serializers.CharField(max_length=150)
+    email = serializers.EmailField()
+    phone_number = serializers.CharField(max_length=15)
+    password = serializers.CharField(write_only=True, min_length=8)
+    first_name = serializers.CharField(max_length=150, required=False, allow_blank=True, default='')
+    last_name = serializers.CharField(max_length=150, required=False, allow_blank=True, default='')
+
+
+class BulkTeacherRowSerializer(BulkStudentRowSerializer):
+    qualification = serializers.CharField(max_length=200, required=False, allow_blank=True, default='')
+    experience_years = serializers.IntegerField(min_value=0, max_value=50, required=False, default=0)
+    specialization = serializers.ListField(child=serializers.CharField(), required=False, default=list)
+    bio = serializers.CharField(required=False, allow_blank=True, default='')
+    linkedin_url = serializers.URLField(required=False, allow_blank=True, default='')
+    teaching_languages = serializers.ListField(child=serializers.CharField(), required=False, default=list)
+
+
+class BulkImportSerializer(serializers.Serializer):
+    file = serializers.FileField()
+    role = serializers.ChoiceField(choices=['teacher', 'student'])
+    format = serializers.ChoiceField(choices=['csv', 'jsonl'], required=False)
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Token refresh that re-reads the user's claims, so a refreshed access
+    token never carries role/purchase/trial state older than one refresh.
+    """
+    token_class = ClaimsRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        if has_user_claims(refresh):
+            try:
+                user = User.objects.only(
+                    'id', 'role', 'has_purchased_courses', 'trial_end_date',
+                    'email_verified', 'phone_verified', 'is_active'
+                ).get(id=refresh['user_id'])
+            except User.DoesNotExist:
+                raise serializers.ValidationError('User not found')
+            if not user.is_active:
+                raise serializers.ValidationError('User account is disabled.')
+            refresh.update_claims(user)
+        
+        data = {'access': str(refresh.access_token)}
+        
+        if jwt_settings.ROTATE_REFRESH_TOKENS:
+            # revoke() is atomic, so a replayed token loses the race here
+            # even if this process's Bloom filter hasn't seen it yet
+            if jwt_settings.BLACKLIST_AFTER_ROTATION and not refresh.blacklist():
+                raise TokenError('Token is blacklisted')
+            
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            
+            data['refresh'] = str(refresh)
+        
+        return data
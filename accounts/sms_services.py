@@ -2,55 +2,128 @@
 SMS Service Integration using Twilio
 """
 
+from concurrent.futures import ThreadPoolExecutor
 from django.conf import settings
+import itertools
 import logging
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
 
-class TwilioSMSService:
-    """Twilio SMS Service Integration"""
+def _sms_setting(name, default):
+    return getattr(settings, 'SMS_SERVICE', {}).get(name, default)
+
+
+class BaseSMSService:
+    """
+    Shared bulk-send behaviour. Subclasses implement _send(), which returns
+    the provider message id and raises on failure.
+    """
     
-    def __init__(self):
-        try:
-            from twilio.rest import Client
-            self.account_sid = settings.TWILIO_ACCOUNT_SID
-            self.auth_token = settings.TWILIO_AUTH_TOKEN
-            self.from_number = settings.TWILIO_PHONE_NUMBER
-            self.client = Client(self.account_sid, self.auth_token)
-        except ImportError:
-            logger.error("Twilio not installed. Run: pip install twilio")
-            raise
-        except Exception as e:
-            logger.error(f"Failed to initialize Twilio: {str(e)}")
-            raise
+    def __init__(self, max_concurrency=None):
+        self.max_concurrency = max_concurrency or _sms_setting('MAX_CONCURRENT_SENDS', 8)
+        # Caps in-flight sends across every thread using this process-wide instance
+        self._in_flight = threading.BoundedSemaphore(self.max_concurrency)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+    
+    def _send(self, phone_number, message):
+        raise NotImplementedError
+    
+    def _deliver(self, phone_number, message):
+        with self._in_flight:
+            try:
+                sid = self._send(phone_number, message)
+                return {'phone_number': phone_number, 'success': True, 'sid': sid, 'error': None}
+            except Exception as e:
+                logger.error(f"Failed to send SMS to {phone_number}: {str(e)}")
+                return {'phone_number': phone_number, 'success': False, 'sid': None, 'error': str(e)}
     
     def send_sms(self, phone_number, message):
         """
-        Send SMS using Twilio
+        Send a single SMS
         Args:
             phone_number: Phone number with country code (e.g., +1234567890)
             message: SMS message text
         Returns:
             Boolean indicating success/failure
         """
+        return self._deliver(phone_number, message)['success']
+    
+    def send_bulk(self, messages):
+        """
+        Send many SMS concurrently over the shared connection pool
+        Args:
+            messages: iterable of (phone_number, message) pairs
+        Returns:
+            List of per-message status dicts, in input order:
+            {'phone_number', 'success', 'sid', 'error'}
+        """
+        messages = list(messages)
+        if not messages:
+            return []
+        
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_concurrency,
+                    thread_name_prefix='sms-send'
+                )
+        
+        results = list(self._executor.map(lambda m: self._deliver(*m), messages))
+        failed = sum(1 for r in results if not r['success'])
+        logger.info(f"Bulk SMS: {len(results) - failed} sent, {failed} failed")
+        return results
+
+
+class TwilioSMSService(BaseSMSService):
+    """Twilio SMS Service Integration"""
+    
+    def __init__(self, client=None, max_concurrency=None):
+        super().__init__(max_concurrency)
+        self.account_sid = settings.TWILIO_ACCOUNT_SID
+        self.auth_token = settings.TWILIO_AUTH_TOKEN
+        self.from_number = settings.TWILIO_PHONE_NUMBER
+        
+        if client is not None:
+            self.client = client
+            return
+        
         try:
-            message = self.client.messages.create(
-                body=message,
-                from_=self.from_number,
-                to=phone_number
+            from twilio.rest import Client
+            from twilio.http.http_client import TwilioHttpClient
+            from requests.adapters import HTTPAdapter
+            
+            # One keep-alive session per process, sized to the concurrency cap
+            http_client = TwilioHttpClient(
+                pool_connections=True,
+                timeout=_sms_setting('HTTP_TIMEOUT_SECONDS', 10)
             )
-            logger.info(f"SMS sent successfully to {phone_number}. SID: {message.sid}")
-            return True
+            http_client.session.mount('https://', HTTPAdapter(pool_maxsize=self.max_concurrency))
+            self.client = Client(self.account_sid, self.auth_token, http_client=http_client)
+        except ImportError:
+            logger.error("Twilio not installed. Run: pip install twilio")
+            raise
         except Exception as e:
-            logger.error(f"Failed to send SMS to {phone_number}: {str(e)}")
-            return False
+            logger.error(f"Failed to initialize Twilio: {str(e)}")
+            raise
+    
+    def _send(self, phone_number, message):
+        result = self.client.messages.create(
+            body=message,
+            from_=self.from_number,
+            to=phone_number
+        )
+        logger.info(f"SMS sent successfully to {phone_number}. SID: {result.sid}")
+        return result.sid
 
 
-class ConsoleSMSService:
+class ConsoleSMSService(BaseSMSService):
     """Mock SMS service that prints to console (for development)"""
     
-    def send_sms(self, phone_number, message):
+    def _send(self, phone_number, message):
         """
         Print SMS to console for development testing
         """
@@ -59,21 +132,82 @@ class ConsoleSMSService:
         print(f"Message: {message}")
         print(f"{'='*50}\n")
         logger.info(f"SMS printed to console for {phone_number}")
-        return True
+        return None
 
 
-def get_sms_service():
+class FakeTwilioClient:
     """
-    Factory function to get the configured SMS service
-    Returns Twilio in production, Console in development
+    Offline stand-in for twilio.rest.Client used for benchmarking.
+    
+    Each request sleeps for latency_ms. A request that cannot reuse an idle
+    connection also pays connect_ms, which models the TCP + TLS handshake a
+    freshly constructed client performs.
     """
+    
+    def __init__(self, latency_ms=20, connect_ms=60):
+        self.latency = latency_ms / 1000
+        self.connect = connect_ms / 1000
+        self.connections_opened = 0
+        self._idle = 0
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.messages = self
+    
+    def create(self, body, from_, to):
+        with self._lock:
+            if self._idle:
+                self._idle -= 1
+                handshake = False
+            else:
+                self.connections_opened += 1
+                handshake = True
+        time.sleep(self.latency + (self.connect if handshake else 0))
+        with self._lock:
+            self._idle += 1
+        
+        class _Message:
+            sid = f'SMFAKE{next(self._ids)}'
+        return _Message()
+
+
+_sms_service = None
+_sms_service_lock = threading.Lock()
+
+
+def _build_sms_service():
+    backend = _sms_setting('BACKEND', '')
+    
+    if backend == 'fake':
+        return TwilioSMSService(client=FakeTwilioClient())
+    
     # Use Twilio if credentials are configured
-    if hasattr(settings, 'TWILIO_ACCOUNT_SID') and settings.TWILIO_ACCOUNT_SID:
+    if backend != 'console' and getattr(settings, 'TWILIO_ACCOUNT_SID', ''):
         try:
             return TwilioSMSService()
         except Exception as e:
             logger.warning(f"Failed to initialize Twilio, falling back to console: {str(e)}")
             return ConsoleSMSService()
-    else:
-        # Use console service in development
-        return ConsoleSMSService()
\ No newline at end of file
+    
+    # Use console service in development
+    return ConsoleSMSService()
+
+
+def get_sms_service():
+    """
+    Return the process-wide SMS service, building it on first use.
+    Returns Twilio in production, Console in development and the fake
+    transport when SMS_SERVICE['BACKEND'] is 'fake'.
+    """
+    global _sms_service
+    if _sms_service is None:
+        with _sms_service_lock:
+            if _sms_service is None:
+                _sms_service = _build_sms_service()
+    return _sms_service
+
+
+def reset_sms_service():
+    """Drop the cached service (after settings change in tests)"""
+    global _sms_service
+    with _sms_service_lock:
+        _sms_service = None
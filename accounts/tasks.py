@@ -0,0 +1,250 @@
+"""
+Background tasks for the accounts app
+"""
+
+from celery import Task, shared_task, states
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+import logging
+import time
+
+from edustream.locks import cache_lock
+from edustream.metrics import Counter, Timer
+from .tokens import revoke_user_tokens
+
+logger = logging.getLogger(__name__)
+
+OTP_DELIVERY_SETTINGS = getattr(settings, 'OTP_DELIVERY', {})
+
+otp_queue_depth = Counter('otp_delivery.queue_depth')
+otp_delivered = Counter('otp_delivery.delivered')
+otp_retried = Counter('otp_delivery.retried')
+otp_dead_lettered = Counter('otp_delivery.dead_lettered')
+otp_delivery_latency = Timer('otp_delivery.latency')
+otp_reaped = Counter('otp_reaper.deleted')
+trials_expired = Counter('trial_expiry.processed')
+
+
+class OTPDeliveryError(Exception):
+    """Raised when the email/SMS gateway did not accept the message"""
+
+
+class OTPDeliveryTask(Task):
+    """Keeps queue metrics current and dead-letters jobs that ran out of retries"""
+
+    def on_retry(self, exc, task_id, args, kwargs, einfo):
+        otp_retried.incr()
+        logger.warning(f"Retrying OTP delivery to {kwargs.get('identifier')}: {str(exc)}")
+
+    def on_failure(self, exc, task_id, args, kwargs, einfo):
+        from .models import OTPDeliveryFailure
+
+        otp_dead_lettered.incr()
+        logger.error(f"OTP delivery to {kwargs.get('identifier')} failed permanently: {str(exc)}")
+        try:
+            OTPDeliveryFailure.objects.create(
+                identifier=kwargs.get('identifier', ''),
+                otp_type=kwargs.get('otp_type', ''),
+                purpose=kwargs.get('purpose', ''),
+                attempts=self.request.retries + 1,
+                error=str(exc)[:1000],
+            )
+        except Exception as e:
+            logger.error(f"Failed to record dead-lettered OTP delivery: {str(e)}")
+
+    def after_return(self, status, retval, task_id, args, kwargs, einfo):
+        # A retry re-enqueues the same job, so it is still part of the backlog
+        if status != states.RETRY:
+            otp_queue_depth.decr()
+
+
+@shared_task(
+    bind=True,
+    base=OTPDeliveryTask,
+    autoretry_for=(OTPDeliveryError,),
+    max_retries=OTP_DELIVERY_SETTINGS.get('MAX_RETRIES', 5),
+    retry_backoff=OTP_DELIVERY_SETTINGS.get('RETRY_BACKOFF_SECONDS', 2),
+    retry_backoff_max=OTP_DELIVERY_SETTINGS.get('RETRY_BACKOFF_MAX_SECONDS', 60),
+    retry_jitter=True,
+    acks_late=True,
+)
+def deliver_otp(self, identifier, otp_type, purpose, otp_code, enqueued_at=None):
+    """Send an OTP over email or SMS, raising OTPDeliveryError so Celery retries"""
+    if otp_type == 'email':
+        from .email_services import send_otp_email
+        sent = send_otp_email(identifier, otp_code, purpose)
+    else:
+        from .sms_services import get_sms_service
+        message = f'Your OTP for {purpose.replace("_", " ").title()} is: {otp_code}\nValid for 10 minutes.'
+        sent = get_sms_service().send_sms(identifier, message)
+
+    if not sent:
+        raise OTPDeliveryError(f"{otp_type} gateway rejected OTP for {identifier}")
+
+    otp_delivered.incr()
+    if enqueued_at:
+        otp_delivery_latency.observe(time.time() - enqueued_at)
+    return True
+
+
+def enqueue_otp_delivery(identifier, otp_type, purpose, otp_code):
+    """
+    Queue OTP delivery once the surrounding transaction commits, so workers
+    never pick up a code whose OTP row was rolled back.
+    """
+    def _enqueue():
+        otp_queue_depth.incr()
+        try:
+            deliver_otp.apply_async(kwargs={
+                'identifier': identifier,
+                'otp_type': otp_type,
+                'purpose': purpose,
+                'otp_code': otp_code,
+                'enqueued_at': time.time(),
+            })
+        except Exception as e:
+            otp_queue_depth.decr()
+            logger.error(f"Failed to enqueue OTP delivery for {identifier}: {str(e)}")
+            raise
+
+    transaction.on_commit(_enqueue)
+
+
+def expired_otps():
+    """
+    OTP rows nobody can use any more: unverified codes past expires_at, and
+    verified codes older than the window in which /register/ accepts them.
+    """
+    from .models import OTP
+
+    now = timezone.now()
+    verified_window = timedelta(minutes=getattr(settings, 'OTP_VERIFIED_EXPIRY_MINUTES', 30))
+    return OTP.objects.filter(
+        Q(expires_at__lt=now, is_verified=False) |
+        Q(expires_at__lt=now - verified_window)
+    )
+
+
+def purge_expired_otps(chunk_size=None, max_chunks=None, pause=None):
+    """
+    Delete expired OTP rows in bounded primary-key chunks so no single
+    statement holds locks for long. Returns deleted/elapsed/rate/backlog stats.
+    """
+    from .models import OTP
+
+    reaper_settings = getattr(settings, 'OTP_REAPER', {})
+    chunk_size = chunk_size or reaper_settings.get('CHUNK_SIZE', 5000)
+    max_chunks = max_chunks or reaper_settings.get('MAX_CHUNKS', 200)
+    pause = reaper_settings.get('PAUSE_SECONDS', 0.05) if pause is None else pause
+
+    started = time.monotonic()
+    deleted = 0
+    for chunk in range(max_chunks):
+        ids = list(expired_otps().values_list('pk', flat=True)[:chunk_size])
+        if not ids:
+            break
+        count, _ = OTP.objects.filter(pk__in=ids).delete()
+        deleted += count
+        otp_reaped.incr(count)
+        if len(ids) < chunk_size:
+            break
+        if pause:
+            time.sleep(pause)
+
+    elapsed = time.monotonic() - started
+    stats = {
+        'deleted': deleted,
+        'elapsed_seconds': round(elapsed, 3),
+        'rows_per_second': round(deleted / elapsed, 1) if elapsed else 0,
+        'remaining': expired_otps().count(),
+    }
+    logger.info(
+        f"[OTP-REAPER] Deleted {stats['deleted']} rows in {stats['elapsed_seconds']}s "
+        f"({stats['rows_per_second']} rows/s), {stats['remaining']} remaining"
+    )
+    return stats
+
+
+@shared_task(ignore_result=True)
+def reap_expired_otps():
+    """Scheduled by CELERY_BEAT_SCHEDULE"""
+    return purge_expired_otps()
+
+
+def expired_trial_users():
+    from .models import User
+
+    return User.objects.filter(
+        role='student',
+        has_purchased_courses=False,
+        is_active=True,
+        trial_end_date__isnull=False,
+        trial_end_date__lt=timezone.now()
+    )
+
+
+def process_expired_trials(batch_size=None, action=None):
+    """
+    Delete (or deactivate) students whose trial ended without a purchase.
+    
+    Users are handled batch_size primary keys at a time; each batch is one
+    transaction whose cascades (subscriptions, attendances, profiles) are
+    collected with set-based IN queries instead of per-user deletes.
+    Returns counts and timings, or None when another node holds the lock.
+    """
+    from .models import User
+
+    trial_settings = getattr(settings, 'TRIAL_SETTINGS', {})
+    if not trial_settings.get('ENABLE_AUTO_DELETION', True):
+        logger.info("[TRIAL-EXPIRY] Auto deletion disabled, skipping")
+        return {'processed': 0, 'batches': 0, 'elapsed_seconds': 0, 'action': 'disabled'}
+
+    batch_size = batch_size or trial_settings.get('EXPIRY_BATCH_SIZE', 500)
+    action = action or trial_settings.get('EXPIRY_ACTION', 'delete')
+
+    with cache_lock('expire-trials', timeout=trial_settings.get('EXPIRY_LOCK_SECONDS', 600)) as acquired:
+        if not acquired:
+            logger.info("[TRIAL-EXPIRY] Another node is running the job, skipping")
+            return None
+
+        started = time.monotonic()
+        processed = 0
+        batches = 0
+        while True:
+            ids = list(expired_trial_users().order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                break
+            with transaction.atomic():
+                if action == 'deactivate':
+                    User.objects.filter(pk__in=ids).update(is_active=False)
+                    # update() sends no post_save; deletes revoke through post_delete
+                    transaction.on_commit(lambda ids=ids: revoke_user_tokens(*ids))
+                else:
+                    User.objects.filter(pk__in=ids).delete()
+            processed += len(ids)
+            batches += 1
+            trials_expired.incr(len(ids))
+            if len(ids) < batch_size:
+                break
+
+    stats = {
+        'processed': processed,
+        'batches': batches,
+        'elapsed_seconds': round(time.monotonic() - started, 3),
+        'action': action,
+    }
+    if processed:
+        logger.info(
+            f"[TRIAL-EXPIRY] {action}: {processed} expired trials in "
+            f"{batches} batches, {stats['elapsed_seconds']}s"
+        )
+    return stats
+
+
+@shared_task(ignore_result=True)
+def expire_trials():
+    """Scheduled by CELERY_BEAT_SCHEDULE"""
+    return process_expired_trials()
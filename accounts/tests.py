@@ -1,3 +1,314 @@
-from django.test import TestCase
+from datetime import timedelta
+from types import SimpleNamespace
+import threading
+from django.conf import settings
+from django.contrib.auth.signals import user_login_failed
+from django.core import mail
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.mail import EmailMessage
+from django.core.cache import cache
+from django.db import IntegrityError
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from .models import User, OTP
+from .email_services import EmailDispatcher
+from .hashing import PasswordHashPool
+from .otp_backends import get_otp_backend
+from .serializers import unique_violation_errors
+from .tasks import process_expired_trials
+from .throttling import get_throttle_backend
+from .tokens import tokens_for_user
 
-# Create your tests here.
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE, OTP_BACKEND='accounts.otp_backends.CacheOTPBackend')
+class RegisterQueryCountTests(TestCase):
+    """
+    Registration must stay at one INSERT inside one atomic block; uniqueness
+    comes from the table constraints, not exists() pre-checks.
+    """
+    email = 'student@example.com'
+    phone_number = '+919876543210'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('accounts:register')
+        cache.clear()
+
+    def verify_otps(self, email=None, phone_number=None):
+        backend = get_otp_backend()
+        for identifier, otp_type in ((email or self.email, 'email'),
+                                     (phone_number or self.phone_number, 'phone')):
+            code = backend.issue(identifier, otp_type, 'registration')
+            backend.verify(identifier, otp_type, 'registration', code)
+
+    def register(self, **overrides):
+        data = {
+            'username': 'student',
+            'email': self.email,
+            'phone_number': self.phone_number,
+            'password': 'Secret123',
+            **overrides,
+        }
+        return self.client.post(self.url, data, format='json')
+
+    def test_register_cache_backend_query_count(self):
+        self.verify_otps()
+        # SAVEPOINT, INSERT, RELEASE
+        with self.assertNumQueries(3):
+            response = self.register()
+        self.assertEqual(response.status_code, 201)
+        user = User.objects.get(email=self.email)
+        self.assertTrue(user.check_password('Secret123'))
+        self.assertTrue(user.email_verified and user.phone_verified)
+        self.assertFalse(get_otp_backend().verified_many([
+            (self.email, 'email', 'registration'),
+            (self.phone_number, 'phone', 'registration'),
+        ]))
+
+    @override_settings(OTP_BACKEND='accounts.otp_backends.DatabaseOTPBackend')
+    def test_register_database_backend_query_count(self):
+        self.verify_otps()
+        # SELECT verified OTPs, SAVEPOINT, INSERT, DELETE OTPs, RELEASE
+        with self.assertNumQueries(5):
+            response = self.register()
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(OTP.objects.exists())
+
+    def test_register_duplicate_email_keeps_otps(self):
+        User.objects.create_user(username='existing', email=self.email,
+                                 phone_number='+910000000000', password='Secret123')
+        self.verify_otps()
+        response = self.register()
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['email'], ['Email already registered'])
+        self.assertEqual(len(get_otp_backend().verified_many([
+            (self.email, 'email', 'registration'),
+            (self.phone_number, 'phone', 'registration'),
+        ])), 2)
+
+    def test_register_duplicate_phone_number(self):
+        User.objects.create_user(username='existing', email='other@example.com',
+                                 phone_number=self.phone_number, password='Secret123')
+        self.verify_otps()
+        response = self.register()
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['phone_number'], ['Phone number already registered'])
+
+    def test_register_requires_verified_otps(self):
+        response = self.register()
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(User.objects.exists())
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class ClaimsTokenRevocationTests(TestCase):
+    """Claims authentication never loads is_active; deleting or deactivating must still cut access"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='student', email='student@example.com',
+                                             phone_number='+919876543210', password='Secret123')
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens_for_user(self.user)['access']}")
+        self.url = reverse('accounts:profile')
+
+    def test_token_works_while_active(self):
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_deleted_user(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_deleted_user_without_marker(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+        cache.clear()
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_deactivated_user(self):
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    @override_settings(TRIAL_SETTINGS={'EXPIRY_ACTION': 'deactivate'})
+    def test_expired_trial_deactivated(self):
+        User.objects.filter(pk=self.user.pk).update(trial_end_date=timezone.now() - timedelta(days=1))
+        with self.captureOnCommitCallbacks(execute=True):
+            process_expired_trials()
+        self.assertFalse(User.objects.get(pk=self.user.pk).is_active)
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+
+@override_settings(CACHES=LOCMEM_CACHE, TRIAL_SETTINGS={
+    'TEST_MODE': False, 'TRIAL_DURATION_DAYS': 2, 'TRIAL_DURATION_MINUTES': 0, 'EXPIRY_ACTION': 'delete',
+})
+class TrialDurationTests(TestCase):
+
+    def test_production_trial_lasts_days(self):
+        user = User.objects.create_user(username='student', email='student@example.com',
+                                        phone_number='+919876543210', password='Secret123')
+        self.assertGreater(user.trial_end_date, timezone.now() + timedelta(days=1, hours=23))
+        process_expired_trials()
+        self.assertTrue(User.objects.filter(pk=user.pk).exists())
+
+
+class UniqueViolationErrorsTests(SimpleTestCase):
+    """Errors are mapped by constraint, never by the submitted values echoed in the message"""
+
+    def postgres_error(self, constraint, detail):
+        error = IntegrityError(f'duplicate key value violates unique constraint "{constraint}"\nDETAIL:  {detail}')
+        # Django chains the driver's exception, which carries psycopg2's diagnostics
+        cause = Exception()
+        cause.diag = SimpleNamespace(constraint_name=constraint)
+        error.__cause__ = cause
+        return error
+
+    def test_postgres_email_containing_other_column_names(self):
+        error = self.postgres_error(
+            'users_email_key', 'Key (email)=(username.phone_number@example.com) already exists.',
+        )
+        self.assertEqual(unique_violation_errors(error), {'email': ['Email already registered']})
+
+    def test_postgres_altered_constraint_name(self):
+        error = self.postgres_error('users_username_6821ab7c_uniq', 'Key (username)=(email) already exists.')
+        self.assertEqual(unique_violation_errors(error), {'username': ['Username already taken']})
+
+    def test_sqlite_message(self):
+        error = IntegrityError('UNIQUE constraint failed: users.phone_number')
+        self.assertEqual(unique_violation_errors(error), {'phone_number': ['Phone number already registered']})
+
+    def test_other_constraint_is_reraised(self):
+        error = self.postgres_error('teacher_profiles_user_id_key', 'Key (user_id)=(1) already exists.')
+        with self.assertRaises(IntegrityError):
+            unique_violation_errors(error)
+
+
+LOGIN_THROTTLES = {
+    'BACKEND': 'accounts.throttling.MemorySlidingWindowBackend',
+    'RATES': {'login.ip': '3/min'},
+}
+
+
+@override_settings(AUTH_THROTTLES=LOGIN_THROTTLES)
+class IPThrottleTests(TestCase):
+    """The IP bucket can't be reset by sending a different X-Forwarded-For each time"""
+
+    def login(self, number, forwarded_for):
+        return self.client.post(
+            reverse('accounts:login'),
+            {'identifier': f'user{number}@example.com', 'password': 'wrong-password'},
+            format='json', HTTP_X_FORWARDED_FOR=forwarded_for, REMOTE_ADDR='203.0.113.7',
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        get_throttle_backend().reset()
+
+    def test_spoofed_header_without_proxies(self):
+        statuses = [self.login(number, f'198.51.100.{number}').status_code for number in range(4)]
+        self.assertNotIn(429, statuses[:3])
+        self.assertEqual(statuses[3], 429)
+
+    @override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'NUM_PROXIES': 1})
+    def test_only_the_trusted_hop_counts(self):
+        # The client-written entries change; the one our proxy appended doesn't
+        statuses = [self.login(number, f'198.51.100.{number}, 192.0.2.1').status_code for number in range(4)]
+        self.assertEqual(statuses[3], 429)
+        self.assertNotEqual(self.login(5, '192.0.2.2').status_code, 429)
+
+
+@override_settings(CACHES=LOCMEM_CACHE, AUTH_THROTTLES=LOGIN_THROTTLES)
+class AsyncLoginTests(TestCase):
+    """The async login takes the same input as LoginView and reports failures the same way"""
+
+    def setUp(self):
+        self.url = reverse('accounts:login_async')
+        get_throttle_backend().reset()
+
+    def post(self, body):
+        return self.client.post(self.url, body, content_type='application/json')
+
+    def test_malformed_bodies(self):
+        for body in ([], ['identifier'], {'identifier': ['a@example.com'], 'password': 'x'},
+                     {'identifier': {'email': 'a'}, 'password': 'x'}, {'identifier': 'a@example.com'}):
+            with self.subTest(body=body):
+                self.assertEqual(self.post(body).status_code, 400)
+
+    def test_number_identifier_is_a_string(self):
+        self.assertEqual(self.post({'identifier': 5, 'password': 'x'}).json(), {'error': 'Invalid credentials'})
+
+    def test_failure_signal(self):
+        received = []
+
+        def receiver(sender, credentials, **kwargs):
+            received.append(credentials)
+
+        user_login_failed.connect(receiver)
+        self.addCleanup(user_login_failed.disconnect, receiver)
+        self.post({'identifier': 'nobody@example.com', 'password': 'x'})
+        self.assertEqual(received, [{'identifier': 'nobody@example.com'}])
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class BulkImportHashingTests(TestCase):
+    """Uploads hash on the shared login pool and leave room in its queue for logins"""
+
+    def test_make_passwords_leaves_login_capacity(self):
+        pool = PasswordHashPool(workers=2, max_pending=4)
+        passwords = [f'Secret{number}23' for number in range(7)]
+        encoded = pool.make_passwords(passwords)
+        self.assertTrue(all(pool.check_password(password, hashed) for password, hashed in zip(passwords, encoded)))
+        self.assertEqual(pool.stats()['rejected'], 0)
+
+    def test_upload(self):
+        admin = User.objects.create_user(username='admin', email='admin@example.com',
+                                         phone_number='+919876543200', password='Secret123', role='admin')
+        client = APIClient()
+        client.force_authenticate(admin)
+        upload = SimpleUploadedFile('students.csv', (
+            'username,email,phone_number,password\n'
+            'ana,ana@example.com,+919876543201,Secret123\n'
+            'ben,ben@example.com,+919876543202,Secret456\n'
+        ).encode())
+        response = client.post(reverse('accounts:bulk_import'), {'file': upload, 'role': 'student'})
+        self.assertEqual(response.json()['created'], 2)
+        self.assertTrue(User.objects.get(username='ben').check_password('Secret456'))
+
+
+class BlockingMessage(EmailMessage):
+    """Holds its sender thread until released"""
+
+    def __init__(self, release, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.release = release
+        self.sending = threading.Event()
+
+    def message(self):
+        self.sending.set()
+        self.release.wait(5)
+        return super().message()
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class EmailDispatcherTimeoutTests(SimpleTestCase):
+    """A send that times out while still queued is withdrawn, so the caller's retry is the only delivery"""
+
+    def test_timed_out_message_is_not_sent_later(self):
+        dispatcher = EmailDispatcher(connections=1, batch_size=1)
+        release = threading.Event()
+        first = BlockingMessage(release, 'first', to=['a@example.com'])
+        blocker = threading.Thread(target=dispatcher.send, args=(first,))
+        blocker.start()
+        first.sending.wait(5)
+        with self.assertRaises(TimeoutError):
+            dispatcher.send(EmailMessage('second', to=['b@example.com']), timeout=0.1)
+        release.set()
+        blocker.join()
+        dispatcher.send(EmailMessage('third', to=['c@example.com']))
+        self.assertEqual([message.subject for message in mail.outbox], ['first', 'third'])
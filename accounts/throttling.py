@@ -0,0 +1,207 @@
+"""
+Sliding-window throttles for the public auth endpoints.
+
+Each check is O(1): counts for the current and previous fixed windows are
+blended by how far into the current window we are (the "sliding window
+counter" approximation). Throttles run in APIView.initial(), before the
+serializer, password hashing or any SMS/email gateway call.
+
+Rates live in settings.AUTH_THROTTLES['RATES'] keyed "<view scope>.<kind>",
+e.g. "send_otp.ip"; a missing rate disables that throttle.
+"""
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from functools import lru_cache
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+import hashlib
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """'5/min' -> (5, 60)"""
+    num, period = rate.split('/')
+    return int(num), _PERIODS[period[0]]
+
+
+def _window_state(now, window):
+    index = int(now // window)
+    elapsed_fraction = (now % window) / window
+    return index, elapsed_fraction
+
+
+def _retry_after(limit, window, current, previous, elapsed_fraction):
+    """Seconds until the blended count drops below the limit"""
+    if current >= limit or not previous:
+        return window * (1 - elapsed_fraction)
+    # previous * (1 - f) + current < limit  =>  f > 1 - (limit - current) / previous
+    needed = 1 - (limit - current) / previous
+    return max(0.0, (needed - elapsed_fraction) * window)
+
+
+class MemorySlidingWindowBackend:
+    """Per-process counters, for tests and single-process development"""
+    
+    def __init__(self):
+        self._counts = {}
+        self._lock = threading.Lock()
+    
+    def hit(self, key, limit, window):
+        """Count a request if allowed. Returns (allowed, retry_after_seconds)"""
+        index, fraction = _window_state(time.time(), window)
+        with self._lock:
+            current = self._counts.get((key, index), 0)
+            previous = self._counts.get((key, index - 1), 0)
+            if previous * (1 - fraction) + current >= limit:
+                return False, _retry_after(limit, window, current, previous, fraction)
+            self._counts[(key, index)] = current + 1
+            # Drop windows that can no longer contribute
+            for stale in [k for k in self._counts if k[0] == key and k[1] < index - 1]:
+                del self._counts[stale]
+        return True, 0
+    
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+
+# KEYS: current window, previous window   ARGV: limit, window seconds, elapsed fraction
+_HIT_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+if previous * (1 - tonumber(ARGV[3])) + current >= tonumber(ARGV[1]) then
+    return {0, current, previous}
+end
+redis.call('INCR', KEYS[1])
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[2]) * 2)
+return {1, current + 1, previous}
+"""
+
+
+class RedisSlidingWindowBackend:
+    """Counters shared by every process; one Lua round-trip per check"""
+    
+    def __init__(self):
+        from edustream.redis_client import get_redis
+        self._get_redis = get_redis
+        self._scripts = {}
+    
+    def hit(self, key, limit, window):
+        index, fraction = _window_state(time.time(), window)
+        client = self._get_redis()
+        script = self._scripts.get(id(client))
+        if script is None:
+            script = self._scripts[id(client)] = client.register_script(_HIT_SCRIPT)
+        allowed, current, previous = script(
+            keys=[f'{key}:{index}', f'{key}:{index - 1}'],
+            args=[limit, window, fraction],
+        )
+        if allowed:
+            return True, 0
+        return False, _retry_after(limit, window, int(current), int(previous), fraction)
+
+
+@lru_cache(maxsize=None)
+def get_throttle_backend():
+    return import_string(settings.AUTH_THROTTLES['BACKEND'])()
+
+
+@receiver(setting_changed)
+def _reset_throttle_backend(setting, **kwargs):
+    if setting == 'AUTH_THROTTLES':
+        get_throttle_backend.cache_clear()
+
+
+def client_ip(request):
+    """
+    Client address for IP throttles (DRF or Django request). Only the last
+    NUM_PROXIES X-Forwarded-For entries were written by our own proxies;
+    anything before them is whatever the client sent.
+    """
+    num_proxies = api_settings.NUM_PROXIES
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+    if num_proxies and forwarded:
+        addrs = [addr.strip() for addr in forwarded.split(',') if addr.strip()]
+        if addrs:
+            return addrs[-min(num_proxies, len(addrs))]
+    return request.META.get('REMOTE_ADDR')
+
+
+def hit_throttle(scope, kind, value):
+    """
+    Count one request against "<scope>.<kind>" for the given ident value.
+    Returns (allowed, retry_after_seconds). Usable outside DRF views.
+    """
+    rate = settings.AUTH_THROTTLES['RATES'].get(f'{scope}.{kind}')
+    if not rate or not value:
+        return True, None
+    
+    limit, window = parse_rate(rate)
+    digest = hashlib.sha1(str(value).strip().lower().encode()).hexdigest()
+    try:
+        return get_throttle_backend().hit(f'throttle:{scope}.{kind}:{digest}', limit, window)
+    except Exception as e:
+        # Fail open: an unavailable Redis must not take auth down
+        logger.warning(f"Throttle backend unavailable for {scope}.{kind}: {str(e)}")
+        return True, None
+
+
+class SlidingWindowThrottle(BaseThrottle):
+    """
+    Base class. Subclasses set `kind` and implement get_ident_value(); the
+    rate is looked up as "<view.throttle_scope>.<kind>".
+    """
+    kind = None
+    
+    def get_ident_value(self, request, view):
+        raise NotImplementedError
+    
+    def allow_request(self, request, view):
+        scope = getattr(view, 'throttle_scope', view.__class__.__name__)
+        allowed, self.retry_after = hit_throttle(
+            scope, self.kind, self.get_ident_value(request, view)
+        )
+        if not allowed:
+            logger.info(f"Throttled {scope}.{self.kind} request from {client_ip(request)}")
+        return allowed
+    
+    def wait(self):
+        return self.retry_after
+
+
+class IPRateThrottle(SlidingWindowThrottle):
+    kind = 'ip'
+    
+    def get_ident_value(self, request, view):
+        return client_ip(request)
+
+
+class IdentifierRateThrottle(SlidingWindowThrottle):
+    """Keyed by the email/phone/username the request targets"""
+    kind = 'identifier'
+    
+    def get_ident_value(self, request, view):
+        try:
+            return request.data.get('identifier')
+        except Exception:
+            return None
+
+
+class PurposeRateThrottle(SlidingWindowThrottle):
+    """Global cap per OTP purpose (e.g. all password_reset sends), protects gateway spend"""
+    kind = 'purpose'
+    
+    def get_ident_value(self, request, view):
+        try:
+            return request.data.get('purpose')
+        except Exception:
+            return None
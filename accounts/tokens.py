@@ -0,0 +1,106 @@
+"""
+JWTs that carry the user fields read on every request (role, purchase and
+trial state, verification flags) as signed claims, so authentication can
+build the user without a database query.
+"""
+
+from django.core.cache import cache
+from django.utils.dateparse import parse_datetime
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+import time
+
+from .blacklist import get_token_blacklist
+
+# Claim name == User field name
+CLAIM_FIELDS = (
+    'role',
+    'has_purchased_courses',
+    'trial_end_date',
+    'email_verified',
+    'phone_verified',
+)
+
+
+def user_claims(user):
+    return {
+        'role': user.role,
+        'has_purchased_courses': user.has_purchased_courses,
+        'trial_end_date': user.trial_end_date.isoformat() if user.trial_end_date else None,
+        'email_verified': user.email_verified,
+        'phone_verified': user.phone_verified,
+    }
+
+
+def field_values_from_claims(token):
+    """User field values encoded in a validated token"""
+    values = {field: token[field] for field in CLAIM_FIELDS}
+    if values['trial_end_date']:
+        values['trial_end_date'] = parse_datetime(values['trial_end_date'])
+    return values
+
+
+def has_user_claims(token):
+    return all(claim in token for claim in CLAIM_FIELDS)
+
+
+USER_REVOKED_PREFIX = 'jwt:user_revoked:'
+
+
+def revoke_user_tokens(*user_ids):
+    """
+    Reject every token issued to these users so far: claims authentication
+    never reads is_active, so deleted and deactivated accounts are cut off
+    here. Markers outlive the access tokens they cover; refresh goes through
+    the database anyway.
+    """
+    if not user_ids:
+        return
+    ttl = int(api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()) + 60
+    revoked_at = int(time.time())
+    cache.set_many({f'{USER_REVOKED_PREFIX}{user_id}': revoked_at for user_id in user_ids}, ttl)
+
+
+def user_tokens_revoked(user_id, token):
+    """Whether the token was issued before the user's tokens were revoked"""
+    revoked_at = cache.get(f'{USER_REVOKED_PREFIX}{user_id}')
+    # iat has one-second resolution: a token from the same second is revoked too
+    return revoked_at is not None and token.get('iat', 0) <= revoked_at
+
+
+class ClaimsRefreshToken(RefreshToken):
+    """
+    Refresh token whose user claims are copied into every access token it
+    mints. Revocation goes through accounts.blacklist instead of simplejwt's
+    token_blacklist tables.
+    """
+    
+    def verify(self, *args, **kwargs):
+        super().verify(*args, **kwargs)
+        if get_token_blacklist().is_revoked(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
+    
+    def blacklist(self):
+        """Revoke this token; False if it had already been revoked"""
+        return get_token_blacklist().revoke(self.payload[api_settings.JTI_CLAIM], self.payload['exp'])
+    
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token.update_claims(user)
+        return token
+    
+    def update_claims(self, user):
+        for claim, value in user_claims(user).items():
+            self[claim] = value
+
+
+def tokens_for_user(user):
+    """Fresh access/refresh pair for a user"""
+    refresh = ClaimsRefreshToken.for_user(user)
+    return {
+        'access': str(refresh.access_token),
+        'refresh': str(refresh),
+    }
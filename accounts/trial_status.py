@@ -0,0 +1,53 @@
+"""
+Per-user cache of the purchase/trial fields behind TrialStatusView.
+
+Only inputs are cached; remaining_seconds is computed on every request so
+the countdown stays exact. Entries are dropped after a purchase transition
+commits (see payments.models.CourseSubscription.save).
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import User
+
+
+def trial_status_key(user_id):
+    return f'trial_status:{user_id}'
+
+
+def get_trial_status(user_id):
+    """has_purchased_courses, purchased_courses_count and trial_end_date for a user"""
+    key = trial_status_key(user_id)
+    status = cache.get(key)
+    if status is None:
+        status = User.objects.filter(pk=user_id).values(
+            'has_purchased_courses', 'purchased_courses_count', 'trial_end_date'
+        ).first()
+        if status is None:
+            return None
+        timeout = settings.TRIAL_SETTINGS.get('STATUS_CACHE_SECONDS', 300)
+        cache.set(key, status, timeout)
+    return status
+
+
+def invalidate_trial_status(*user_ids):
+    cache.delete_many([trial_status_key(user_id) for user_id in user_ids])
+
+
+def trial_status_payload(status):
+    """TrialStatusView response body for a student"""
+    has_purchased = status['has_purchased_courses']
+    data = {
+        'is_trial': not has_purchased,
+        'has_purchased': has_purchased,
+        'purchased_courses_count': status['purchased_courses_count'],
+    }
+    
+    # Add trial info only if user is on trial
+    trial_end_date = status['trial_end_date']
+    if not has_purchased and trial_end_date:
+        data['trial_ends_at'] = trial_end_date.isoformat()
+        data['remaining_seconds'] = max(0, int((trial_end_date - timezone.now()).total_seconds()))
+    return data
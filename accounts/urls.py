@@ -2,10 +2,11 @@ from django.urls import path
 from rest_framework_simplejwt.views import TokenRefreshView
 
 from .views import (
-    RegisterView, LoginView, LogoutView, ProfileView,
+    RegisterView, LoginView, AsyncLoginView, LogoutView, ProfileView,
     TeacherRegisterView, ListTeachersView, ListStudentsView,
     ChangePasswordView, SendOTPView,
-    VerifyOTPView, ForgotPasswordView, TrialStatusView
+    VerifyOTPView, ForgotPasswordView, TrialStatusView,
+    MetricsView, BulkImportUsersView
 )
 
 app_name = 'accounts'
@@ -18,6 +19,7 @@ urlpatterns = [
     # Auth endpoints
     path('register/', RegisterView.as_view(), name='register'),
     path('login/', LoginView.as_view(), name='login'),
+    path('login/async/', AsyncLoginView.as_view(), name='login_async'),
     path('logout/', LogoutView.as_view(), name='logout'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('forgot-password/', ForgotPasswordView.as_view(), name='forgot_password'),
@@ -31,4 +33,6 @@ urlpatterns = [
     path('register/teacher/', TeacherRegisterView.as_view(), name='register_teacher'),
     path('admin/teachers/', ListTeachersView.as_view(), name='list_teachers'),
     path('admin/students/', ListStudentsView.as_view(), name='list_students'),
+    path('admin/import/', BulkImportUsersView.as_view(), name='bulk_import'),
+    path('admin/metrics/', MetricsView.as_view(), name='metrics'),
 ]
\ No newline at end of file
@@ -1,29 +1,50 @@
 from rest_framework import generics, status, views
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework import serializers
+from rest_framework.parsers import MultiPartParser, FormParser
 from django.contrib.auth import login
 from django.core.mail import send_mail
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from django.db import transaction
+from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
+from edustream.pagination import KeysetPagination
+import io
+import json
 import logging
 
 logger = logging.getLogger(__name__)
 
-from .models import User, OTP
+from .models import User
+from . import otp_backends
+from .otp_backends import get_otp_backend
 from .serializers import (
     UserSerializer, RegisterSerializer, LoginSerializer,
     TeacherCreateSerializer, ChangePasswordSerializer,
     SendOTPSerializer, VerifyOTPSerializer,
-    ForgotPasswordSerializer
+    ForgotPasswordSerializer, BulkImportSerializer, UserListFilterSerializer,
+    identifier_lookup, login_failed
 )
+from .bulk_import import BulkImporter, detect_format, read_rows
+from .hashing import HashPoolSaturated, get_hash_pool, needs_rehash
 from .permissions import IsAdmin, IsTeacher, IsStudent
+from .sms_services import get_sms_service, ConsoleSMSService
+from .tasks import enqueue_otp_delivery
+from .throttling import IPRateThrottle, IdentifierRateThrottle, PurposeRateThrottle, client_ip, hit_throttle
+from .tokens import ClaimsRefreshToken, tokens_for_user
+from .trial_status import get_trial_status, trial_status_payload
 
 
 class SendOTPView(views.APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [IPRateThrottle, IdentifierRateThrottle, PurposeRateThrottle]
+    throttle_scope = 'send_otp'
     serializer_class = SendOTPSerializer
     
     @swagger_auto_schema(
@@ -62,75 +83,39 @@ class SendOTPView(views.APIView):
                     "error": "Phone number is already registered."
                 }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Create OTP
-        otp = OTP.objects.create(
-            identifier=identifier,
-            otp_type=identifier_type,
-            purpose=purpose
-        )
+        # Store the OTP and hand delivery off to the OTP queue once it is committed
+        try:
+            with transaction.atomic():
+                otp_code = get_otp_backend().issue(identifier, identifier_type, purpose)
+                enqueue_otp_delivery(identifier, identifier_type, purpose, otp_code)
+        except Exception as e:
+            logger.error(f"OTP enqueue error: {str(e)}")
+            return Response({
+                "error": "Failed to send OTP. Please try again."
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         
-        # Send OTP
         if identifier_type == 'email':
-            # Use Twilio SendGrid for email
-            from .email_services import send_otp_email
-            
-            email_sent = send_otp_email(identifier, otp.otp_code, purpose)
-            
-            if not email_sent and not settings.DEBUG:
-                return Response({
-                    "error": "Failed to send email. Please try again."
-                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            
             return Response({
                 "message": f"OTP sent to email {identifier}",
                 "otp_expires_in_seconds": 600
             }, status=status.HTTP_200_OK)
+        
+        response_data = {
+            "message": f"OTP sent to phone {identifier}",
+            "otp_expires_in_seconds": 600
+        }
+        
+        # Only return OTP in debug mode if SMS goes to the console service
+        if settings.DEBUG and isinstance(get_sms_service(), ConsoleSMSService):
+            response_data["debug_otp"] = otp_code
             
-        else:  # phone
-            # Send SMS using configured service
-            sms_sent = False
-            using_console = False
-            
-            try:
-                # Import here to avoid circular imports
-                from .sms_services import get_sms_service, ConsoleSMSService
-                
-                sms_service = get_sms_service()
-                message = f'Your OTP for {purpose.replace("_", " ").title()} is: {otp.otp_code}\nValid for 10 minutes.'
-                
-                # Check if using console service
-                using_console = isinstance(sms_service, ConsoleSMSService)
-                
-                # Send SMS
-                sms_sent = sms_service.send_sms(identifier, message)
-                
-                if not sms_sent and not settings.DEBUG:
-                    return Response({
-                        "error": "Failed to send SMS. Please try again."
-                    }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-                
-            except Exception as e:
-                logger.error(f"SMS sending error: {str(e)}")
-                if not settings.DEBUG:
-                    return Response({
-                        "error": "SMS service unavailable"
-                    }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-                using_console = True  # Fallback to console behavior
-            
-            response_data = {
-                "message": f"OTP sent to phone {identifier}",
-                "otp_expires_in_seconds": 600
-            }
-            
-            # Only return OTP in debug mode if using console service
-            if settings.DEBUG and using_console:
-                response_data["debug_otp"] = otp.otp_code
-                
-            return Response(response_data, status=status.HTTP_200_OK)
+        return Response(response_data, status=status.HTTP_200_OK)
 
 
 class VerifyOTPView(views.APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [IPRateThrottle, IdentifierRateThrottle]
+    throttle_scope = 'verify_otp'
     serializer_class = VerifyOTPSerializer
     
     @swagger_auto_schema(
@@ -161,29 +146,24 @@ class VerifyOTPView(views.APIView):
                     "error": "Invalid identifier. Please provide a valid email or phone number."
                 }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Verify OTP
-        otp = OTP.objects.filter(
-            identifier=identifier,
-            otp_type=identifier_type,
-            purpose=purpose,
-            otp_code=otp_code,
-            is_verified=False
-        ).order_by('-created_at').first()
+        # Verify and consume the pending OTP
+        result = get_otp_backend().verify(identifier, identifier_type, purpose, otp_code)
         
-        if not otp:
+        if result == otp_backends.LOCKED:
             return Response({
-                "error": "Invalid OTP"
+                "error": "Too many failed attempts. Please request a new OTP later."
+            }, status=status.HTTP_429_TOO_MANY_REQUESTS)
+        
+        if result == otp_backends.EXPIRED:
+            return Response({
+                "error": "OTP has expired"
             }, status=status.HTTP_400_BAD_REQUEST)
             
-        if otp.is_expired:
+        if result != otp_backends.VALID:
             return Response({
-                "error": "OTP has expired"
+                "error": "Invalid OTP"
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Mark OTP as verified
-        otp.is_verified = True
-        otp.save()
-        
         return Response({
             "message": f"{identifier_type.capitalize()} verified successfully",
             "identifier": identifier,
@@ -234,8 +214,34 @@ class RegisterView(generics.CreateAPIView):
 
 
 
+def login_response_data(user):
+    """Tokens plus role/trial info returned by both login endpoints"""
+    # Generate JWT tokens carrying the user's role/trial claims
+    tokens = tokens_for_user(user)
+    
+    response_data = {
+        'access': tokens['access'],
+        'refresh': tokens['refresh'],
+        'user_type': user.role,
+        'message': 'Login successful'
+    }
+
+    # Add trial info for students
+    if user.role == 'student':
+        response_data['is_trial'] = not user.has_purchased_courses
+        response_data['has_purchased'] = user.has_purchased_courses
+        
+        if not user.has_purchased_courses and user.trial_end_date:
+            response_data['trial_ends_at'] = user.trial_end_date.isoformat()
+            response_data['trial_remaining_seconds'] = user.trial_remaining_seconds
+    
+    return response_data
+
+
 class LoginView(views.APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [IPRateThrottle, IdentifierRateThrottle]
+    throttle_scope = 'login'
     serializer_class = LoginSerializer
     
     @swagger_auto_schema(
@@ -274,30 +280,16 @@ class LoginView(views.APIView):
     )
     def post(self, request):
         try:
-            serializer = LoginSerializer(data=request.data)
+            serializer = LoginSerializer(data=request.data, context={'request': request})
             serializer.is_valid(raise_exception=True)
             user = serializer.validated_data['user']
             
-            # Generate JWT tokens
-            refresh = RefreshToken.for_user(user)
-            
-            response_data = {
-                'access': str(refresh.access_token),
-                'refresh': str(refresh),
-                'user_type': user.role,
-                'message': 'Login successful'
-            }
-
-            # Add trial info for students
-            if user.role == 'student':
-                response_data['is_trial'] = not user.has_purchased_courses
-                response_data['has_purchased'] = user.has_purchased_courses
-                
-                if not user.has_purchased_courses and user.trial_end_date:
-                    response_data['trial_ends_at'] = user.trial_end_date.isoformat()
-                    response_data['trial_remaining_seconds'] = user.trial_remaining_seconds
-
-            return Response(response_data)
+            return Response(login_response_data(user))
+        
+        except HashPoolSaturated:
+            return Response({
+                'error': 'Server is busy. Please try again shortly.'
+            }, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '1'})
         
         except serializers.ValidationError as e:
             # Handle validation errors from serializer (e.g., invalid credentials, missing fields)
@@ -312,6 +304,64 @@ class LoginView(views.APIView):
                 'error': 'An unexpected error occurred. Please try again.'
             }, status=status.HTTP_400_BAD_REQUEST)
 
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncLoginView(View):
+    """
+    Async variant of LoginView. The event loop only does the user lookup
+    (one indexed column, chosen from the identifier's shape) and awaits the
+    hash check on the bounded pool, so a worker can hold many logins in
+    flight without blocking on PBKDF2.
+    """
+    throttle_scope = 'login'
+    
+    async def post(self, request):
+        try:
+            data = json.loads(request.body or b'{}') if request.content_type == 'application/json' else request.POST
+        except ValueError:
+            return JsonResponse({'error': 'Invalid JSON body'}, status=400)
+        
+        # LoginSerializer's field rules (strings, both required); validate() would query synchronously
+        try:
+            attrs = LoginSerializer().to_internal_value(data)
+        except serializers.ValidationError:
+            return JsonResponse({'error': 'Must include "identifier" and "password".'}, status=400)
+        identifier = attrs['identifier']
+        password = attrs['password']
+        
+        for kind, value in (('ip', client_ip(request)), ('identifier', identifier)):
+            allowed, retry_after = await sync_to_async(hit_throttle, thread_sensitive=False)(
+                self.throttle_scope, kind, value
+            )
+            if not allowed:
+                response = JsonResponse({'error': 'Request was throttled.'}, status=429)
+                response['Retry-After'] = str(int(retry_after or 1))
+                return response
+        
+        user = await User.objects.filter(**identifier_lookup(identifier)).afirst()
+        if user is None:
+            await sync_to_async(login_failed)(identifier, request)
+            return JsonResponse({'error': 'Invalid credentials'}, status=400)
+        
+        try:
+            valid = await get_hash_pool().acheck_password(password, user.password)
+        except HashPoolSaturated:
+            response = JsonResponse({'error': 'Server is busy. Please try again shortly.'}, status=503)
+            response['Retry-After'] = '1'
+            return response
+        
+        if not valid:
+            await sync_to_async(login_failed)(identifier, request)
+            return JsonResponse({'error': 'Invalid credentials'}, status=400)
+        if not user.is_active:
+            return JsonResponse({'error': 'User account is disabled.'}, status=400)
+        
+        if needs_rehash(user.password):
+            user.set_password(password)
+            await user.asave(update_fields=['password'])
+        
+        return JsonResponse(login_response_data(user))
+
+
 class LogoutView(views.APIView):
     permission_classes = [IsAuthenticated]
     
@@ -328,7 +378,7 @@ class LogoutView(views.APIView):
     def post(self, request):
         try:
             refresh_token = request.data.get('refresh')
-            token = RefreshToken(refresh_token)
+            token = ClaimsRefreshToken(refresh_token)
             token.blacklist()
             return Response({"detail": "Logout successful"}, status=status.HTTP_205_RESET_CONTENT)
         except Exception as e:
@@ -367,12 +417,12 @@ class TeacherRegisterView(generics.CreateAPIView):
         user = serializer.save()
         
         # Generate JWT tokens for immediate login
-        refresh = RefreshToken.for_user(user)
+        tokens = tokens_for_user(user)
         
         response_data = {
             'message': 'Teacher registration successful!',
-            'access': str(refresh.access_token),
-            'refresh': str(refresh),
+            'access': tokens['access'],
+            'refresh': tokens['refresh'],
             'user': {
                 'id': user.id,
                 'username': user.username,
@@ -385,19 +435,82 @@ class TeacherRegisterView(generics.CreateAPIView):
         
         return Response(response_data, status=status.HTTP_201_CREATED)
 
-class ListTeachersView(generics.ListAPIView):
-    serializer_class = UserSerializer
+class BulkImportUsersView(views.APIView):
     permission_classes = [IsAuthenticated, IsAdmin]
+    parser_classes = [MultiPartParser, FormParser]
     
-    def get_queryset(self):
-        return User.objects.filter(role='teacher')
+    @swagger_auto_schema(
+        operation_description="Bulk import teachers or students from a CSV or JSONL file (Admin only). "
+                              "Rows are validated independently; the response lists per-row errors.",
+        request_body=BulkImportSerializer,
+        responses={
+            200: openapi.Response(
+                description="Import report",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'total': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'created': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'failed': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'errors': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_OBJECT)),
+                    }
+                )
+            )
+        }
+    )
+    def post(self, request):
+        serializer = BulkImportSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        upload = serializer.validated_data['file']
+        fmt = serializer.validated_data.get('format') or detect_format(upload.name)
+        
+        # Stream the upload instead of reading it into memory
+        stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        try:
+            # Hashes on this process's bounded login pool, not a pool per request
+            importer = BulkImporter(serializer.validated_data['role'], executor=get_hash_pool())
+            report = importer.run(read_rows(stream, fmt))
+        except UnicodeDecodeError:
+            return Response({'error': 'File must be UTF-8 encoded'}, status=status.HTTP_400_BAD_REQUEST)
+        finally:
+            stream.detach()
+        
+        return Response(report, status=status.HTTP_200_OK)
 
-class ListStudentsView(generics.ListAPIView):
+LIST_USERS_PARAMS = [
+    openapi.Parameter('cursor', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                      description='Opaque cursor from a next/previous link'),
+    openapi.Parameter('page_size', openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+    openapi.Parameter('count', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=['estimate', 'exact', 'none'],
+                      description='How the total is reported (default: planner estimate)'),
+    openapi.Parameter('verified', openapi.IN_QUERY, type=openapi.TYPE_BOOLEAN),
+    openapi.Parameter('purchased', openapi.IN_QUERY, type=openapi.TYPE_BOOLEAN),
+    openapi.Parameter('trial_expiring_before', openapi.IN_QUERY, type=openapi.TYPE_STRING, format='date-time'),
+]
+
+
+class ListUsersByRoleView(generics.ListAPIView):
+    """Admin listing of one role, newest first, keyset-paginated on (created_at, id)"""
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated, IsAdmin]
+    pagination_class = KeysetPagination
+    role = None
     
     def get_queryset(self):
-        return User.objects.filter(role='student')
+        filters = UserListFilterSerializer(data=self.request.query_params)
+        filters.is_valid(raise_exception=True)
+        # Matches the users_<role>_created_idx partial indexes
+        return filters.filter_queryset(User.objects.filter(role=self.role))
+    
+    @swagger_auto_schema(manual_parameters=LIST_USERS_PARAMS)
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+class ListTeachersView(ListUsersByRoleView):
+    role = 'teacher'
+
+class ListStudentsView(ListUsersByRoleView):
+    role = 'student'
 
 class ChangePasswordView(generics.UpdateAPIView):
     serializer_class = ChangePasswordSerializer
@@ -421,6 +534,8 @@ class ChangePasswordView(generics.UpdateAPIView):
 
 class ForgotPasswordView(views.APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [IPRateThrottle, IdentifierRateThrottle]
+    throttle_scope = 'forgot_password'
     serializer_class = ForgotPasswordSerializer
     
     @swagger_auto_schema(
@@ -432,17 +547,12 @@ class ForgotPasswordView(views.APIView):
         serializer.is_valid(raise_exception=True)
         
         user = serializer.validated_data['user']
-        otp = serializer.validated_data['otp']
         new_password = serializer.validated_data['new_password']
         
-        # Update password
+        # Update password (the OTP was consumed during validation)
         user.set_password(new_password)
         user.save()
         
-        # Mark OTP as used
-        otp.is_verified = True
-        otp.save()
-        
         return Response({
             'message': 'Password reset successfully'
         }, status=status.HTTP_200_OK)
@@ -480,22 +590,20 @@ class TrialStatusView(views.APIView):
                 'purchased_courses_count': 0
             })
         
-        # Get purchased courses count
-        from payments.models import CourseSubscription
-        purchased_count = CourseSubscription.objects.filter(
-            student=user,
-            payment_status='completed'
-        ).count()
-        
-        response_data = {
-            'is_trial': not user.has_purchased_courses,
-            'has_purchased': user.has_purchased_courses,
-            'purchased_courses_count': purchased_count
-        }
-        
-        # Add trial info only if user is on trial
-        if not user.has_purchased_courses and user.trial_end_date:
-            response_data['trial_ends_at'] = user.trial_end_date.isoformat()
-            response_data['remaining_seconds'] = user.trial_remaining_seconds
+        # Served from a per-user cache entry instead of a COUNT per poll
+        status_data = get_trial_status(user.pk)
+        if status_data is None:
+            return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
         
-        return Response(response_data)
\ No newline at end of file
+        return Response(trial_status_payload(status_data))
+
+
+class MetricsView(views.APIView):
+    permission_classes = [IsAuthenticated, IsAdmin]
+    
+    @swagger_auto_schema(
+        operation_description="Background job metrics such as OTP queue depth and delivery latency (Admin only)"
+    )
+    def get(self, request):
+        from edustream.metrics import snapshot
+        return Response(snapshot())
@@ -2,7 +2,7 @@ import json
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from .models import ClassSchedule, ClassAttendance
-from payments.models import CourseSubscription
+from payments.purchases import has_purchased
 
 class WebRTCSignalingConsumer(AsyncWebsocketConsumer):
     async def connect(self):
@@ -162,11 +162,7 @@ class WebRTCSignalingConsumer(AsyncWebsocketConsumer):
             ).first()
             
             if class_schedule:
-                return CourseSubscription.objects.filter(
-                    student=self.user,
-                    course=class_schedule.course,
-                    payment_status='completed'
-                ).exists()
+                return has_purchased(self.user.pk, class_schedule.course_id)
         
         # Admins can access any room
         return self.user.is_admin
\ No newline at end of file
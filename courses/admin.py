@@ -1,11 +1,15 @@
 from django.contrib import admin
+from edustream.admin_tools import FastChangeListMixin
 from .models import Course
 
 @admin.register(Course)
-class CourseAdmin(admin.ModelAdmin):
+class CourseAdmin(FastChangeListMixin, admin.ModelAdmin):
     list_display = ('name', 'category', 'level', 'base_price', 'duration_hours', 'is_active', 'created_at')
     list_filter = ('is_active', 'category','created_at')
+    # Each field has a trigram index (see Course.Meta.indexes)
     search_fields = ('name', 'description', 'category')
+    # Skips description/advantages, the wide columns
+    changelist_only = list_display + ('id',)
     prepopulated_fields = {'slug': ('name',)}
     ordering = ('category', 'name')
     readonly_fields = ('created_at', 'updated_at')
@@ -0,0 +1,105 @@
+"""
+Versioned cache of serialized CourseListView pages.
+
+Keys embed a catalog version that is bumped on every Course save/delete,
+so a change invalidates every cached page at once without enumerating
+keys. Entries also carry a soft expiry as a safety net for writes that
+bypass signals (queryset.update()).
+
+Stampede protection: only the worker holding the rebuild lock for a key
+rebuilds it. Others serve the stale entry if there is one, or wait briefly
+for the lock holder to publish it.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import quote_etag
+import hashlib
+import json
+import logging
+import time
+
+from edustream.locks import cache_lock
+from edustream.metrics import register_local
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'catalog:version'
+
+# Per-process: a shared cache counter would add round trips to every hit
+_stats = {'hits': 0, 'misses': 0, 'stale_served': 0}
+register_local('catalog_cache.local', lambda: dict(_stats))
+
+
+def _settings():
+    return getattr(settings, 'COURSE_CATALOG_CACHE', {})
+
+
+def catalog_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Any fresh value works as long as it never repeats an old one
+        cache.add(VERSION_KEY, int(time.time() * 1000), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, int(time.time() * 1000), None)
+
+
+def page_key(*parts):
+    digest = hashlib.sha1('|'.join(str(part) for part in parts).encode()).hexdigest()
+    return f'catalog:page:{catalog_version()}:{digest}'
+
+
+def make_entry(data):
+    body = json.dumps(data, sort_keys=True, separators=(',', ':'), default=str)
+    return {
+        'data': data,
+        'etag': quote_etag(hashlib.sha1(body.encode()).hexdigest()),
+        'fresh_until': time.time() + _settings().get('TTL_SECONDS', 300),
+    }
+
+
+def get_or_build(key, build):
+    """Cached entry for key, calling build() -> data in at most one worker at a time"""
+    conf = _settings()
+    timeout = conf.get('TTL_SECONDS', 300) + conf.get('STALE_GRACE_SECONDS', 600)
+    entry = cache.get(key)
+    if entry is not None and entry['fresh_until'] > time.time():
+        _stats['hits'] += 1
+        return entry
+
+    with cache_lock(f'catalog-build:{key}', timeout=conf.get('LOCK_SECONDS', 30)) as acquired:
+        if acquired:
+            # The previous holder may have published it since our read
+            current = cache.get(key)
+            if current is not None and current['fresh_until'] > time.time():
+                _stats['hits'] += 1
+                return current
+            _stats['misses'] += 1
+            entry = make_entry(build())
+            cache.set(key, entry, timeout)
+            return entry
+
+    if entry is not None:
+        # Someone else is refreshing it
+        _stats['stale_served'] += 1
+        return entry
+
+    deadline = time.monotonic() + conf.get('WAIT_SECONDS', 2.0)
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        entry = cache.get(key)
+        if entry is not None:
+            _stats['hits'] += 1
+            return entry
+
+    # The lock holder is slow or died: answer without caching
+    logger.warning(f"Catalog cache rebuild of {key} timed out, building uncached")
+    _stats['misses'] += 1
+    return make_entry(build())
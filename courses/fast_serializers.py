@@ -0,0 +1,150 @@
+"""
+Read-only fast path for course list responses.
+
+CourseSerializer(many=True) builds field objects and walks them for every
+row. The list views instead page over values_list(named=True) rows, fetching
+only the columns the requested fieldset needs, and map each tuple straight
+to a dict with converters precomputed once from the DRF serializers' own
+fields, so the output matches them exactly (Decimal and datetime formatting
+are still DRF's).
+"""
+
+from functools import lru_cache
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+from edustream.fieldsets import Fieldset
+from edustream.images import row_variant_urls, url_builder
+from .models import Course
+from .serializers import CourseSerializer, PurchasedCoursesSerializer
+
+# DRF fields whose to_representation() returns database values unchanged
+_PASSTHROUGH = (
+    serializers.BooleanField, serializers.CharField, serializers.IntegerField, serializers.JSONField,
+)
+
+
+@lru_cache(maxsize=None)
+def serializer_fields(serializer_class):
+    """Declared fields, built once; only their to_representation() is used"""
+    return serializer_class().fields
+
+
+def _iso_datetime(field):
+    """DateTimeField.to_representation with the timezone looked up once"""
+    representation = field.to_representation
+    tz = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+
+    def convert(value):
+        if tz is None or value.tzinfo is None:
+            return representation(value)
+        try:
+            value = value.astimezone(tz).isoformat()
+        except OverflowError:
+            # Let DRF raise its validation error
+            return representation(value)
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    return convert
+
+
+def converter(field):
+    """Callable mapping a non-null database value to field's representation, or None for as-is"""
+    if isinstance(field, _PASSTHROUGH) and not getattr(field, 'binary', False):
+        return None
+    if isinstance(field, serializers.DateTimeField):
+        output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+        if isinstance(output_format, str) and output_format.lower() == ISO_8601:
+            return _iso_datetime(field)
+    return field.to_representation
+
+
+class FastSerializer:
+    """
+    serializer_class(many=True).data for rows of
+    queryset.values_list(*self.columns, named=True), honouring a Fieldset.
+
+    With a prefix (e.g. 'course__') the columns are read through a relation.
+    Nested serializers in `nested` (name -> fast serializer class) read
+    their columns through '<name>__', or render the primary key when the
+    fieldset doesn't expand them.
+    """
+    serializer_class = None
+    nested = {}
+
+    def __init__(self, context=None, prefix='', fieldset=None):
+        self.context = context or {}
+        self.request = self.context.get('request')
+        self.prefix = prefix
+        fieldset = fieldset or Fieldset()
+        fields = serializer_fields(self.serializer_class)
+
+        self.columns = []
+        self.plan = []
+        for name in fieldset.select(list(fields)):
+            if name in self.nested:
+                needs, getter = self.nested_plan(name, fieldset.relation(name))
+            else:
+                needs, getter = self.field_plan(name, fields[name])
+            self.plan.append((name, getter))
+            self.columns.extend(column for column in needs if column not in self.columns)
+
+    def field_plan(self, name, field):
+        """([columns], getter) for a plain field"""
+        column = self.prefix + field.source
+        return [column], self._column(column, converter(field))
+
+    def nested_plan(self, name, fieldset):
+        if fieldset is None:
+            # PrimaryKeyRelatedField
+            column = f'{self.prefix}{name}_id'
+            return [column], self._column(column, None)
+        serializer = self.nested[name](self.context, prefix=f'{self.prefix}{name}__', fieldset=fieldset)
+        return serializer.columns, serializer.to_representation
+
+    def _column(self, column, convert):
+        if convert is None:
+            return lambda row: getattr(row, column)
+
+        def get(row):
+            value = getattr(row, column)
+            # Serializer fields skip to_representation for None
+            return None if value is None else convert(value)
+        return get
+
+    def to_representation(self, row):
+        return {name: getter(row) for name, getter in self.plan}
+
+    def serialize(self, rows):
+        return [self.to_representation(row) for row in rows]
+
+
+class FastCourseSerializer(FastSerializer):
+    serializer_class = CourseSerializer
+
+    def __init__(self, context=None, prefix='', fieldset=None):
+        self.build_url = url_builder(Course._meta.get_field('thumbnail').storage, (context or {}).get('request'))
+        super().__init__(context, prefix, fieldset)
+
+    def field_plan(self, name, field):
+        if name == 'thumbnail':
+            # serializers.ImageField with use_url
+            return [self.prefix + 'thumbnail'], self._thumbnail
+        if name == 'thumbnail_variants':
+            return [self.prefix + column for column in ('id', 'thumbnail', 'thumbnail_variants')], self._thumbnail_variants
+        return super().field_plan(name, field)
+
+    def _thumbnail(self, row):
+        name = getattr(row, self.prefix + 'thumbnail')
+        return self.build_url(name) if name else None
+
+    def _thumbnail_variants(self, row):
+        return row_variant_urls(
+            Course, getattr(row, self.prefix + 'id'), 'thumbnail',
+            getattr(row, self.prefix + 'thumbnail'), 'thumbnail_variants',
+            getattr(row, self.prefix + 'thumbnail_variants'), self.request, self.build_url,
+        )
+
+
+class FastPurchasedCoursesSerializer(FastSerializer):
+    serializer_class = PurchasedCoursesSerializer
+    nested = {'course': FastCourseSerializer}
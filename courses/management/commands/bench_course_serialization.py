@@ -0,0 +1,106 @@
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from courses.fast_serializers import FastCourseSerializer
+from courses.models import Course
+from courses.serializers import CourseSerializer
+from edustream.renderers import ORJSONRenderer
+
+SEED_PREFIX = 'benchcourse'
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Micro-benchmark course list serialization: CourseSerializer + JSONRenderer "
+        "vs values_list + FastCourseSerializer + ORJSONRenderer, checking both "
+        "produce the same bytes. Synthetic courses are rolled back afterwards"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[20, 100, 1000])
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def seed(self, count):
+        Course.objects.bulk_create([
+            Course(
+                name=f'{SEED_PREFIX} {i} – Données',
+                slug=f'{SEED_PREFIX}-{i}',
+                description='Lorem ipsum dolor sit amet. ' * 20,
+                category=['Math', 'Science', 'Art', 'Code'][i % 4],
+                base_price=Decimal('499.00') + i,
+                advantages=['Live classes', 'Recordings', 'Certificate'],
+                # Every other course has a thumbnail with generated variants
+                thumbnail=f'course_thumbnails/{SEED_PREFIX}{i}.jpg' if i % 2 else None,
+                thumbnail_variants={
+                    'source': f'course_thumbnails/{SEED_PREFIX}{i}.jpg',
+                    'variants': {fmt: {str(w): f'course_thumbnails/variants/{SEED_PREFIX}{i}_{w}.{fmt}'
+                                       for w in (160, 320, 640)} for fmt in ('webp', 'jpg')},
+                } if i % 2 else {},
+            )
+            for i in range(count)
+        ])
+
+    def timed(self, fn, repeat):
+        fn()  # warm-up
+        samples = []
+        result = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = fn()
+            samples.append((time.perf_counter() - started) * 1000)
+        return statistics.median(samples), result
+
+    def handle(self, *args, **options):
+        request = Request(APIRequestFactory().get('/api/courses/'))
+        context = {'request': request}
+        repeat = options['repeat']
+        self.stdout.write(
+            f"{'rows':>6} {'drf cpu':>10} {'fast cpu':>10} {'speedup':>8} "
+            f"{'drf total':>10} {'fast total':>10} {'speedup':>8}  bytes"
+        )
+        try:
+            with transaction.atomic():
+                self.seed(max(options['rows']))
+                courses = Course.objects.filter(slug__startswith=SEED_PREFIX).order_by('category', 'name', 'id')
+                for rows in options['rows']:
+                    page = courses[:rows]
+                    fast = FastCourseSerializer(context)
+                    instances = list(page)
+                    values = list(page.values_list(*fast.columns, named=True))
+
+                    # Serialization and rendering only, from already fetched rows
+                    def drf_render(objects):
+                        return JSONRenderer().render(CourseSerializer(objects, many=True, context=context).data)
+
+                    def fast_render(tuples, serializer=None):
+                        serializer = serializer or FastCourseSerializer(context)
+                        return ORJSONRenderer().render(serializer.serialize(tuples))
+
+                    drf_cpu, expected = self.timed(lambda: drf_render(instances), repeat)
+                    fast_cpu, actual = self.timed(lambda: fast_render(values), repeat)
+                    if actual != expected:
+                        raise CommandError(f"Fast path output differs from CourseSerializer at {rows} rows")
+
+                    # Including the query
+                    drf_total, _ = self.timed(lambda: drf_render(list(courses[:rows])), repeat)
+                    fast_total, _ = self.timed(
+                        lambda: fast_render(courses[:rows].values_list(*fast.columns, named=True), fast), repeat
+                    )
+                    self.stdout.write(
+                        f"{rows:>6} {drf_cpu:8.2f}ms {fast_cpu:8.2f}ms {drf_cpu / fast_cpu:7.1f}x "
+                        f"{drf_total:8.2f}ms {fast_total:8.2f}ms {drf_total / fast_total:7.1f}x  {len(actual)}"
+                    )
+                raise Rollback
+        except Rollback:
+            pass
@@ -0,0 +1,108 @@
+import time
+from collections import Counter
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from courses.recommendations import neighbour_lists, purchase_matrix, top_neighbours
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the co-purchase recommendation batch on synthetic purchases "
+        "(no database): matrix build, full and incremental top-k, against a "
+        "per-course self-join in Python, checking both agree"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subscriptions', type=int, default=1_000_000)
+        parser.add_argument('--students', type=int, default=250_000)
+        parser.add_argument('--courses', type=int, default=2_000)
+        parser.add_argument('--changed', type=int, default=20, help='Courses with new purchases for the incremental run')
+        parser.add_argument('--top-k', type=int, default=20)
+        parser.add_argument('--min-co-purchases', type=int, default=2)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def purchases(self, rng, subscriptions, students, courses):
+        """Unique (student, course) pairs, course popularity roughly Zipf-distributed"""
+        popularity = 1.0 / np.arange(1, courses + 1)
+        popularity /= popularity.sum()
+        pairs = np.empty(0, dtype=np.int64)
+        while len(pairs) < subscriptions:
+            draw = int((subscriptions - len(pairs)) * 1.2) + 1000
+            student_ids = rng.integers(1, students + 1, draw)
+            course_ids = rng.choice(courses, draw, p=popularity) + 1
+            pairs = np.unique(np.concatenate([pairs, student_ids * (courses + 1) + course_ids]))
+        pairs = rng.permutation(pairs)[:subscriptions]
+        return pairs // (courses + 1), pairs % (courses + 1)
+
+    def timed(self, fn):
+        started = time.perf_counter()
+        result = fn()
+        return (time.perf_counter() - started) * 1000, result
+
+    def self_join(self, student_ids, course_ids, course_id, k, min_co_purchases):
+        """What an online query does: the course's buyers, then everything else they bought"""
+        buyers = set(student_ids[course_ids == course_id].tolist())
+        totals = Counter(course_ids.tolist())
+        co = Counter(
+            other for student, other in zip(student_ids.tolist(), course_ids.tolist())
+            if student in buyers and other != course_id
+        )
+        scores = [
+            (other, count / np.sqrt(totals[course_id] * totals[other]))
+            for other, count in co.items() if count >= min_co_purchases
+        ]
+        scores.sort(key=lambda pair: (-pair[1], pair[0]))
+        return [[other, round(float(score), 4)] for other, score in scores[:k]]
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        k, min_co = options['top_k'], options['min_co_purchases']
+
+        generated_ms, (student_ids, course_ids) = self.timed(
+            lambda: self.purchases(rng, options['subscriptions'], options['students'], options['courses'])
+        )
+        self.stdout.write(f"{len(student_ids)} purchases generated in {generated_ms:.0f}ms")
+
+        build_ms, (matrix, columns_ids) = self.timed(lambda: purchase_matrix(student_ids, course_ids))
+        buyers = matrix.getnnz(axis=0)
+        memory = (matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes) / 2 ** 20
+        self.stdout.write(f"matrix {matrix.shape[0]}x{matrix.shape[1]}, {matrix.nnz} nnz, "
+                          f"{memory:.1f}MiB, built in {build_ms:.0f}ms")
+
+        all_columns = np.arange(len(columns_ids))
+        full_ms, result = self.timed(lambda: neighbour_lists(
+            columns_ids, all_columns, *top_neighbours(matrix, all_columns, buyers, k, min_co)
+        ))
+        self.stdout.write(f"full: {len(result)} courses in {full_ms:.0f}ms")
+
+        # Incremental: changed courses (drawn by popularity, like new purchases)
+        # plus every course sharing a buyer with them, from those buyers only
+        changed = rng.choice(all_columns, options['changed'], replace=False, p=buyers / buyers.sum())
+
+        def incremental():
+            touched = np.flatnonzero(matrix[:, changed].getnnz(axis=1))
+            affected = np.union1d(changed, np.flatnonzero(matrix[touched].getnnz(axis=0)))
+            students = np.flatnonzero(matrix[:, affected].getnnz(axis=1))
+            subset = matrix[students]
+            return affected, neighbour_lists(
+                columns_ids, affected, *top_neighbours(subset, affected, buyers, k, min_co)
+            )
+
+        incremental_ms, (affected, partial) = self.timed(incremental)
+        self.stdout.write(f"incremental: {len(changed)} changed -> {len(affected)} courses in {incremental_ms:.0f}ms")
+        if any(partial[course_id] != result[course_id] for course_id in partial):
+            raise CommandError("Incremental output differs from the full run")
+
+        # Most and least popular courses
+        for course_id in (columns_ids[np.argmax(buyers)], columns_ids[np.argmin(buyers)]):
+            course_id = int(course_id)
+            join_ms, expected = self.timed(
+                lambda: self.self_join(student_ids, course_ids, course_id, k, min_co)
+            )
+            if expected != result[course_id]:
+                raise CommandError(f"Course {course_id} differs from the self-join")
+            self.stdout.write(f"self-join for course {course_id} ({buyers[columns_ids == course_id][0]} buyers): "
+                              f"{join_ms:.0f}ms per request")
+        self.stdout.write(self.style.SUCCESS("Outputs match"))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from courses.tasks import refresh_recommendations
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute co-purchase recommendations of courses with purchases or "
+        "refunds since the last run, or of every course with --full"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Recompute every course')
+
+    def handle(self, *args, **options):
+        written = refresh_recommendations(full=options['full'])
+        if written is None:
+            raise CommandError("Another refresh is running")
+        self.stdout.write(self.style.SUCCESS(f"Refreshed recommendations of {written} courses"))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from courses.models import Course
+from courses.search import update_search_vectors
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute Course.search_vector for every course. Needed after adding the "
+        "column and after writes that bypass Course.save() (bulk_create, queryset.update)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError("search_vector is only maintained on PostgreSQL")
+
+        chunk_size = options['chunk_size']
+        pks = list(Course.objects.order_by('pk').values_list('pk', flat=True))
+        updated = 0
+        for start in range(0, len(pks), chunk_size):
+            chunk = pks[start:start + chunk_size]
+            updated += update_search_vectors(Course.objects.filter(pk__in=chunk))
+        self.stdout.write(self.style.SUCCESS(f"Updated search vectors for {updated} courses"))
@@ -1,8 +1,17 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.utils import timezone
 from django.utils.text import slugify
 from django.core.exceptions import ValidationError
 
+from edustream.images import variants_ready
+from edustream.indexes import trigram_index
+
+
 class Course(models.Model):
     """
     Pre-defined courses that teachers can schedule classes for.
@@ -26,6 +35,8 @@ class Course(models.Model):
     category = models.CharField(max_length=100)
     level = models.CharField(max_length=20, choices=LEVEL_CHOICES, default='beginner')
     thumbnail = models.ImageField(upload_to='course_thumbnails/', blank=True, null=True)
+    # Resized variants of thumbnail, maintained by edustream.images
+    thumbnail_variants = models.JSONField(default=dict, blank=True, editable=False)
     duration_hours = models.IntegerField(help_text="Total course duration in hours", default=30)
     base_price = models.DecimalField(max_digits=10, decimal_places=2)
     advantages = models.JSONField(default=list, help_text="List of course advantages/features")
@@ -34,18 +45,95 @@ class Course(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Weighted tsvector over name/category/description for catalog search
+    # (courses.search); maintained by save() on Postgres, null elsewhere
+    search_vector = SearchVectorField(null=True, editable=False)
+    
     class Meta:
         db_table = 'courses'
         ordering = ['category', 'name']
         indexes = [
             models.Index(fields=['category', 'is_active']),
             models.Index(fields=['slug']),
+            # CourseCatalogView's keyset order over active courses
+            models.Index(fields=['category', 'name', 'id'], name='courses_catalog_order_idx',
+                         condition=models.Q(is_active=True)),
+            # CourseAdmin.search_fields
+            trigram_index('name', 'courses_name_trgm'),
+            trigram_index('description', 'courses_description_trgm'),
+            trigram_index('category', 'courses_category_trgm'),
+            GinIndex(fields=['search_vector'], name='courses_search_vector_gin'),
+            # CourseChangesView's (updated_at, id) watermark scans
+            models.Index(fields=['updated_at', 'id'], name='courses_updated_at_idx'),
         ]
         
     def __str__(self):
         return f"{self.name} ({self.category})"
     
+    SEARCH_FIELDS = ('name', 'category', 'description')
+    
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
-        super().save(*args, **kwargs)
\ No newline at end of file
+        super().save(*args, **kwargs)
+        
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or set(update_fields) & set(self.SEARCH_FIELDS):
+            # The vector is computed from the stored columns, so it needs its own UPDATE
+            from .search import update_search_vectors
+            update_search_vectors(Course.objects.filter(pk=self.pk))
+
+
+@receiver([post_save, post_delete], sender=Course)
+def _bump_catalog_version(sender, **kwargs):
+    """Every cached CourseListView page embeds the version; bumping drops them all"""
+    from .catalog_cache import bump_catalog_version
+    transaction.on_commit(bump_catalog_version)
+
+
+@receiver(post_delete, sender=Course)
+def _record_tombstone(sender, instance, **kwargs):
+    """Delta-sync clients learn about deleted courses from their tombstones"""
+    CourseTombstone.objects.update_or_create(course_id=instance.pk, defaults={'deleted_at': timezone.now()})
+
+
+@receiver(variants_ready, sender=Course)
+def _bump_catalog_version_for_variants(sender, pk, **kwargs):
+    # Cached pages hold null thumbnail_variants until generation finishes
+    from .catalog_cache import bump_catalog_version
+    bump_catalog_version()
+    # The manifest was written with queryset.update(); delta-sync clients need the row
+    Course.objects.filter(pk=pk).update(updated_at=timezone.now())
+
+
+class CourseRecommendations(models.Model):
+    """
+    "Students who bought this also bought": the courses most often bought
+    together with this one, by cosine similarity over completed purchases.
+    Precomputed by courses.recommendations; neighbours is a list of
+    [course_id, score] pairs, best first.
+    """
+    course = models.OneToOneField(Course, on_delete=models.CASCADE, primary_key=True, related_name='recommendations')
+    neighbours = models.JSONField(default=list)
+    computed_at = models.DateTimeField(db_index=True)
+    
+    class Meta:
+        db_table = 'course_recommendations'
+    
+    def __str__(self):
+        return f"{self.course_id}: {len(self.neighbours)} neighbours"
+
+
+class CourseTombstone(models.Model):
+    """A deleted course, so CourseChangesView can report it to clients syncing since before"""
+    course_id = models.BigIntegerField(primary_key=True)
+    deleted_at = models.DateTimeField()
+    
+    class Meta:
+        db_table = 'course_tombstones'
+        indexes = [
+            models.Index(fields=['deleted_at', 'course_id'], name='course_tombstones_deleted_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.course_id} deleted {self.deleted_at}"
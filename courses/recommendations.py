@@ -0,0 +1,186 @@
+"""
+Co-purchase course recommendations ("students who bought this also bought").
+
+Completed CourseSubscription rows form a binary student x course sparse
+matrix X. X.T @ X holds how many students bought each pair of courses, and
+the cosine similarity of courses a and b is
+
+    co_purchases(a, b) / sqrt(buyers(a) * buyers(b))
+
+The TOP_K most similar courses of each course (with at least
+MIN_CO_PURCHASES shared buyers) are stored in CourseRecommendations, so
+serving them is one primary key lookup.
+
+refresh() is incremental: only courses whose rollups (payments.rollups)
+changed since the last run, plus every course sharing a buyer with them,
+are recomputed, from those buyers' purchases alone. refresh(full=True)
+recomputes every course, drops courses nobody owns any more and catches
+what incremental runs can't see (deleted subscriptions of other students).
+"""
+
+from datetime import timedelta
+from itertools import chain
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+import logging
+import time
+
+import numpy as np
+from scipy import sparse
+
+logger = logging.getLogger(__name__)
+
+
+def _setting(name, default):
+    return getattr(settings, 'COURSE_RECOMMENDATIONS', {}).get(name, default)
+
+
+def purchase_matrix(student_ids, course_ids):
+    """
+    Binary student x course CSC matrix from parallel arrays of purchase
+    pairs. Returns (matrix, course id of each column).
+    """
+    students, rows = np.unique(student_ids, return_inverse=True)
+    courses, columns = np.unique(course_ids, return_inverse=True)
+    matrix = sparse.csc_matrix(
+        (np.ones(len(rows), dtype=np.int32), (rows, columns)), shape=(len(students), len(courses)),
+    )
+    # A repeated pair is still one purchase
+    matrix.sum_duplicates()
+    matrix.data[:] = 1
+    return matrix, courses
+
+
+def top_neighbours(matrix, columns, buyers, k, min_co_purchases=1):
+    """
+    The k columns most cosine-similar to each column index in `columns`.
+
+    buyers holds every column's total buyer count, which exceeds its column
+    sum when the matrix only covers some students. Returns parallel
+    (row, neighbour column, score) arrays, rows ascending and best first
+    within a row; ties go to the lower column.
+    """
+    columns = np.asarray(columns, dtype=np.int64)
+    if not len(columns) or not matrix.nnz:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+
+    # Co-purchase counts of the requested courses with every course
+    co = (matrix[:, columns].T @ matrix).tocsr()
+    rows = np.repeat(np.arange(len(columns)), np.diff(co.indptr))
+    neighbours = co.indices.astype(np.int64)
+    counts = co.data
+
+    keep = (counts >= min_co_purchases) & (neighbours != columns[rows])
+    rows, neighbours, counts = rows[keep], neighbours[keep], counts[keep]
+    buyers = np.asarray(buyers, dtype=np.float64)
+    scores = counts / np.sqrt(buyers[columns[rows]] * buyers[neighbours])
+
+    order = np.lexsort((neighbours, -scores, rows))
+    rows, neighbours, scores = rows[order], neighbours[order], scores[order]
+    # Position of each entry within its row
+    rank = np.arange(len(rows)) - np.searchsorted(rows, rows)
+    keep = rank < k
+    return rows[keep], neighbours[keep], scores[keep]
+
+
+def neighbour_lists(course_ids, columns, rows, neighbours, scores):
+    """{course id: [[course id, score], ...]} for each of `columns`, from top_neighbours() output"""
+    requested = course_ids[np.asarray(columns, dtype=np.int64)].tolist()
+    lists = {course_id: [] for course_id in requested}
+    for row, neighbour, score in zip(rows.tolist(), course_ids[neighbours].tolist(), np.round(scores, 4).tolist()):
+        lists[requested[row]].append([neighbour, score])
+    return lists
+
+
+def _purchase_pairs(queryset):
+    """(student ids, course ids) arrays of a CourseSubscription queryset"""
+    rows = queryset.order_by().values_list('student_id', 'course_id').iterator(chunk_size=20000)
+    flat = np.fromiter(chain.from_iterable(rows), dtype=np.int64)
+    return flat[0::2], flat[1::2]
+
+
+def last_refresh():
+    from .models import CourseRecommendations
+
+    return CourseRecommendations.objects.aggregate(last=Max('computed_at'))['last']
+
+
+def refresh(full=False):
+    """
+    Recompute stored recommendations: of courses touched since the last run,
+    or of every course with full=True (also used when nothing was computed
+    yet). Returns the number of courses written.
+    """
+    from payments.models import CourseDailyStats, CourseSubscription
+    from .models import CourseRecommendations
+
+    started = timezone.now()
+    timer = time.monotonic()
+    completed = CourseSubscription.objects.filter(payment_status='completed')
+
+    since = None if full else last_refresh()
+    if since is None:
+        full = True
+        affected = None
+        purchases = completed
+    else:
+        # Transitions still uncommitted at the last run carry older timestamps
+        since -= timedelta(seconds=_setting('OVERLAP_SECONDS', 300))
+        changed = set(CourseDailyStats.objects.filter(updated_at__gte=since).values_list('course_id', flat=True))
+        if not changed:
+            return 0
+        # Each of their buyers (or refunders) moved the co-purchase counts
+        # of the changed course with all of their other courses
+        touched = CourseSubscription.objects.filter(course_id__in=changed).values('student_id')
+        affected = changed | set(
+            completed.filter(student_id__in=touched).order_by().values_list('course_id', flat=True).distinct()
+        )
+        # A course's row needs the full purchase history of its buyers only
+        purchases = completed.filter(
+            student_id__in=completed.filter(course_id__in=affected).values('student_id')
+        )
+
+    matrix, course_ids = purchase_matrix(*_purchase_pairs(purchases))
+    if full:
+        buyers = matrix.getnnz(axis=0)
+        columns = np.arange(len(course_ids))
+    else:
+        totals = dict(completed.order_by().values('course_id').annotate(n=Count('id')).values_list('course_id', 'n'))
+        # max(): purchases completed between the two queries
+        buyers = np.maximum([totals.get(course_id, 0) for course_id in course_ids.tolist()], matrix.getnnz(axis=0))
+        columns = np.flatnonzero(np.isin(course_ids, list(affected)))
+
+    lists = neighbour_lists(course_ids, columns, *top_neighbours(
+        matrix, columns, buyers, _setting('TOP_K', 20), _setting('MIN_CO_PURCHASES', 2),
+    ))
+    for course_id in affected or ():
+        # Changed courses with no completed purchases left
+        lists.setdefault(course_id, [])
+
+    with transaction.atomic():
+        CourseRecommendations.objects.bulk_create(
+            [CourseRecommendations(course_id=course_id, neighbours=neighbours, computed_at=started)
+             for course_id, neighbours in lists.items()],
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['course'],
+            update_fields=['neighbours', 'computed_at'],
+        )
+        if full:
+            CourseRecommendations.objects.filter(computed_at__lt=started).delete()
+
+    logger.info(
+        f"Refreshed recommendations of {len(lists)} courses ({'full' if full else 'incremental'}) "
+        f"from {matrix.nnz} purchases in {time.monotonic() - timer:.2f}s"
+    )
+    return len(lists)
+
+
+def neighbours_of(course_id):
+    """Stored [[course id, score], ...] for a course, best first; [] when not computed"""
+    from .models import CourseRecommendations
+
+    row = CourseRecommendations.objects.filter(course_id=course_id).values_list('neighbours', flat=True).first()
+    return row or []
@@ -0,0 +1,115 @@
+"""
+Course catalog search.
+
+On Postgres, Course.search_vector holds a weighted tsvector (name 'A',
+category 'B', description 'C') maintained by Course.save() and backed by a
+GIN index. Every search term is matched as a prefix ('pyth' finds
+'python') and results come back ordered by ts_rank.
+
+Other databases (SQLite test runs) get an equivalent-enough fallback: every
+term must appear in one of the fields, and name matches outrank category
+matches, which outrank description matches.
+"""
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connections
+from django.db.models import Case, Count, F, IntegerField, Q, Value, When
+import re
+
+# Text search configuration used both for the column and the queries
+SEARCH_CONFIG = getattr(settings, 'COURSE_SEARCH_CONFIG', 'english')
+
+# Upper bound on terms per query, so a pasted paragraph stays cheap
+MAX_TERMS = 8
+
+_TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def search_vector():
+    """Expression the search_vector column is computed from"""
+    return (
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('category', weight='B', config=SEARCH_CONFIG)
+        + SearchVector('description', weight='C', config=SEARCH_CONFIG)
+    )
+
+
+def search_terms(text):
+    return _TERM_RE.findall(text.lower())[:MAX_TERMS]
+
+
+def prefix_query(terms):
+    """to_tsquery() matching every term as a prefix: 'data':* & 'sci':*"""
+    raw = ' & '.join(f"'{term}':*" for term in terms)
+    return SearchQuery(raw, search_type='raw', config=SEARCH_CONFIG)
+
+
+def _fallback_condition(terms):
+    condition = Q()
+    for term in terms:
+        condition &= Q(name__icontains=term) | Q(category__icontains=term) | Q(description__icontains=term)
+    return condition
+
+
+def filter_courses(queryset, text):
+    """Filter queryset to courses matching text, keeping its ordering"""
+    terms = search_terms(text)
+    if not terms:
+        return queryset.none()
+    if connections[queryset.db].vendor == 'postgresql':
+        return queryset.filter(search_vector=prefix_query(terms))
+    return queryset.filter(_fallback_condition(terms))
+
+
+def search_courses(queryset, text):
+    """Filter queryset to courses matching text, best matches first"""
+    terms = search_terms(text)
+    if not terms:
+        return queryset.none()
+
+    if connections[queryset.db].vendor == 'postgresql':
+        query = prefix_query(terms)
+        return queryset.filter(search_vector=query).annotate(
+            rank=SearchRank(F('search_vector'), query),
+        ).order_by('-rank', 'name', 'id')
+
+    return queryset.filter(_fallback_condition(terms)).annotate(
+        rank=Case(
+            When(name__icontains=terms[0], then=Value(3)),
+            When(category__icontains=terms[0], then=Value(2)),
+            default=Value(1),
+            output_field=IntegerField(),
+        ),
+    ).order_by('-rank', 'name', 'id')
+
+
+def catalog_facets(queryset):
+    """
+    {'category': [{'value', 'count'}], 'level': [{'value', 'label', 'count'}]}
+    for queryset, from one GROUP BY (category, level) query
+    """
+    from .models import Course
+
+    categories = {}
+    levels = {}
+    for row in queryset.order_by().values('category', 'level').annotate(count=Count('id')):
+        categories[row['category']] = categories.get(row['category'], 0) + row['count']
+        levels[row['level']] = levels.get(row['level'], 0) + row['count']
+    return {
+        'category': [
+            {'value': category, 'count': categories[category]}
+            for category in sorted(categories)
+        ],
+        'level': [
+            {'value': value, 'label': label, 'count': levels[value]}
+            for value, label in Course.LEVEL_CHOICES if value in levels
+        ],
+    }
+
+
+def update_search_vectors(queryset):
+    """Recompute search_vector for every course in queryset in one UPDATE"""
+    if connections[queryset.db].vendor != 'postgresql':
+        return 0
+    return queryset.update(search_vector=search_vector())
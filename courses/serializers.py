@@ -1,21 +1,30 @@
 from rest_framework import serializers
 from .models import Course
 from payments.models import CourseSubscription
+from edustream.fieldsets import SparseFieldsetMixin
+from edustream.images import variant_urls
 
 
-class CourseSerializer(serializers.ModelSerializer):
+class CourseSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    thumbnail_variants = serializers.SerializerMethodField()
+    
     class Meta:
         model = Course
         fields = [
             'id', 'name', 'slug', 'description', 'category',
-            'thumbnail', 'duration_hours', 'base_price', 'advantages', 
+            'thumbnail', 'thumbnail_variants', 'duration_hours', 'base_price', 'advantages', 
             'is_active', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'slug', 'created_at', 'updated_at']
+    
+    def get_thumbnail_variants(self, obj):
+        """Variant URLs by format and width; null until they have been generated"""
+        return variant_urls(obj, 'thumbnail', 'thumbnail_variants', self.context.get('request'))
         
 
-class PurchasedCoursesSerializer(serializers.ModelSerializer):
+class PurchasedCoursesSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     course = CourseSerializer(read_only=True)
+    sparse_relations = {'course': CourseSerializer}
     
     class Meta:
         model = CourseSubscription
@@ -0,0 +1,28 @@
+"""
+Background tasks for the courses app
+"""
+
+from celery import shared_task
+from django.conf import settings
+import logging
+
+from edustream.locks import cache_lock
+from .recommendations import refresh
+
+logger = logging.getLogger(__name__)
+
+
+def refresh_recommendations(full=False):
+    """courses.recommendations.refresh() on one node at a time; None when another node is running it"""
+    lock_seconds = settings.COURSE_RECOMMENDATIONS.get('LOCK_SECONDS', 3600)
+    with cache_lock('refresh-course-recommendations', timeout=lock_seconds) as acquired:
+        if not acquired:
+            logger.info("[RECOMMENDATIONS] Another node is refreshing, skipping")
+            return None
+        return refresh(full=full)
+
+
+@shared_task(ignore_result=True)
+def refresh_course_recommendations(full=False):
+    """Scheduled by CELERY_BEAT_SCHEDULE: incremental every few minutes, full daily"""
+    return refresh_recommendations(full=full)
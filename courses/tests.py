@@ -1,3 +1,64 @@
-from django.test import TestCase
+from decimal import Decimal
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
 
-# Create your tests here.
+from accounts.models import User
+from edustream.fieldsets import Fieldset
+from edustream.renderers import ORJSONRenderer
+from payments.models import CourseSubscription
+from .fast_serializers import FastCourseSerializer, FastPurchasedCoursesSerializer
+from .models import Course
+from .serializers import CourseSerializer, PurchasedCoursesSerializer
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+THUMBNAIL = 'course_thumbnails/Física básica — día 1.jpg'
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class FastSerializerOutputTests(TestCase):
+    """The values_list + ORJSONRenderer fast path renders the same bytes as the DRF serializers"""
+
+    def setUp(self):
+        cache.clear()
+        self.context = {'request': Request(APIRequestFactory().get('/api/courses/'))}
+        variants = {
+            'source': THUMBNAIL, 'hash': 'ab' * 32, 'width': 1280, 'height': 720,
+            'variants': {
+                'webp': {'320': 'course_thumbnails/variants/día 1_320.webp', '640': 'course_thumbnails/variants/día 1_640.webp'},
+                'jpeg': {'320': 'course_thumbnails/variants/día 1_320.jpg'},
+            },
+        }
+        physics = Course.objects.create(
+            name='Física básica', category='Ciencias', description='Leyes de Newton\u2028y más',
+            thumbnail=THUMBNAIL, thumbnail_variants=variants, base_price=Decimal('1999.50'),
+            advantages=['Vidéos', '24/7 "support"'],
+        )
+        algebra = Course.objects.create(name='Algebra', category='Math', description='x', base_price=Decimal('0.10'))
+        student = User.objects.create_user(username='student', email='student@example.com',
+                                           phone_number='+919876543210', password='Secret123')
+        for course in (physics, algebra):
+            CourseSubscription.objects.create(student=student, course=course, amount_paid=course.base_price)
+
+    def assertSameBytes(self, serializer_class, fast_class, queryset, fieldset=None):
+        expected = JSONRenderer().render(
+            serializer_class(queryset, many=True, context=self.context, fieldset=fieldset).data
+        )
+        fast = fast_class(self.context, fieldset=fieldset)
+        actual = ORJSONRenderer().render(fast.serialize(queryset.values_list(*fast.columns, named=True)))
+        self.assertEqual(actual, expected)
+
+    def test_courses(self):
+        self.assertSameBytes(CourseSerializer, FastCourseSerializer, Course.objects.order_by('id'))
+
+    def test_purchased_courses(self):
+        self.assertSameBytes(PurchasedCoursesSerializer, FastPurchasedCoursesSerializer,
+                             CourseSubscription.objects.order_by('id'))
+
+    def test_purchased_courses_fieldset(self):
+        fieldset = Fieldset(['id', 'purchased_at', 'course.base_price', 'course.thumbnail', 'course.thumbnail_variants'])
+        self.assertSameBytes(PurchasedCoursesSerializer, FastPurchasedCoursesSerializer,
+                             CourseSubscription.objects.order_by('id'), fieldset)
@@ -1,6 +1,7 @@
 from django.urls import path
 from .views import (
-    CourseListView, AdminCourseCreateView, AdminCourseUpdateView, MyCoursesView
+    CourseListView, CourseCatalogView, AdminCourseCreateView, AdminCourseUpdateView, MyCoursesView,
+    CourseRecommendationsView, CourseChangesView,
 )
 
 app_name = 'courses'
@@ -8,6 +9,9 @@ app_name = 'courses'
 urlpatterns = [
     # Public course endpoints
     path('', CourseListView.as_view(), name='course_list'),
+    path('catalog/', CourseCatalogView.as_view(), name='course_catalog'),
+    path('changes/', CourseChangesView.as_view(), name='course_changes'),
+    path('<int:id>/recommendations/', CourseRecommendationsView.as_view(), name='course_recommendations'),
     
     # Admin endpoints
     path('admin/create/course/', AdminCourseCreateView.as_view(), name='admin_course_create'),
@@ -1,53 +1,299 @@
-from rest_framework import generics, status, views
+from rest_framework import generics, serializers, status, views
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from django.db.models import Q
+from rest_framework.renderers import BrowsableAPIRenderer
+from django.conf import settings
 from django.utils import timezone
+from django.utils.cache import parse_etags, patch_vary_headers
 from datetime import datetime, timedelta
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from .models import Course
 from .serializers import CourseSerializer, PurchasedCoursesSerializer
+from .fast_serializers import FastCourseSerializer, FastPurchasedCoursesSerializer
+from .catalog_cache import get_or_build, page_key
+from .search import catalog_facets, filter_courses, search_courses
+from .recommendations import neighbours_of
+from .sync import changes_since
 from accounts.permissions import IsTeacher, IsStudent, IsTeacherOrAdmin, IsAdmin
 from payments.models import CourseSubscription
+from payments.purchases import purchased_course_ids
+from payments.rollups import with_popularity
+from edustream.fieldsets import Fieldset
+from edustream.pagination import KeysetPagination
+from edustream.renderers import ORJSONRenderer
 
 
-class CourseListView(generics.ListAPIView):
+COURSE_LIST_PARAMS = [
+    openapi.Parameter('search', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                      description='Full-text search; results are ordered by rank'),
+    openapi.Parameter('category', openapi.IN_QUERY, type=openapi.TYPE_STRING),
+    openapi.Parameter('level', openapi.IN_QUERY, type=openapi.TYPE_STRING),
+    openapi.Parameter('ordering', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=['popular'],
+                      description='popular: most net enrollments over the recent window'),
+]
+
+FIELDSET_PARAMS = [
+    openapi.Parameter('fields', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                      description='Comma-separated fields to return; nested ones as relation.field'),
+    openapi.Parameter('expand', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                      description='Relations to nest in full when ?fields= lists them by name'),
+]
+
+
+class CachedListMixin:
+    """
+    list() served from courses.catalog_cache: build_page() output is cached
+    per catalog version, query string and cache_key_parts(), and carries a
+    strong ETag for If-None-Match revalidation.
+    """
+    renderer_classes = [ORJSONRenderer, BrowsableAPIRenderer]
+    # Columns fetched even when the fieldset omits them (e.g. the paginator's ordering)
+    row_columns = ()
+    
+    def cache_key_parts(self):
+        return []
+    
+    def is_personal(self):
+        return False
+    
+    def catalog_cache_key(self, request):
+        params = request.query_params
+        # Paging, count, fieldsets and any other parameters, in a stable order
+        others = sorted(
+            (name, value) for name, values in params.lists()
+            if name not in ('search', 'category') for value in values
+        )
+        return page_key(
+            type(self).__name__,
+            # Serialized URLs are absolute and the body depends on the renderer
+            request.scheme, request.get_host(), request.accepted_renderer.format,
+            params.get('search', '').strip().lower(),
+            params.get('category', '').strip().lower(),
+            others,
+            *self.cache_key_parts(),
+        )
+    
+    def fast_serializer(self, request):
+        raise NotImplementedError
+    
+    def build_page(self, request):
+        # Same output as the DRF serializer, from values rows of the needed columns only
+        fast = self.fast_serializer(request)
+        columns = fast.columns + [column for column in self.row_columns if column not in fast.columns]
+        queryset = self.filter_queryset(self.get_queryset()).values_list(*columns, named=True)
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return fast.serialize(queryset)
+        return self.get_paginated_response(fast.serialize(page)).data
+    
+    def list(self, request, *args, **kwargs):
+        entry = get_or_build(self.catalog_cache_key(request), lambda: self.build_page(request))
+        etag = entry['etag']
+        
+        if etag in parse_etags(request.headers.get('If-None-Match', '')) or \
+                request.headers.get('If-None-Match', '').strip() == '*':
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(entry['data'])
+        response['ETag'] = etag
+        # Clients must revalidate; personal pages stay out of shared caches
+        response['Cache-Control'] = 'no-cache, private' if self.is_personal() else 'no-cache'
+        patch_vary_headers(response, ['Authorization'])
+        return response
+
+
+class CourseListView(CachedListMixin, generics.ListAPIView):
+    """
+    Active course catalog. Serialized pages are cached per catalog version
+    (see courses.catalog_cache) and carry strong ETags for If-None-Match.
+    """
     serializer_class = CourseSerializer
     permission_classes = [AllowAny]
     
-    def get_queryset(self):
-        queryset = Course.objects.filter(is_active=True)
+    def excluded_course_ids(self):
+        """Courses hidden from this user: a purchasing student's own courses"""
+        if not hasattr(self, '_excluded_course_ids'):
+            self._excluded_course_ids = []
+            user = self.request.user
+            if user.is_authenticated and user.role == 'student':
+                if not user.is_trial_expired and not user.has_purchased_courses:
+                    # In trial period and no purchases: return all active courses
+                    pass
+                elif user.has_purchased_courses:
+                    # Not in trial and has purchases: exclude purchased courses
+                    self._excluded_course_ids = sorted(purchased_course_ids(user.pk))
+        return self._excluded_course_ids
+    
+    def filtered_by_search(self, queryset, search):
+        return search_courses(queryset, search)
+    
+    def get_facet_queryset(self):
+        """Active courses after the student exclusion and search, before category/level"""
+        # search_vector is only ever read inside the database
+        queryset = Course.objects.filter(is_active=True).defer('search_vector')
         
         # Apply student-specific filtering
-        user = self.request.user
-        if user.is_authenticated and user.role == 'student':
-            if not user.is_trial_expired and not user.has_purchased_courses:
-                # In trial period and no purchases: return all active courses
-                pass
-            elif user.has_purchased_courses:
-                # Not in trial and has purchases: exclude purchased courses
-                purchased_course_ids = CourseSubscription.objects.filter(
-                    student=user,
-                    payment_status='completed'
-                ).values_list('course__id', flat=True)
-                queryset = queryset.exclude(id__in=purchased_course_ids)
+        excluded = self.excluded_course_ids()
+        if excluded:
+            queryset = queryset.exclude(id__in=excluded)
         
-        # Filter by search query
+        # Full-text search
         search = self.request.query_params.get('search', None)
         if search:
-            queryset = queryset.filter(
-                Q(name__icontains=search) |
-                Q(description__icontains=search) |
-                Q(category__icontains=search)
-            )
+            queryset = self.filtered_by_search(queryset, search)
+        return queryset
+    
+    def get_queryset(self):
+        queryset = self.get_facet_queryset()
         
         # Filter by category
         category = self.request.query_params.get('category', None)
         if category:
             queryset = queryset.filter(category__iexact=category)
+        
+        level = self.request.query_params.get('level', None)
+        if level:
+            queryset = queryset.filter(level=level)
+        
+        # Most net enrollments recently, from the payments rollups; cached
+        # pages can lag the rollups by the catalog cache TTL
+        if self.request.query_params.get('ordering') == 'popular':
+            queryset = with_popularity(queryset).order_by('-popularity', 'name', 'id')
             
         return queryset
+    
+    def cache_key_parts(self):
+        return [','.join(str(course_id) for course_id in self.excluded_course_ids())]
+    
+    def is_personal(self):
+        return bool(self.excluded_course_ids())
+    
+    def fast_serializer(self, request):
+        return FastCourseSerializer(self.get_serializer_context(), fieldset=Fieldset.from_request(request))
+    
+    @swagger_auto_schema(manual_parameters=COURSE_LIST_PARAMS + FIELDSET_PARAMS)
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+
+class CatalogPagination(KeysetPagination):
+    # Course.Meta.ordering plus the id tie-breaker; see courses_catalog_order_idx
+    ordering = ('category', 'name', 'id')
+
+
+CATALOG_PARAMS = [
+    openapi.Parameter('search', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                      description='Full-text search; every word is matched as a prefix'),
+    openapi.Parameter('category', openapi.IN_QUERY, type=openapi.TYPE_STRING),
+    openapi.Parameter('level', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                      enum=[value for value, _label in Course.LEVEL_CHOICES]),
+    openapi.Parameter('cursor', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                      description='Opaque cursor from a next/previous link'),
+    openapi.Parameter('page_size', openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+    openapi.Parameter('count', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=['estimate', 'exact', 'none'],
+                      description='How the total is reported (default: planner estimate)'),
+]
+
+
+class CourseCatalogView(CourseListView):
+    """
+    Course catalog with category/level facet counts, cursor-paginated in
+    (category, name, id) order. Facets honour the student exclusion and
+    ?search= but not ?category=/?level=, so every option stays selectable.
+    """
+    pagination_class = CatalogPagination
+    row_columns = CatalogPagination.ordering
+    
+    def filtered_by_search(self, queryset, search):
+        # Results keep catalog order, so rank isn't needed
+        return filter_courses(queryset, search)
+    
+    def build_page(self, request):
+        data = super().build_page(request)
+        data['facets'] = catalog_facets(self.get_facet_queryset())
+        return data
+    
+    @swagger_auto_schema(manual_parameters=CATALOG_PARAMS + FIELDSET_PARAMS)
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+
+class CourseRecommendationsView(views.APIView):
+    """
+    "Students who bought this also bought": precomputed co-purchase
+    neighbours of a course (courses.recommendations), best first. A
+    student's own courses and inactive courses are left out.
+    """
+    permission_classes = [AllowAny]
+    renderer_classes = [ORJSONRenderer, BrowsableAPIRenderer]
+    
+    @swagger_auto_schema(manual_parameters=[
+        openapi.Parameter('limit', openapi.IN_QUERY, type=openapi.TYPE_INTEGER,
+                          description='At most this many courses (default 10)'),
+    ])
+    def get(self, request, id):
+        max_results = settings.COURSE_RECOMMENDATIONS.get('TOP_K', 20)
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), max_results)
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        neighbours = neighbours_of(id)
+        user = request.user
+        if user.is_authenticated and user.role == 'student':
+            owned = purchased_course_ids(user.pk)
+            neighbours = [pair for pair in neighbours if pair[0] not in owned]
+        
+        courses = Course.objects.filter(
+            id__in=[id] + [course_id for course_id, _score in neighbours], is_active=True,
+        ).defer('search_vector').in_bulk()
+        if id not in courses:
+            return Response({'error': 'Course not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        results = [(courses[course_id], score) for course_id, score in neighbours if course_id in courses][:limit]
+        data = CourseSerializer([course for course, _score in results], many=True, context={'request': request}).data
+        return Response({
+            'course_id': id,
+            'results': [{'course': course, 'score': score} for course, (_obj, score) in zip(data, results)],
+        })
+
+
+class CourseChangesView(views.APIView):
+    """
+    Catalog delta sync (courses.sync): every active course on the first
+    call, then only courses created, updated, deactivated or deleted after
+    ?since=<watermark>. Keep calling with the returned watermark while
+    has_more is true. This is the public catalog; a student's purchased
+    courses are not left out.
+    """
+    permission_classes = [AllowAny]
+    renderer_classes = [ORJSONRenderer, BrowsableAPIRenderer]
+    
+    @swagger_auto_schema(manual_parameters=[
+        openapi.Parameter('since', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                          description='Watermark from the previous response; omit for a full sync'),
+        openapi.Parameter('page_size', openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+    ])
+    def get(self, request):
+        sync_settings = settings.COURSE_SYNC
+        try:
+            page_size = int(request.query_params.get('page_size', sync_settings.get('PAGE_SIZE', 100)))
+        except ValueError:
+            return Response({'error': 'page_size must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        page_size = min(max(page_size, 1), sync_settings.get('MAX_PAGE_SIZE', 500))
+        
+        fast = FastCourseSerializer({'request': request, 'view': self})
+        rows, tombstones, watermark, has_more = changes_since(
+            request.query_params.get('since') or None, fast.columns, page_size,
+        )
+        removed_at = serializers.DateTimeField()
+        return Response({
+            'watermark': watermark,
+            'has_more': has_more,
+            'changed': fast.serialize(rows),
+            'deleted': [{'id': pk, 'removed_at': removed_at.to_representation(moment)} for pk, moment in tombstones],
+        })
 
 
 # Admin Course Management Views
@@ -79,8 +325,11 @@ class AdminCourseUpdateView(generics.UpdateAPIView):
     lookup_field = 'id'
 
 
-class MyCoursesView(generics.ListAPIView):
-    """List all purchased courses for a student"""
+class MyCoursesView(CachedListMixin, generics.ListAPIView):
+    """
+    List all purchased courses for a student. Cached per student until
+    their purchased set (payments.purchases) or the catalog changes.
+    """
     serializer_class = PurchasedCoursesSerializer
     permission_classes = [IsAuthenticated, IsStudent]
     
@@ -89,3 +338,18 @@ class MyCoursesView(generics.ListAPIView):
             student=self.request.user,
             payment_status='completed'
         ).select_related('course').order_by('-purchased_at')
+    
+    def cache_key_parts(self):
+        # The set changes exactly when a subscription of theirs completes or is refunded
+        user_id = self.request.user.pk
+        return [user_id, ','.join(str(course_id) for course_id in sorted(purchased_course_ids(user_id)))]
+    
+    def is_personal(self):
+        return True
+    
+    def fast_serializer(self, request):
+        return FastPurchasedCoursesSerializer(self.get_serializer_context(), fieldset=Fieldset.from_request(request))
+    
+    @swagger_auto_schema(manual_parameters=FIELDSET_PARAMS)
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
@@ -0,0 +1,20 @@
+"""
+Celery application for the edustream project.
+
+Workers are started with:
+    celery -A edustream worker -Q celery,otp,images -l info
+"""
+
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'edustream.settings')
+
+app = Celery('edustream')
+
+# Read all CELERY_* settings from Django settings
+app.config_from_object('django.conf:settings', namespace='CELERY')
+
+# Load tasks.py from every installed app
+app.autodiscover_tasks()
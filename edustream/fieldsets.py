@@ -0,0 +1,88 @@
+"""
+Sparse fieldsets: ?fields= and ?expand=.
+
+    ?fields=id,course.name,course.thumbnail
+    ?fields=id,purchased_at,course&expand=course
+
+Without ?fields= responses are unchanged. With it only the listed fields
+are rendered, in their declared order. A nested relation listed by name
+alone renders as its primary key unless ?expand= names it; entries like
+`course.name` pick the nested object's own fields.
+"""
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.serializers import PrimaryKeyRelatedField
+
+
+def _split(value):
+    return [item.strip() for item in (value or '').split(',') if item.strip()]
+
+
+class Fieldset:
+    """Requested fields of one serializer; fields=None means all of them"""
+
+    def __init__(self, fields=None, expand=()):
+        self.expand = set(expand)
+        self.nested = {}
+        if fields is None:
+            self.fields = None
+            return
+        self.fields = set()
+        for item in fields:
+            name, _, sub = item.partition('.')
+            self.fields.add(name)
+            if sub:
+                self.nested.setdefault(name, []).append(sub)
+
+    @classmethod
+    def from_request(cls, request):
+        params = request.query_params
+        fields = params.get('fields')
+        return cls(None if fields is None else _split(fields), _split(params.get('expand')))
+
+    @property
+    def is_sparse(self):
+        return self.fields is not None
+
+    def select(self, available):
+        """Names of `available` (declared order) to render; unknown names are a 400"""
+        if self.fields is None:
+            return list(available)
+        unknown = self.fields - set(available)
+        if unknown:
+            raise ValidationError({'fields': [f"Unknown field(s): {', '.join(sorted(unknown))}"]})
+        return [name for name in available if name in self.fields]
+
+    def relation(self, name):
+        """Fieldset for a nested relation, or None to render it as its primary key"""
+        if name in self.nested:
+            return Fieldset(self.nested[name])
+        if self.fields is None or name in self.expand:
+            return Fieldset()
+        return None
+
+
+class SparseFieldsetMixin:
+    """
+    Serializer accepting fieldset=Fieldset(...) to render a subset of its
+    fields. Nested serializers listed in `sparse_relations` (name -> class)
+    get the relation's fieldset, or become a primary key when not expanded.
+    """
+    sparse_relations = {}
+
+    def __init__(self, *args, fieldset=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fieldset is None or not fieldset.is_sparse:
+            return
+        keep = fieldset.select(list(self.fields))
+        for name in list(self.fields):
+            if name not in keep:
+                self.fields.pop(name)
+        for name, serializer_class in self.sparse_relations.items():
+            if name not in self.fields:
+                continue
+            nested = fieldset.relation(name)
+            if nested is None:
+                self.fields[name] = PrimaryKeyRelatedField(read_only=True)
+            else:
+                self.fields[name] = serializer_class(read_only=True, fieldset=nested)
@@ -0,0 +1,199 @@
+"""
+Resized/re-encoded variants of uploaded images (course thumbnails,
+teacher profile pictures).
+
+Variants are produced by a Celery task on the 'images' queue, named after
+the SHA-256 of the original's bytes, and recorded in a JSON manifest field
+next to the image field:
+
+    {'source': <original name>, 'hash': ..., 'width': ..., 'height': ...,
+     'variants': {'webp': {'320': <name>, ...}, 'jpeg': {...}}}
+
+Serializers call variant_urls(); when the manifest doesn't describe the
+current original (new upload, never processed) it returns None and queues
+a regeneration, so clients fall back to the original until variants exist.
+"""
+
+from celery import shared_task
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.dispatch import Signal
+from django.utils.encoding import filepath_to_uri
+from io import BytesIO
+import hashlib
+import logging
+import os
+
+from edustream.metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+IMAGE_VARIANTS = getattr(settings, 'IMAGE_VARIANTS', {})
+
+# Sent after a manifest is stored (sender=model class, pk=...); caches of
+# serialized pages embedding variant URLs listen for it
+variants_ready = Signal()
+
+variants_generated = Counter('image_variants.generated')
+variants_failed = Counter('image_variants.failed')
+
+# Pillow format name and extension per variant format
+_FORMATS = {
+    'webp': ('WEBP', 'webp'),
+    'jpeg': ('JPEG', 'jpg'),
+}
+
+
+def _manifest_is_current(manifest, field_file):
+    return bool(manifest) and manifest.get('source') == field_file.name
+
+
+def _encode(image, fmt, quality):
+    pil_format, _ext = _FORMATS[fmt]
+    if fmt == 'jpeg' and image.mode not in ('RGB', 'L'):
+        # JPEG has no alpha channel: flatten onto white
+        from PIL import Image
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A') if 'A' in image.getbands() else None)
+        image = background
+    buffer = BytesIO()
+    options = {'quality': quality, 'optimize': True}
+    if fmt == 'jpeg':
+        options['progressive'] = True
+    elif fmt == 'webp':
+        options['method'] = 4
+    image.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def build_variants(field_file):
+    """Write every variant of field_file to its storage and return the manifest"""
+    from PIL import Image, ImageOps
+
+    widths = IMAGE_VARIANTS.get('WIDTHS', [160, 320, 640, 1280])
+    formats = IMAGE_VARIANTS.get('FORMATS', ['webp', 'jpeg'])
+    quality = IMAGE_VARIANTS.get('QUALITY', {'webp': 80, 'jpeg': 82})
+    storage = field_file.storage
+
+    with field_file.open('rb') as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()
+
+    image = Image.open(BytesIO(data))
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'RGBA', 'L'):
+        image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+    width, height = image.size
+
+    # Never upscale; an original narrower than every width gets one
+    # re-encoded variant at its own size
+    targets = sorted({w for w in widths if w < width} | {min(width, max(widths))})
+
+    directory = os.path.join(os.path.dirname(field_file.name), 'variants')
+    manifest = {'source': field_file.name, 'hash': digest, 'width': width, 'height': height, 'variants': {}}
+    for target in targets:
+        resized = image if target == width else image.resize(
+            (target, max(1, round(height * target / width))), Image.LANCZOS
+        )
+        for fmt in formats:
+            name = os.path.join(directory, f'{digest[:32]}_{target}.{_FORMATS[fmt][1]}')
+            # Content-addressed: an identical original is never re-encoded
+            if not storage.exists(name):
+                storage.save(name, ContentFile(_encode(resized, fmt, quality.get(fmt, 80))))
+            manifest['variants'].setdefault(fmt, {})[str(target)] = name
+    return manifest
+
+
+@shared_task(
+    autoretry_for=(OSError,),
+    retry_backoff=True,
+    retry_kwargs={'max_retries': 3},
+)
+def generate_image_variants(model_label, pk, field_name, manifest_field):
+    model = apps.get_model(model_label)
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None:
+        return
+    field_file = getattr(instance, field_name)
+    if not field_file or _manifest_is_current(getattr(instance, manifest_field), field_file):
+        return
+
+    from PIL import Image, UnidentifiedImageError
+    try:
+        manifest = build_variants(field_file)
+        variants_generated.incr()
+    except (UnidentifiedImageError, Image.DecompressionBombError, ValueError) as e:
+        # Record the failure so readers stop re-queueing this original
+        logger.error(f"Cannot build variants for {model_label}:{pk} {field_name}: {str(e)}")
+        variants_failed.incr()
+        manifest = {'source': field_file.name, 'error': str(e)[:200]}
+
+    # Only if the original is still the one we processed
+    if model.objects.filter(pk=pk, **{field_name: field_file.name}).update(**{manifest_field: manifest}):
+        variants_ready.send(sender=model, pk=pk, field_name=field_name)
+
+
+def schedule_variants(instance, field_name, manifest_field):
+    """Queue generation once per original (deduplicated across requests)"""
+    _schedule(instance._meta.label, instance.pk, field_name, getattr(instance, field_name).name, manifest_field)
+
+
+def _schedule(model_label, pk, field_name, source_name, manifest_field):
+    digest = hashlib.sha1(source_name.encode()).hexdigest()
+    key = f'image_variants:{model_label}:{pk}:{field_name}:{digest}'
+    if not cache.add(key, 1, IMAGE_VARIANTS.get('SCHEDULE_DEDUPE_SECONDS', 600)):
+        return
+    args = (model_label, pk, field_name, manifest_field)
+    transaction.on_commit(lambda: generate_image_variants.delay(*args))
+
+
+def variant_urls(instance, field_name, manifest_field, request=None):
+    """{'webp': {'320': url, ...}, 'jpeg': {...}} for the current original, or None"""
+    return row_variant_urls(
+        type(instance), instance.pk, field_name, getattr(instance, field_name).name,
+        manifest_field, getattr(instance, manifest_field), request,
+    )
+
+
+def url_builder(storage, request=None):
+    """
+    name -> storage.url(name), absolute when there is a request. When the
+    storage's URLs are a fixed prefix plus the quoted name (local files,
+    public S3/CDN) the prefix is computed once instead of per name.
+    """
+    def build(name):
+        url = storage.url(name)
+        return request.build_absolute_uri(url) if request is not None else url
+
+    probe = 'probe/a b+é.jpg'
+    expected, quoted = build(probe), filepath_to_uri(probe)
+    # Signed URLs (query strings) differ per name
+    if not expected.endswith(quoted) or '?' in expected or '#' in expected:
+        return build
+    prefix = expected[:-len(quoted)]
+    return lambda name: prefix + filepath_to_uri(name)
+
+
+def row_variant_urls(model, pk, field_name, source_name, manifest_field, manifest, request=None, build_url=None):
+    """
+    variant_urls() for a values() row: the stored image name and manifest
+    instead of an instance. build_url (see url_builder) replaces
+    storage.url() + request.build_absolute_uri().
+    """
+    if not source_name:
+        return None
+    if not manifest or manifest.get('source') != source_name:
+        _schedule(model._meta.label, pk, field_name, source_name, manifest_field)
+        return None
+    if 'variants' not in manifest:
+        return None
+
+    if build_url is None:
+        build_url = url_builder(model._meta.get_field(field_name).storage, request)
+    return {
+        fmt: {width: build_url(name) for width, name in names.items()}
+        for fmt, names in manifest['variants'].items()
+    }
@@ -0,0 +1,56 @@
+"""
+Trigram (pg_trgm) indexes for admin/ILIKE-style search.
+
+On Postgres, Django compiles field__icontains (and so ModelAdmin
+search_fields) to UPPER(field::text) LIKE UPPER('%term%'). A GIN trigram
+index over that exact expression lets the planner answer it with a bitmap
+index scan instead of a sequential scan.
+
+GIN indexes and operator classes only exist on Postgres, so these indexes
+are declared with PostgresGinIndex, which other backends (the SQLite test
+database) skip.
+"""
+
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.db.models import TextField
+from django.db.models.functions import Cast, Upper
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class PostgresGinIndex(GinIndex):
+    """GinIndex that is only created (and dropped) on PostgreSQL"""
+
+    def create_sql(self, model, schema_editor, using='', **kwargs):
+        if schema_editor.connection.vendor != 'postgresql':
+            # The schema editor executes whatever is returned; an empty statement is a no-op
+            return ''
+        return super().create_sql(model, schema_editor, using=using, **kwargs)
+
+    def remove_sql(self, model, schema_editor, **kwargs):
+        if schema_editor.connection.vendor != 'postgresql':
+            return ''
+        return super().remove_sql(model, schema_editor, **kwargs)
+
+
+def trigram_index(field, name):
+    """GIN index serving field__icontains / admin search on `field`"""
+    return PostgresGinIndex(
+        OpClass(Upper(Cast(field, output_field=TextField())), name='gin_trgm_ops'),
+        name=name,
+    )
+
+
+def create_trigram_extension(using='default', **kwargs):
+    """pre_migrate receiver: the opclass must exist before tables are created"""
+    from django.db import connections
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    except Exception as e:
+        logger.error(f"Could not create the pg_trgm extension: {str(e)}")
+        raise
@@ -0,0 +1,24 @@
+"""
+Cluster-wide mutual exclusion built on the shared Django cache.
+"""
+
+from contextlib import contextmanager
+from django.core.cache import cache
+import uuid
+
+
+@contextmanager
+def cache_lock(name, timeout=300):
+    """
+    Try to take a named lock for at most `timeout` seconds. Yields True when
+    this caller holds the lock and False when another node already does.
+    """
+    key = f'lock:{name}'
+    token = uuid.uuid4().hex
+    acquired = cache.add(key, token, timeout)
+    try:
+        yield acquired
+    finally:
+        # Don't release a lock that expired and was taken by someone else
+        if acquired and cache.get(key) == token:
+            cache.delete(key)
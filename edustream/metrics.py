@@ -0,0 +1,85 @@
+"""
+Lightweight process-independent metrics stored in the Django cache.
+
+Counters and timers are shared by every web process and worker that
+points at the same cache, so values can be read from the admin metrics
+endpoint without a separate monitoring stack.
+"""
+
+from django.core.cache import cache
+import logging
+
+logger = logging.getLogger(__name__)
+
+REGISTRY = {}
+
+KEY_PREFIX = 'metrics'
+
+
+class Counter:
+    """Monotonic or up/down counter (use decr for gauges such as queue depth)"""
+
+    def __init__(self, name):
+        self.name = name
+        self.key = f'{KEY_PREFIX}:{name}'
+        REGISTRY[name] = self
+
+    def incr(self, amount=1):
+        try:
+            cache.add(self.key, 0, None)
+            return cache.incr(self.key, amount)
+        except Exception as e:
+            logger.warning(f"Metric {self.name} not updated: {str(e)}")
+            return None
+
+    def decr(self, amount=1):
+        return self.incr(-amount)
+
+    def value(self):
+        return cache.get(self.key, 0)
+
+
+class Timer:
+    """Records count and total duration so the average can be derived"""
+
+    def __init__(self, name):
+        self.name = name
+        self.count = Counter(f'{name}.count')
+        self.total_ms = Counter(f'{name}.total_ms')
+        # Only the timer itself is reported, not its internal counters
+        REGISTRY.pop(self.count.name)
+        REGISTRY.pop(self.total_ms.name)
+        REGISTRY[name] = self
+
+    def observe(self, seconds):
+        self.count.incr()
+        self.total_ms.incr(int(seconds * 1000))
+
+    def value(self):
+        count = self.count.value()
+        total_ms = self.total_ms.value()
+        return {
+            'count': count,
+            'avg_ms': round(total_ms / count, 2) if count else 0,
+        }
+
+
+class LocalMetric:
+    """Reports a value computed in the serving process (e.g. pool stats)"""
+
+    def __init__(self, name, fn):
+        self.name = name
+        self.fn = fn
+        REGISTRY[name] = self
+
+    def value(self):
+        return self.fn()
+
+
+def register_local(name, fn):
+    return LocalMetric(name, fn)
+
+
+def snapshot():
+    """Current value of every registered metric"""
+    return {name: metric.value() for name, metric in sorted(REGISTRY.items())}
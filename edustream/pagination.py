@@ -0,0 +1,179 @@
+"""
+Keyset (seek) pagination and cheap row-count estimates.
+
+KeysetPagination orders by a fixed tuple of fields ending in a unique one
+and pages with "WHERE (fields) after (last row's values)", so page N costs
+the same as page 1 given an index on those fields. Totals come from the
+Postgres planner by default instead of a COUNT(*) over the whole filter.
+"""
+
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Below this many estimated rows an exact COUNT is cheap and more useful
+EXACT_COUNT_THRESHOLD = 1000
+
+
+def planner_estimate(queryset):
+    """Postgres' row estimate for a queryset, or None on other databases"""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    try:
+        plan = json.loads(queryset.order_by().explain(format='json'))
+        return int(plan[0]['Plan']['Plan Rows'])
+    except Exception as e:
+        logger.warning(f"Planner estimate failed: {str(e)}")
+        return None
+
+
+def estimated_count(queryset, threshold=EXACT_COUNT_THRESHOLD):
+    """
+    (count, is_estimate). Uses the planner estimate when it is large enough
+    that an exact COUNT would be expensive; exact otherwise.
+    """
+    estimate = planner_estimate(queryset)
+    if estimate is not None and estimate >= threshold:
+        return estimate, True
+    return queryset.count(), False
+
+
+class KeysetPagination(BasePagination):
+    """
+    Subclasses set `ordering`, e.g. ('-created_at', '-id'); the last field
+    must be unique. ?count=estimate (default) | exact | none picks how the
+    total is reported.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    count_modes = ('estimate', 'exact', 'none')
+
+    def _fields(self, queryset):
+        return [
+            (queryset.model._meta.get_field(name.lstrip('-')), name.startswith('-'))
+            for name in self.ordering
+        ]
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def encode_cursor(self, instance, reverse):
+        values = [field.value_to_string(instance) for field, _desc in self.fields]
+        payload = json.dumps({'v': values, 'r': reverse}, separators=(',', ':'))
+        cursor = urlsafe_b64encode(payload.encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(urlsafe_b64decode(encoded.encode()).decode())
+            values = [
+                field.to_python(value)
+                for (field, _desc), value in zip(self.fields, payload['v'], strict=True)
+            ]
+            return values, bool(payload.get('r'))
+        except Exception:
+            raise NotFound('Invalid cursor')
+
+    def seek_filter(self, values, forward):
+        """Rows strictly after `values` in the paging direction"""
+        condition = Q()
+        equal = Q()
+        for (field, descending), value in zip(self.fields, values):
+            after = 'lt' if descending == forward else 'gt'
+            condition |= equal & Q(**{f'{field.name}__{after}': value})
+            equal &= Q(**{field.name: value})
+        # Redundant bound on the leading column lets the index range scan start there
+        (lead, descending), lead_value = self.fields[0], values[0]
+        bound = 'lte' if descending == forward else 'gte'
+        return Q(**{f'{lead.name}__{bound}': lead_value}) & condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = remove_query_param(request.build_absolute_uri(), self.cursor_query_param)
+        self.fields = self._fields(queryset)
+        page_size = self.get_page_size(request)
+        values, reverse = self.decode_cursor(request)
+
+        self.count_mode = request.query_params.get(self.count_query_param, 'estimate')
+        if self.count_mode not in self.count_modes:
+            self.count_mode = 'estimate'
+        self.count = self.count_is_estimate = None
+        if self.count_mode == 'exact':
+            self.count, self.count_is_estimate = queryset.count(), False
+        elif self.count_mode == 'estimate':
+            self.count, self.count_is_estimate = estimated_count(queryset)
+
+        ordering = list(self.ordering)
+        if reverse:
+            ordering = [name[1:] if name.startswith('-') else f'-{name}' for name in ordering]
+        page = queryset.order_by(*ordering)
+        if values is not None:
+            page = page.filter(self.seek_filter(values, forward=not reverse))
+
+        # One extra row tells us whether there is another page
+        rows = list(page[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+
+        if reverse:
+            self.has_next, self.has_previous = values is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, values is not None
+        self.page = rows
+        return rows
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        response = OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+        ])
+        if self.count_mode != 'none':
+            response['count'] = self.count
+            response['count_is_estimate'] = self.count_is_estimate
+        response['results'] = data
+        return Response(response)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'count': {'type': 'integer'},
+                'count_is_estimate': {'type': 'boolean'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,27 @@
+"""
+Process-wide Redis client shared by features that need Redis data
+structures directly (sets, sorted sets, Lua scripts) rather than the
+plain key/value Django cache API.
+"""
+
+from django.conf import settings
+import os
+import threading
+
+import redis
+
+_client = None
+_client_pid = None
+_lock = threading.Lock()
+
+
+def get_redis():
+    """Return a Redis client backed by this process's connection pool"""
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        with _lock:
+            if _client is None or _client_pid != pid:
+                _client = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+                _client_pid = pid
+    return _client
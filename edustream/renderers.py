@@ -0,0 +1,48 @@
+"""
+DRF renderers.
+
+ORJSONRenderer produces the same bytes as rest_framework's JSONRenderer
+(compact separators, UTF-8, \\u2028/\\u2029 escaped) several times faster.
+Types orjson would format differently from DRF's encoder (datetimes,
+dates, times, dataclasses, Decimal) are handed to that encoder. Floats use
+the same shortest round-trip digits; only exponent spelling (1e16 vs
+1e+16) and non-finite values differ, so views whose payloads may carry
+those should keep JSONRenderer.
+"""
+
+from rest_framework.renderers import JSONRenderer
+import logging
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """JSONRenderer output via orjson; falls back to JSONRenderer when it can't match it"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        # orjson only writes the compact, unescaped-UTF-8 form
+        if (orjson is None or self.ensure_ascii or not self.compact
+                or self.get_indent(accepted_media_type, renderer_context) is not None):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_NON_STR_KEYS,
+            )
+        except (orjson.JSONEncodeError, TypeError) as e:
+            logger.debug(f"orjson could not render {type(data).__name__}, using json: {str(e)}")
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Same strict-javascript-subset escaping as JSONRenderer
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
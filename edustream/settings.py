@@ -92,6 +92,16 @@ CHANNEL_LAYERS = {
     },
 }
 
+# Redis used for caching and for features that need Redis data structures
+REDIS_URL = os.environ.get('REDIS_URL', f"redis://{os.environ.get('REDIS_HOST', 'localhost')}:6379/1")
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.redis.RedisCache'),
+        'LOCATION': REDIS_URL,
+    }
+}
+
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
@@ -147,6 +157,34 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Cached CourseListView pages: fresh for TTL_SECONDS, then served stale for
+# up to STALE_GRACE_SECONDS while one worker (holding the rebuild lock)
+# refreshes them. Any Course save/delete invalidates every page.
+COURSE_CATALOG_CACHE = {
+    'TTL_SECONDS': int(os.environ.get('CATALOG_CACHE_TTL_SECONDS', '300')),
+    'STALE_GRACE_SECONDS': 600,
+    'LOCK_SECONDS': 30,
+    'WAIT_SECONDS': 2.0,
+}
+
+# Catalog delta sync (courses.sync): changes per response, and how long a
+# just-updated course is held back so slower concurrent commits can't be
+# skipped by a watermark that already passed them
+COURSE_SYNC = {
+    'PAGE_SIZE': 100,
+    'MAX_PAGE_SIZE': 500,
+    'SETTLE_SECONDS': int(os.environ.get('COURSE_SYNC_SETTLE_SECONDS', '5')),
+}
+
+# Resized/re-encoded variants of course thumbnails and teacher profile
+# pictures, built on the 'images' Celery queue (see edustream.images)
+IMAGE_VARIANTS = {
+    'WIDTHS': [160, 320, 640, 1280],
+    'FORMATS': ['webp', 'jpeg'],
+    'QUALITY': {'webp': 80, 'jpeg': 82},
+    'SCHEDULE_DEDUPE_SECONDS': 600,
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -158,13 +196,63 @@ AUTH_USER_MODEL = 'accounts.User'
 # REST Framework configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # Builds request.user from signed token claims; loads the row lazily
+        'accounts.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
+    # Reverse proxies in front of the app that append to X-Forwarded-For.
+    # Throttles key on the address the outermost one saw; with 0 they use
+    # REMOTE_ADDR, since any client can write the header itself
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', '0')),
+}
+
+# Sliding-window throttles for the public auth endpoints, keyed
+# "<view scope>.<ip|identifier|purpose>". Remove a rate to disable it.
+AUTH_THROTTLES = {
+    'BACKEND': os.environ.get('AUTH_THROTTLE_BACKEND', 'accounts.throttling.RedisSlidingWindowBackend'),
+    'RATES': {
+        'send_otp.ip': '20/hour',
+        'send_otp.identifier': '5/hour',
+        'send_otp.purpose': '3000/min',
+        'verify_otp.ip': '60/hour',
+        'verify_otp.identifier': '10/hour',
+        'login.ip': '30/min',
+        'login.identifier': '10/min',
+        'forgot_password.ip': '20/hour',
+        'forgot_password.identifier': '5/hour',
+    },
+}
+
+# Password checks for login run on a bounded pool ('thread' or 'process');
+# requests are shed with 503 once MAX_PENDING checks are queued
+LOGIN_HASH_POOL = {
+    'KIND': os.environ.get('LOGIN_HASH_POOL_KIND', 'thread'),
+    'WORKERS': int(os.environ.get('LOGIN_HASH_POOL_WORKERS', os.cpu_count() or 2)),
+    'MAX_PENDING': int(os.environ.get('LOGIN_HASH_POOL_MAX_PENDING', '64')),
+}
+
+# Admin bulk user import: rows per validate/hash/insert chunk and the
+# number of processes the import_users command hashes passwords on (1 hashes
+# inline). Uploads through the API hash on LOGIN_HASH_POOL instead
+BULK_IMPORT = {
+    'CHUNK_SIZE': int(os.environ.get('BULK_IMPORT_CHUNK_SIZE', '500')),
+    'HASH_WORKERS': int(os.environ.get('BULK_IMPORT_HASH_WORKERS', os.cpu_count() or 1)),
+}
+
+# Revoked refresh-token JTIs (logout, rotation). Each process tails the
+# Redis revocation log into a Bloom filter every SYNC_SECONDS, so refreshes
+# of unrevoked tokens skip the blacklist lookup. Rebuilds size the filter
+# from the log; BLOOM_CAPACITY is the smallest one built
+TOKEN_BLACKLIST = {
+    'BACKEND': os.environ.get('TOKEN_BLACKLIST_BACKEND', 'accounts.blacklist.RedisTokenBlacklist'),
+    'BLOOM_CAPACITY': int(os.environ.get('TOKEN_BLACKLIST_BLOOM_CAPACITY', '1000000')),
+    'BLOOM_ERROR_RATE': float(os.environ.get('TOKEN_BLACKLIST_BLOOM_ERROR_RATE', '0.001')),
+    'SYNC_SECONDS': float(os.environ.get('TOKEN_BLACKLIST_SYNC_SECONDS', '1.0')),
+    'REBUILD_SECONDS': 3600,
 }
 
 # JWT Settings
@@ -194,6 +282,9 @@ SIMPLE_JWT = {
     'TOKEN_USER_CLASS': 'rest_framework_simplejwt.models.TokenUser',
 
     'JTI_CLAIM': 'jti',
+
+    # Re-reads role/purchase/trial claims when an access token is refreshed
+    'TOKEN_REFRESH_SERIALIZER': 'accounts.serializers.ClaimsTokenRefreshSerializer',
 }
 
 # CORS settings
@@ -220,11 +311,29 @@ EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
 EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
 DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', '')
 
+# Per-process pool of long-lived SMTP connections used by email_services
+EMAIL_DISPATCHER = {
+    'CONNECTIONS': int(os.environ.get('EMAIL_DISPATCHER_CONNECTIONS', '2')),
+    'BATCH_SIZE': 50,
+    'IDLE_TIMEOUT_SECONDS': 60,
+    'HEALTH_CHECK_SECONDS': 30,
+    'SEND_TIMEOUT_SECONDS': 30,
+}
+
 # SMS settings (Twilio)
 TWILIO_ACCOUNT_SID = os.environ.get('TWILIO_ACCOUNT_SID', '')
 TWILIO_AUTH_TOKEN = os.environ.get('TWILIO_AUTH_TOKEN', '')
 TWILIO_PHONE_NUMBER = os.environ.get('TWILIO_PHONE_NUMBER', '')
 
+# SMS client: one pooled client per process. BACKEND may force 'console'
+# or 'fake' (offline transport for benchmarks); empty means Twilio when
+# credentials are configured.
+SMS_SERVICE = {
+    'BACKEND': os.environ.get('SMS_BACKEND', ''),
+    'MAX_CONCURRENT_SENDS': int(os.environ.get('SMS_MAX_CONCURRENT_SENDS', '8')),
+    'HTTP_TIMEOUT_SECONDS': int(os.environ.get('SMS_HTTP_TIMEOUT_SECONDS', '10')),
+}
+
 # Celery Configuration
 CELERY_BROKER_URL = f"redis://{os.environ.get('REDIS_HOST', 'localhost')}:6379/0"
 CELERY_RESULT_BACKEND = f"redis://{os.environ.get('REDIS_HOST', 'localhost')}:6379/0"
@@ -232,6 +341,30 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+CELERY_TASK_ACKS_LATE = True
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+# Run tasks in-process (no broker needed) for tests and local development
+CELERY_TASK_ALWAYS_EAGER = os.environ.get('CELERY_TASK_ALWAYS_EAGER', 'False') == 'True'
+CELERY_TASK_ROUTES = {
+    'accounts.tasks.deliver_otp': {'queue': 'otp'},
+    'edustream.images.generate_image_variants': {'queue': 'images'},
+}
+# Task modules outside installed apps' tasks.py
+CELERY_IMPORTS = ('edustream.images',)
+CELERY_BEAT_SCHEDULE = {
+    'reap-expired-otps': {
+        'task': 'accounts.tasks.reap_expired_otps',
+        'schedule': 300.0,
+    },
+}
+
+# OTP delivery queue: failed sends are retried with exponential backoff
+# and recorded in OTPDeliveryFailure once retries are exhausted
+OTP_DELIVERY = {
+    'MAX_RETRIES': int(os.environ.get('OTP_DELIVERY_MAX_RETRIES', '5')),
+    'RETRY_BACKOFF_SECONDS': int(os.environ.get('OTP_DELIVERY_RETRY_BACKOFF_SECONDS', '2')),
+    'RETRY_BACKOFF_MAX_SECONDS': int(os.environ.get('OTP_DELIVERY_RETRY_BACKOFF_MAX_SECONDS', '60')),
+}
 
 
 TRIAL_SETTINGS = {
@@ -239,7 +372,69 @@ TRIAL_SETTINGS = {
     'TRIAL_DURATION_MINUTES': int(os.environ.get('TRIAL_DURATION_MINUTES', '0')),  # For testing
     'TEST_MODE': os.environ.get('TRIAL_TEST_MODE', 'False') == 'True',
     'ENABLE_AUTO_DELETION': os.environ.get('ENABLE_AUTO_DELETION', 'True') == 'True',
+    # 'delete' removes expired trial students, 'deactivate' sets is_active=False
+    'EXPIRY_ACTION': os.environ.get('TRIAL_EXPIRY_ACTION', 'delete'),
+    'EXPIRY_BATCH_SIZE': int(os.environ.get('TRIAL_EXPIRY_BATCH_SIZE', '500')),
+    'EXPIRY_LOCK_SECONDS': 600,
+    # TrialStatusView payloads are cached per user and dropped whenever a
+    # purchase completes or is refunded; the TTL bounds drift from admin edits
+    'STATUS_CACHE_SECONDS': int(os.environ.get('TRIAL_STATUS_CACHE_SECONDS', '300')),
+}
+
+# Per-student purchased course ids (payments.purchases), written through on
+# every completion/refund; the TTL only bounds drift from raw SQL edits
+PURCHASED_COURSES_CACHE_SECONDS = int(os.environ.get('PURCHASED_COURSES_CACHE_SECONDS', '3600'))
+
+# Per-course daily enrollment/revenue rollups (payments.rollups): the window
+# behind ?ordering=popular and the longest range the admin report accepts
+COURSE_STATS = {
+    'POPULAR_WINDOW_DAYS': int(os.environ.get('POPULAR_WINDOW_DAYS', '30')),
+    'MAX_RANGE_DAYS': 366,
+}
+
+# "Also bought" recommendations (courses.recommendations): the TOP_K most
+# co-purchased courses per course, sharing at least MIN_CO_PURCHASES buyers.
+# Courses with new purchases are recomputed every REFRESH_SECONDS, all of
+# them daily
+COURSE_RECOMMENDATIONS = {
+    'TOP_K': int(os.environ.get('COURSE_RECOMMENDATIONS_TOP_K', '20')),
+    'MIN_CO_PURCHASES': int(os.environ.get('COURSE_RECOMMENDATIONS_MIN_CO_PURCHASES', '2')),
+    'REFRESH_SECONDS': int(os.environ.get('COURSE_RECOMMENDATIONS_REFRESH_SECONDS', '900')),
+    'OVERLAP_SECONDS': 300,
+    'LOCK_SECONDS': 3600,
+}
+CELERY_BEAT_SCHEDULE['refresh-course-recommendations'] = {
+    'task': 'courses.tasks.refresh_course_recommendations',
+    'schedule': float(COURSE_RECOMMENDATIONS['REFRESH_SECONDS']),
+}
+CELERY_BEAT_SCHEDULE['rebuild-course-recommendations'] = {
+    'task': 'courses.tasks.refresh_course_recommendations',
+    'schedule': 86400.0,
+    'kwargs': {'full': True},
+}
+
+# Trial expiry runs on one node at a time (cache lock), every 30 seconds in
+# test mode and hourly in production
+CELERY_BEAT_SCHEDULE['expire-trials'] = {
+    'task': 'accounts.tasks.expire_trials',
+    'schedule': 30.0 if TRIAL_SETTINGS['TEST_MODE'] else 3600.0,
 }
 
 # email and phone number otp expiry time 
-OTP_EXPIRY_MINUTES = int(os.environ.get('OTP_EXPIRY_MINUTES', 5))
\ No newline at end of file
+OTP_EXPIRY_MINUTES = int(os.environ.get('OTP_EXPIRY_MINUTES', 5))
+
+# Where OTPs are stored: RedisOTPBackend (native TTL, single round-trip
+# verify), CacheOTPBackend (any Django cache) or DatabaseOTPBackend (OTP table)
+OTP_BACKEND = os.environ.get('OTP_BACKEND', 'accounts.otp_backends.RedisOTPBackend')
+# How long a verified registration OTP stays usable for /register/
+OTP_VERIFIED_EXPIRY_MINUTES = int(os.environ.get('OTP_VERIFIED_EXPIRY_MINUTES', 30))
+# Failed verifications allowed per identifier before it is locked out
+OTP_MAX_VERIFY_ATTEMPTS = int(os.environ.get('OTP_MAX_VERIFY_ATTEMPTS', 5))
+
+# Expired OTP rows are deleted in chunks of CHUNK_SIZE primary keys, at most
+# MAX_CHUNKS per run, sleeping PAUSE_SECONDS between chunks
+OTP_REAPER = {
+    'CHUNK_SIZE': int(os.environ.get('OTP_REAPER_CHUNK_SIZE', '5000')),
+    'MAX_CHUNKS': int(os.environ.get('OTP_REAPER_MAX_CHUNKS', '200')),
+    'PAUSE_SECONDS': 0.05,
+}
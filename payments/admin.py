@@ -1,5 +1,41 @@
 from django.contrib import admin
-from .models import CourseSubscription
-# Register your models here.
+from edustream.admin_tools import FastChangeListMixin
+from .models import CourseDailyStats, CourseSubscription
 
-admin.site.register(CourseSubscription)
\ No newline at end of file
+
+@admin.register(CourseSubscription)
+class CourseSubscriptionAdmin(FastChangeListMixin, admin.ModelAdmin):
+    list_display = ('__str__', 'payment_status', 'amount_paid', 'currency', 'payment_method', 'purchased_at')
+    list_filter = ('payment_status', 'payment_method', 'purchased_at')
+    search_fields = ('=order_id', '=payment_id', '=student__email')
+    ordering = ('-purchased_at',)
+    # __str__ reads student.email and course.name; join them instead of two queries per row
+    list_select_related = ('student', 'course')
+    # Plain id inputs instead of <select>s listing every user and course
+    raw_id_fields = ('student', 'course')
+    changelist_only = (
+        'id', 'payment_status', 'amount_paid', 'currency', 'payment_method', 'purchased_at',
+        'student__id', 'student__email', 'course__id', 'course__name',
+    )
+
+
+@admin.register(CourseDailyStats)
+class CourseDailyStatsAdmin(admin.ModelAdmin):
+    """Read-only view of the rollups; they are maintained by CourseSubscription transitions"""
+    list_display = (
+        'day', 'course', 'currency', 'completed_count', 'refunded_count', 'gross_amount', 'refunded_amount',
+    )
+    list_filter = ('currency',)
+    date_hierarchy = 'day'
+    ordering = ('-day', '-completed_count')
+    list_select_related = ('course',)
+    raw_id_fields = ('course',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,47 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.utils import timezone
+
+from edustream.locks import cache_lock
+from payments.models import CourseSubscription
+from payments.rollups import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the per-course daily enrollment/revenue rollups from "
+        "course_subscriptions, one chunk of days per transaction. Defaults to "
+        "every day up to yesterday; include today only while no payments are "
+        "completing, or its live increments may be overwritten"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=date.fromisoformat, help='First day (YYYY-MM-DD); default: first payment')
+        parser.add_argument('--until', type=date.fromisoformat, help='Last day (YYYY-MM-DD); default: yesterday')
+        parser.add_argument('--chunk-days', type=int, default=31)
+
+    def handle(self, *args, **options):
+        until = options['until'] or timezone.localdate() - timedelta(days=1)
+        since = options['since']
+        if since is None:
+            first = CourseSubscription.objects.aggregate(first=Min('payment_completed_at'))['first']
+            if first is None:
+                self.stdout.write("No completed payments")
+                return
+            since = timezone.localdate(first)
+        if since > until:
+            raise CommandError("--since must not be after --until")
+
+        with cache_lock('backfill-course-stats', timeout=3600) as acquired:
+            if not acquired:
+                raise CommandError("Another backfill is running")
+            written = 0
+            start = since
+            while start <= until:
+                end = min(start + timedelta(days=options['chunk_days'] - 1), until)
+                written += rebuild(start, end)
+                self.stdout.write(f"  {start}..{end}")
+                start = end + timedelta(days=1)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} rollup rows for {since}..{until}"))
@@ -0,0 +1,76 @@
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.trial_status import invalidate_trial_status
+from payments.models import CourseSubscription
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute students' purchased_courses_count / purchased_course_ids "
+        "from completed subscriptions, in primary-key chunks"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without writing')
+
+    def stale_students(self, students):
+        """Students whose counters disagree with their completed subscriptions, corrected"""
+        purchased = defaultdict(set)
+        for student_id, course_id in CourseSubscription.objects.filter(
+            student_id__in=[student.pk for student in students],
+            payment_status='completed',
+        ).values_list('student_id', 'course_id'):
+            purchased[student_id].add(course_id)
+
+        stale = []
+        for student in students:
+            course_ids = sorted(purchased[student.pk])
+            if (student.purchased_course_ids == course_ids
+                    and student.purchased_courses_count == len(course_ids)
+                    and (student.has_purchased_courses or not course_ids)):
+                continue
+            student.purchased_course_ids = course_ids
+            student.purchased_courses_count = len(course_ids)
+            # has_purchased_courses is never cleared, matching a refund
+            if course_ids:
+                student.has_purchased_courses = True
+            stale.append(student)
+        return stale
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        chunk_size = options['chunk_size']
+        scanned = repaired = 0
+        last_pk = 0
+
+        while True:
+            # Rows are locked per chunk so a concurrent purchase can't be
+            # overwritten by the recomputed value
+            with transaction.atomic():
+                students = User.objects.filter(role='student', pk__gt=last_pk).order_by('pk').only(
+                    'id', 'has_purchased_courses', 'purchased_courses_count', 'purchased_course_ids'
+                )
+                if not options['dry_run']:
+                    students = students.select_for_update()
+                students = list(students[:chunk_size])
+                if not students:
+                    break
+                last_pk = students[-1].pk
+                scanned += len(students)
+                stale = self.stale_students(students)
+                repaired += len(stale)
+                if stale and not options['dry_run']:
+                    User.objects.bulk_update(
+                        stale,
+                        ['purchased_course_ids', 'purchased_courses_count', 'has_purchased_courses'],
+                    )
+            if stale and not options['dry_run']:
+                invalidate_trial_status(*[student.pk for student in stale])
+
+        verb = 'Would repair' if options['dry_run'] else 'Repaired'
+        self.stdout.write(self.style.SUCCESS(f"{verb} {repaired} of {scanned} students"))
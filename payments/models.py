@@ -1,7 +1,11 @@
-from django.db import models
+from django.contrib.auth import get_user_model
+from django.db import models, transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
 from django.conf import settings
 from django.utils import timezone
 from courses.models import Course
+from .rollups import record_transition
 
 
 class CourseSubscription(models.Model):
@@ -50,6 +54,7 @@ class CourseSubscription(models.Model):
     # Timestamps
     purchased_at = models.DateTimeField(auto_now_add=True)
     payment_completed_at = models.DateTimeField(null=True, blank=True)
+    refunded_at = models.DateTimeField(null=True, blank=True)
     
     # Access control
     is_active = models.BooleanField(default=True)  # For manual access control if needed
@@ -67,18 +72,82 @@ class CourseSubscription(models.Model):
         return f"{self.student.email} - {self.course.name} ({self.payment_status})"
     
     def save(self, *args, **kwargs):
+        is_completed = self.payment_status == 'completed'
+        update_fields = kwargs.get('update_fields')
+        
+        # Set payment completion time
+        if is_completed and not self.payment_completed_at:
+            self.payment_completed_at = timezone.now()
+        # Refunds count on this day in the rollups, live and rebuilt alike
+        if self.payment_status == 'refunded' and not self.refunded_at:
+            self.refunded_at = timezone.now()
+            if update_fields is not None and 'payment_status' in update_fields:
+                kwargs['update_fields'] = {*update_fields, 'refunded_at'}
+        
+        with transaction.atomic():
+            if update_fields is not None and 'payment_status' not in update_fields:
+                # The stored status isn't being written, so it can't transition
+                was_completed = is_completed
+            elif self._state.adding:
+                was_completed = False
+            else:
+                # Lock the row and compare against its committed status, not
+                # the one loaded with this instance: two saves of the same
+                # pending row (a retried payment verification) must apply
+                # the completion once
+                stored = CourseSubscription.objects.select_for_update().filter(
+                    pk=self.pk
+                ).values_list('payment_status', flat=True).first()
+                was_completed = stored == 'completed'
+            super().save(*args, **kwargs)
+            if was_completed != is_completed:
+                self._apply_purchase_transition(is_completed)
+                record_transition(self, is_completed)
+    
+    def _apply_purchase_transition(self, completed):
+        """
+        Keep the student's purchase counters in step with this subscription
+        moving to or from 'completed'. Adding/removing the course id is
+        idempotent, so a duplicate completion can't double count.
+        """
+        from accounts.trial_status import invalidate_trial_status
+        from .purchases import store_purchased_course_ids
+        
+        User = get_user_model()
+        student = User.objects.select_for_update().filter(pk=self.student_id).first()
+        if student is None:
+            return
+        course_ids = set(student.purchased_course_ids)
+        if completed:
+            course_ids.add(self.course_id)
+        else:
+            course_ids.discard(self.course_id)
+        
+        student.purchased_course_ids = sorted(course_ids)
+        student.purchased_courses_count = len(course_ids)
+        update_fields = ['purchased_course_ids', 'purchased_courses_count']
+        
         # When a payment is completed, update user's purchase status
-        if self.payment_status == 'completed':
-            # Update user's purchase status
-            if not self.student.has_purchased_courses:
-                self.student.has_purchased_courses = True
-                self.student.save(update_fields=['has_purchased_courses'])
-            
-            # Set payment completion time
-            if not self.payment_completed_at:
-                self.payment_completed_at = timezone.now()
+        first_purchase = completed and not student.has_purchased_courses
+        if first_purchase:
+            student.has_purchased_courses = True
+            update_fields.append('has_purchased_courses')
+        student.save(update_fields=update_fields)
         
-        super().save(*args, **kwargs)
+        if CourseSubscription.student.is_cached(self):
+            for field in update_fields:
+                setattr(self.student, field, getattr(student, field))
+        
+        if first_purchase:
+            # Tokens already handed out still claim a trial user; the
+            # caller returns these so the client can swap them in
+            from accounts.tokens import tokens_for_user
+            self.reissued_tokens = tokens_for_user(student)
+        
+        student_id = self.student_id
+        transaction.on_commit(lambda: invalidate_trial_status(student_id))
+        # Computed under the student row lock, so concurrent transitions can't interleave
+        store_purchased_course_ids(student_id, course_ids)
     
     @property
     def is_expired(self):
@@ -88,4 +157,49 @@ class CourseSubscription(models.Model):
     @property
     def has_access(self):
         """Check if student has access to the course"""
-        return self.payment_status == 'completed' and self.is_active
\ No newline at end of file
+        return self.payment_status == 'completed' and self.is_active
+
+
+@receiver(post_delete, sender=CourseSubscription)
+def _release_deleted_purchase(sender, instance, **kwargs):
+    """Deleting a completed subscription is a transition away from 'completed'"""
+    if instance.payment_status != 'completed':
+        return
+    with transaction.atomic():
+        instance._apply_purchase_transition(False)
+        record_transition(instance, False, deleted=True)
+
+
+class CourseDailyStats(models.Model):
+    """
+    Enrollment and revenue per course, day and currency, maintained
+    incrementally from CourseSubscription status transitions
+    (payments.rollups) so reports never GROUP BY course_subscriptions.
+    Completions count on the day of payment, refunds on the day of refund.
+    """
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='daily_stats')
+    day = models.DateField()
+    currency = models.CharField(max_length=3, default='INR')
+    
+    completed_count = models.IntegerField(default=0)
+    refunded_count = models.IntegerField(default=0)
+    gross_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    refunded_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'course_daily_stats'
+        ordering = ['-day', 'course']
+        constraints = [
+            # Also serves per-course range scans
+            models.UniqueConstraint(fields=['course', 'day', 'currency'], name='course_daily_stats_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['day', 'course'], name='course_daily_stats_day_idx'),
+            # Courses with new transitions, for courses.recommendations.refresh()
+            models.Index(fields=['updated_at'], name='course_daily_stats_updated_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.course_id} {self.day} {self.currency}: {self.completed_count} completed"
@@ -0,0 +1,62 @@
+"""
+Per-student cache of purchased (completed) course ids.
+
+The catalog, checkout and class-room access checks all ask "which courses
+has this student bought?". They share one cache entry per student instead
+of each querying CourseSubscription. Entries are written through with the
+new set when a subscription moves to or from 'completed' (see
+CourseSubscription._apply_purchase_transition), and rebuilt from
+CourseSubscription on a miss. The rebuild only fills an empty entry: a
+write-through landing between its query and its write is newer.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from edustream.metrics import register_local
+
+# Per-process: a shared cache counter would add round trips to every hit
+_stats = {'hits': 0, 'misses': 0, 'writes': 0}
+register_local('purchased_courses.local', lambda: dict(_stats))
+
+
+def purchased_courses_key(student_id):
+    return f'purchased_courses:{student_id}'
+
+
+def _timeout():
+    return getattr(settings, 'PURCHASED_COURSES_CACHE_SECONDS', 3600)
+
+
+def purchased_course_ids(student_id):
+    """frozenset of course ids the student has completed payment for"""
+    key = purchased_courses_key(student_id)
+    course_ids = cache.get(key)
+    if course_ids is not None:
+        _stats['hits'] += 1
+        return frozenset(course_ids)
+
+    _stats['misses'] += 1
+    from .models import CourseSubscription
+    course_ids = sorted(CourseSubscription.objects.filter(
+        student_id=student_id,
+        payment_status='completed'
+    ).values_list('course_id', flat=True))
+    cache.add(key, course_ids, _timeout())
+    return frozenset(course_ids)
+
+
+def has_purchased(student_id, course_id):
+    return course_id in purchased_course_ids(student_id)
+
+
+def store_purchased_course_ids(student_id, course_ids):
+    """Write-through after the transaction that changed them commits"""
+    course_ids = sorted(course_ids)
+
+    def write():
+        _stats['writes'] += 1
+        cache.set(purchased_courses_key(student_id), course_ids, _timeout())
+
+    transaction.on_commit(write)
@@ -0,0 +1,160 @@
+"""
+Per-course daily enrollment/revenue rollups (CourseDailyStats).
+
+CourseSubscription.save() calls record_transition() inside its transaction
+whenever a subscription moves to or from 'completed':
+
+    -> completed            completed_count/gross_amount += on the payment day
+    completed -> refunded   refunded_count/refunded_amount += on the refund day
+    completed -> other      (admin correction, deletion) the payment-day
+                            completion is reversed
+
+Reports and the popular-course ordering read only the rollups. rebuild()
+(the backfill_course_stats command) recomputes them from
+course_subscriptions for a date range.
+"""
+
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from itertools import chain
+from django.conf import settings
+from django.db import transaction
+from django.db.models import (
+    Count, DecimalField, ExpressionWrapper, F, IntegerField, OuterRef, Subquery, Sum, Value,
+)
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+import logging
+
+logger = logging.getLogger(__name__)
+
+COUNTERS = ('completed_count', 'refunded_count', 'gross_amount', 'refunded_amount')
+
+AMOUNT = DecimalField(max_digits=14, decimal_places=2)
+
+
+def _stats_setting(name, default):
+    return getattr(settings, 'COURSE_STATS', {}).get(name, default)
+
+
+def bump(course_id, day, currency, **deltas):
+    """Add deltas to one (course, day, currency) row, creating it if needed"""
+    from .models import CourseDailyStats
+
+    changes = {field: F(field) + delta for field, delta in deltas.items()}
+    rows = CourseDailyStats.objects.filter(course_id=course_id, day=day, currency=currency)
+    # The row usually exists already: one UPDATE
+    if rows.update(**changes, updated_at=timezone.now()):
+        return
+    CourseDailyStats.objects.get_or_create(course_id=course_id, day=day, currency=currency)
+    rows.update(**changes, updated_at=timezone.now())
+
+
+def record_transition(subscription, completed, deleted=False):
+    """Apply one CourseSubscription transition to the rollups (inside its transaction)"""
+    amount = subscription.amount_paid or Decimal('0')
+    paid_day = timezone.localdate(subscription.payment_completed_at or timezone.now())
+    if completed:
+        bump(subscription.course_id, paid_day, subscription.currency, completed_count=1, gross_amount=amount)
+    elif subscription.payment_status == 'refunded' and not deleted:
+        bump(subscription.course_id, timezone.localdate(subscription.refunded_at or timezone.now()),
+             subscription.currency, refunded_count=1, refunded_amount=amount)
+    else:
+        bump(subscription.course_id, paid_day, subscription.currency, completed_count=-1, gross_amount=-amount)
+
+
+def _sums():
+    # Explicit output fields keep amounts Decimal on every backend
+    return {
+        field: Sum(field, output_field=AMOUNT if field.endswith('_amount') else IntegerField())
+        for field in COUNTERS
+    }
+
+
+def stats_rows(date_from, date_to, course_id=None):
+    from .models import CourseDailyStats
+
+    rows = CourseDailyStats.objects.filter(day__gte=date_from, day__lte=date_to)
+    if course_id is not None:
+        rows = rows.filter(course_id=course_id)
+    return rows
+
+
+def course_totals(date_from, date_to, course_id=None, ordering='popular'):
+    """Per course and currency totals over [date_from, date_to], from the rollups only"""
+    totals = stats_rows(date_from, date_to, course_id).values(
+        'course_id', 'currency', course_name=F('course__name'),
+    ).annotate(**_sums())
+    order = {
+        'popular': ['-net_enrollments', 'course_id'],
+        'revenue': ['-net_amount', 'course_id'],
+    }[ordering]
+    return totals.annotate(
+        net_enrollments=F('completed_count') - F('refunded_count'),
+        net_amount=ExpressionWrapper(F('gross_amount') - F('refunded_amount'), output_field=AMOUNT),
+    ).order_by(*order)
+
+
+def daily_totals(date_from, date_to, course_id=None):
+    """Per day and currency totals over [date_from, date_to]"""
+    return stats_rows(date_from, date_to, course_id).values('day', 'currency').annotate(
+        **_sums()
+    ).order_by('day', 'currency')
+
+
+def with_popularity(queryset, days=None):
+    """Annotate courses with net enrollments over the last `days` days, from the rollups"""
+    from .models import CourseDailyStats
+
+    days = days or _stats_setting('POPULAR_WINDOW_DAYS', 30)
+    since = timezone.localdate() - timedelta(days=days - 1)
+    enrollments = CourseDailyStats.objects.filter(
+        course=OuterRef('pk'), day__gte=since,
+    ).order_by().values('course').annotate(
+        net=Sum('completed_count') - Sum('refunded_count'),
+    ).values('net')
+    return queryset.annotate(popularity=Coalesce(Subquery(enrollments), Value(0)))
+
+
+def rebuild(date_from, date_to):
+    """
+    Recompute rollup rows for [date_from, date_to] from course_subscriptions:
+    completions by payment day, refunds by refunded_at, as record_transition()
+    counts them. Refunds older than refunded_at have no refund date and
+    count on the payment day. Returns the number of rows written.
+    """
+    from .models import CourseDailyStats, CourseSubscription
+
+    start = timezone.make_aware(datetime.combine(date_from, time.min))
+    end = timezone.make_aware(datetime.combine(date_to + timedelta(days=1), time.min))
+    # A refunded subscription was completed first
+    paid = CourseSubscription.objects.filter(
+        payment_completed_at__gte=start,
+        payment_completed_at__lt=end,
+        payment_status__in=('completed', 'refunded'),
+    ).annotate(day=TruncDate('payment_completed_at')).values('course_id', 'day', 'currency').annotate(
+        completed_count=Count('id'),
+        gross_amount=Sum('amount_paid'),
+    )
+    refunded = CourseSubscription.objects.filter(payment_status='refunded').annotate(
+        refund_time=Coalesce('refunded_at', 'payment_completed_at'),
+    ).filter(refund_time__gte=start, refund_time__lt=end).annotate(
+        day=TruncDate('refund_time'),
+    ).values('course_id', 'day', 'currency').annotate(
+        refunded_count=Count('id'),
+        refunded_amount=Sum('amount_paid'),
+    )
+
+    rows = {}
+    for group in chain(paid.order_by(), refunded.order_by()):
+        key = (group.pop('course_id'), group.pop('day'), group.pop('currency'))
+        rows.setdefault(key, {}).update(group)
+
+    with transaction.atomic():
+        CourseDailyStats.objects.filter(day__gte=date_from, day__lte=date_to).delete()
+        CourseDailyStats.objects.bulk_create([
+            CourseDailyStats(course_id=course_id, day=day, currency=currency, **counters)
+            for (course_id, day, currency), counters in rows.items()
+        ])
+    logger.info(f"Rebuilt {len(rows)} course stats rows for {date_from}..{date_to}")
+    return len(rows)
@@ -1,5 +1,9 @@
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
 from rest_framework import serializers
 from .models import CourseSubscription
+from .purchases import has_purchased
 from courses.models import Course
 
 
@@ -13,11 +17,7 @@ class CreateOrderSerializer(serializers.Serializer):
             raise serializers.ValidationError("Course not found or inactive")
         
         # Check if already subscribed
-        if CourseSubscription.objects.filter(
-            student=self.context['request'].user,
-            course=course,
-            payment_status='completed'
-        ).exists():
+        if has_purchased(self.context['request'].user.pk, course.pk):
             raise serializers.ValidationError("Already subscribed to this course")
         
         return value
@@ -54,4 +54,46 @@ class VerifyPaymentSerializer(serializers.Serializer):
             raise serializers.ValidationError("Subscription not found or already processed")
         
         attrs['subscription'] = subscription
-        return attrs
\ No newline at end of file
+        return attrs
+
+class CourseStatsQuerySerializer(serializers.Serializer):
+    """Query parameters of the admin course stats report"""
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    course_id = serializers.IntegerField(required=False)
+    group = serializers.ChoiceField(choices=['course', 'day'], default='course')
+    ordering = serializers.ChoiceField(choices=['popular', 'revenue'], default='popular')
+
+    def validate(self, attrs):
+        today = timezone.localdate()
+        attrs.setdefault('date_to', today)
+        attrs.setdefault('date_from', attrs['date_to'] - timedelta(days=29))
+        if attrs['date_from'] > attrs['date_to']:
+            raise serializers.ValidationError("date_from must not be after date_to")
+        max_days = settings.COURSE_STATS.get('MAX_RANGE_DAYS', 366)
+        if (attrs['date_to'] - attrs['date_from']).days >= max_days:
+            raise serializers.ValidationError(f"Date range is limited to {max_days} days")
+        return attrs
+
+
+class CourseStatsSerializer(serializers.Serializer):
+    """One course/currency row of the admin course stats report"""
+    course_id = serializers.IntegerField()
+    course_name = serializers.CharField()
+    currency = serializers.CharField()
+    completed_count = serializers.IntegerField()
+    refunded_count = serializers.IntegerField()
+    net_enrollments = serializers.IntegerField()
+    gross_amount = serializers.DecimalField(max_digits=14, decimal_places=2)
+    refunded_amount = serializers.DecimalField(max_digits=14, decimal_places=2)
+    net_amount = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+
+class DailyStatsSerializer(serializers.Serializer):
+    """One day/currency row of the admin course stats report"""
+    day = serializers.DateField()
+    currency = serializers.CharField()
+    completed_count = serializers.IntegerField()
+    refunded_count = serializers.IntegerField()
+    gross_amount = serializers.DecimalField(max_digits=14, decimal_places=2)
+    refunded_amount = serializers.DecimalField(max_digits=14, decimal_places=2)
@@ -1,3 +1,118 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
 
-# Create your tests here.
+from accounts.models import User
+from courses.models import Course
+from .models import CourseDailyStats, CourseSubscription
+from .purchases import purchased_course_ids, purchased_courses_key
+from .rollups import rebuild
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class PurchaseTransitionTests(TestCase):
+    """Rollups and purchase counters move once per status transition"""
+
+    def setUp(self):
+        cache.clear()
+        self.student = User.objects.create_user(username='student', email='student@example.com',
+                                                phone_number='+919876543210', password='Secret123')
+        self.course = Course.objects.create(name='Algebra', category='Math', description='x',
+                                            base_price=Decimal('10.00'))
+        self.subscription = CourseSubscription.objects.create(
+            student=self.student, course=self.course, amount_paid=Decimal('10.00'),
+        )
+
+    def complete(self, subscription):
+        subscription.payment_status = 'completed'
+        subscription.save()
+
+    def test_stale_copies_complete_once(self):
+        # Two requests loaded the same pending row, e.g. a retried verification
+        first = CourseSubscription.objects.get(pk=self.subscription.pk)
+        second = CourseSubscription.objects.get(pk=self.subscription.pk)
+        self.complete(first)
+        self.complete(second)
+
+        stats = CourseDailyStats.objects.get(course=self.course)
+        self.assertEqual(stats.completed_count, 1)
+        self.assertEqual(stats.gross_amount, Decimal('10.00'))
+        self.student.refresh_from_db()
+        self.assertEqual(self.student.purchased_courses_count, 1)
+
+    def test_refund_after_stale_completion(self):
+        stale = CourseSubscription.objects.get(pk=self.subscription.pk)
+        self.complete(self.subscription)
+        self.subscription.payment_status = 'refunded'
+        self.subscription.save()
+        # The stale copy still says pending; the row is refunded, so this re-completes it
+        self.complete(stale)
+
+        stats = CourseDailyStats.objects.get(course=self.course)
+        self.assertEqual((stats.completed_count, stats.refunded_count), (2, 1))
+        self.student.refresh_from_db()
+        self.assertEqual(self.student.purchased_courses_count, 1)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class RollupRebuildTests(TestCase):
+    """rebuild() reproduces the live rollups, refunds on their refund day included"""
+
+    def setUp(self):
+        cache.clear()
+        student = User.objects.create_user(username='student', email='student@example.com',
+                                           phone_number='+919876543210', password='Secret123')
+        self.course = Course.objects.create(name='Algebra', category='Math', description='x',
+                                            base_price=Decimal('10.00'))
+        self.today = timezone.localdate()
+        self.paid_day = self.today - timedelta(days=3)
+        subscription = CourseSubscription.objects.create(
+            student=student, course=self.course, amount_paid=Decimal('10.00'),
+            payment_completed_at=timezone.now() - timedelta(days=3),
+        )
+        subscription.payment_status = 'completed'
+        subscription.save()
+        subscription.payment_status = 'refunded'
+        subscription.save(update_fields=['payment_status'])
+
+    def rollups(self):
+        return {
+            row.day: (row.completed_count, row.gross_amount, row.refunded_count, row.refunded_amount)
+            for row in CourseDailyStats.objects.filter(course=self.course)
+        }
+
+    def test_full_rebuild_matches_live(self):
+        live = self.rollups()
+        self.assertEqual(live, {
+            self.paid_day: (1, Decimal('10.00'), 0, Decimal('0.00')),
+            self.today: (0, Decimal('0.00'), 1, Decimal('10.00')),
+        })
+        rebuild(self.paid_day, self.today)
+        self.assertEqual(self.rollups(), live)
+
+    def test_partial_rebuilds(self):
+        live = self.rollups()
+        rebuild(self.paid_day, self.paid_day)
+        rebuild(self.today, self.today)
+        self.assertEqual(self.rollups(), live)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class PurchasedCourseIdsTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.student = User.objects.create_user(username='student', email='student@example.com',
+                                                phone_number='+919876543210', password='Secret123')
+
+    def test_miss_keeps_a_concurrent_write_through(self):
+        key = purchased_courses_key(self.student.pk)
+        # The write-through lands after the miss read the (older) database state
+        with mock.patch.object(cache, 'get', side_effect=lambda *args: cache.set(key, [7]) or None):
+            self.assertEqual(purchased_course_ids(self.student.pk), frozenset())
+        self.assertEqual(purchased_course_ids(self.student.pk), frozenset([7]))
@@ -1,9 +1,10 @@
 from django.urls import path
-from .views import CreateOrderView, VerifyPaymentView
+from .views import AdminCourseStatsView, CreateOrderView, VerifyPaymentView
 
 app_name = 'payments'
 
 urlpatterns = [
     path('create_order/', CreateOrderView.as_view(), name='create_order'),
     path('verify_payment/', VerifyPaymentView.as_view(), name='verify_payment'),
+    path('admin/course_stats/', AdminCourseStatsView.as_view(), name='admin_course_stats'),
 ]
\ No newline at end of file
@@ -7,9 +7,13 @@ from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from courses.models import Course
 from payments.models import CourseSubscription
-from accounts.permissions import IsStudent
+from accounts.permissions import IsAdmin, IsStudent
 from django.utils import timezone
-from .serializers import CreateOrderSerializer, VerifyPaymentSerializer
+from .serializers import (
+    CourseStatsQuerySerializer, CourseStatsSerializer, CreateOrderSerializer, DailyStatsSerializer,
+    VerifyPaymentSerializer,
+)
+from .rollups import course_totals, daily_totals
 import logging
 
 # Initialize Razorpay client
@@ -174,12 +178,48 @@ class VerifyPaymentView(views.APIView):
             subscription.save()
             
             logger.info(f"Payment verified for subscription {subscription.id}, user {request.user.id}, course {subscription.course.name}")
-            return Response({
+            response_data = {
                 "message": "Payment verified successfully",
                 "subscription_id": subscription.id,
                 "course_name": subscription.course.name
-            }, status=status.HTTP_200_OK)
+            }
+            
+            # First purchase changes the user's JWT claims: hand out fresh tokens
+            reissued_tokens = getattr(subscription, 'reissued_tokens', None)
+            if reissued_tokens:
+                response_data.update(reissued_tokens)
+            
+            return Response(response_data, status=status.HTTP_200_OK)
             
         except Exception as e:
             logger.exception(f"Error updating subscription {subscription.id} for user {request.user.id}: {str(e)}")
-            return Response({"error": "Internal server error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+            return Response({"error": "Internal server error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class AdminCourseStatsView(views.APIView):
+    """
+    Enrollment and revenue per course (or per day) over a date range, read
+    from the CourseDailyStats rollups only. Amounts are per currency.
+    """
+    permission_classes = [IsAuthenticated, IsAdmin]
+
+    @swagger_auto_schema(query_serializer=CourseStatsQuerySerializer)
+    def get(self, request):
+        query = CourseStatsQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        if params['group'] == 'day':
+            rows = daily_totals(params['date_from'], params['date_to'], params.get('course_id'))
+            serializer = DailyStatsSerializer(rows, many=True)
+        else:
+            rows = course_totals(
+                params['date_from'], params['date_to'], params.get('course_id'), params['ordering']
+            )
+            serializer = CourseStatsSerializer(rows, many=True)
+        return Response({
+            'date_from': params['date_from'],
+            'date_to': params['date_to'],
+            'group': params['group'],
+            'results': serializer.data,
+        })